@@ -1,29 +1,44 @@
 """Nourish API — Authentifizierung."""
 
-from fastapi import APIRouter, Depends
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from app.core.config import get_settings
 from app.core.database import get_db
-from app.core.auth import verify_apple_token
-from app.models.schemas import UserCreate, AuthResponse
+from app.core.auth import (
+    cache_user, consume_refresh_token, issue_session_tokens, load_user, store_refresh_token,
+    verify_apple_token, verify_session_token,
+)
+from app.models.schemas import UserCreate, AuthResponse, RefreshInput
 
 router = APIRouter()
 
+settings = get_settings()
+
 
 @router.post("/apple", response_model=AuthResponse)
 async def apple_sign_in(body: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Apple Sign-In: Erstellt neuen User oder gibt existierenden zurück.
-    Dev-Modus: Wenn apple_user_id mit "dev-" beginnt, wird die
+    Das Apple Identity Token wird verifiziert; sein sub muss zur apple_user_id passen.
+    Dev-Modus (nur env=development): Wenn apple_user_id mit "dev-" beginnt, wird die
     Apple-Token-Verifikation übersprungen.
+    Gibt Session-Tokens zurück (Access + Refresh), die bei jedem Request
+    lokal verifiziert werden — kein Apple-JWKS-Lookup mehr pro Request.
     """
-    is_dev = body.apple_user_id.startswith("dev-")
+    is_dev = body.apple_user_id.startswith("dev-") and settings.env == "development"
 
     if not is_dev:
         # Produktion: Apple Identity Token verifizieren
-        # (identity_token müsste im Body mitgeschickt werden)
-        pass
+        claims = await verify_apple_token(body.identity_token)
+        if not hmac.compare_digest(str(claims.get("sub", "")), body.apple_user_id):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Apple token does not match apple_user_id",
+            )
 
     # Prüfe ob User existiert
     result = await db.execute(
@@ -33,9 +48,7 @@ async def apple_sign_in(body: UserCreate, db: AsyncSession = Depends(get_db)):
     existing = result.mappings().first()
 
     if existing:
-        user = dict(existing)
-        token = f"dev-{user['id']}" if is_dev else str(user["id"])
-        return {"user": user, "token": token}
+        return await _auth_response(dict(existing), is_dev, db)
 
     # Neuen User anlegen
     result = await db.execute(
@@ -47,7 +60,31 @@ async def apple_sign_in(body: UserCreate, db: AsyncSession = Depends(get_db)):
         {"aid": body.apple_user_id, "email": body.email, "name": body.display_name},
     )
     user = dict(result.mappings().first())
-    await db.commit()
 
-    token = f"dev-{user['id']}" if is_dev else str(user["id"])
-    return {"user": user, "token": token}
+    return await _auth_response(user, is_dev, db)
+
+
+@router.post("/refresh", response_model=AuthResponse)
+async def refresh_session(body: RefreshInput, db: AsyncSession = Depends(get_db)):
+    """
+    Tauscht ein gueltiges Refresh-Token gegen ein neues Token-Paar (Rotation).
+    Das alte Refresh-Token ist danach verbraucht; wird es nochmals vorgelegt,
+    werden alle Refresh-Tokens des Users widerrufen.
+    """
+    claims = verify_session_token(body.refresh_token, token_type="refresh")
+    await consume_refresh_token(claims, db)
+    user = await load_user("id", claims["sub"], db, min_version=claims.get("ver") or 0)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return await _auth_response(user, False, db)
+
+
+async def _auth_response(user: dict, is_dev: bool, db: AsyncSession) -> dict:
+    """Stellt Session-Tokens aus, registriert die Refresh-jti und committet."""
+    cache_user(user)
+    tokens = issue_session_tokens(user)
+    await store_refresh_token(user["id"], tokens.pop("refresh_jti"), db)
+    await db.commit()
+    # Dev-Clients behalten ihr dev-Token als "token"
+    token = f"dev-{user['id']}" if is_dev else tokens["access_token"]
+    return {"user": user, "token": token, **tokens}
@@ -1,24 +1,24 @@
 """Nourish API — Chat mit Nourish-KI."""
 
+import json
+import logging
 import re
-from datetime import date as date_type
+import time
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from app.core.database import get_db
+from app.core.database import get_db, session_scope
 from app.core.auth import get_current_user
+from app.core.metrics import metrics
 from app.models.schemas import ChatInput, ChatResponse
-from app.services.claude_service import chat_with_nourish
-from app.services.balance_service import (
-    aggregate_daily_nutrients,
-    calculate_target_nutrients,
-    calculate_deficits,
-    get_week_trends,
-)
+from app.services.claude_service import chat_with_nourish, stream_chat_with_nourish
+from app.services.chat_context import get_chat_context
 
 router = APIRouter()
+log = logging.getLogger(__name__)
 
 
 @router.post("", response_model=ChatResponse)
@@ -28,62 +28,103 @@ async def send_chat_message(
     db: AsyncSession = Depends(get_db),
 ):
     """Freitext-Chat mit Nourish — kontextbewusst mit Tagesbilanz und Wochentrends."""
-
-    # Chat-Historie laden (letzte 10 Nachrichten)
-    result = await db.execute(
-        text("""
-            SELECT role, content FROM chat_messages
-            WHERE user_id = :uid
-            ORDER BY created_at DESC LIMIT 10
-        """),
-        {"uid": user["id"]},
-    )
-    history = [dict(row) for row in reversed(list(result.mappings()))]
-
-    # Echte Tagesbilanz laden
-    today = date_type.today()
-    actual = await aggregate_daily_nutrients(user["id"], today, db)
-    target = calculate_target_nutrients(user)
-    deficits = calculate_deficits(actual, target)
-
-    daily_balance = {
-        "actual": actual.model_dump(),
-        "target": target.model_dump(),
-        "deficits": {
-            k: v for k, v in deficits.items()
-            if v["status"] != "ok"
-        },
-    }
-
-    # Wochentrends laden (date-Objekte in Strings konvertieren fuer JSON)
-    raw_trends = await get_week_trends(user["id"], db)
-    week_trends = {
-        **raw_trends,
-        "start_date": str(raw_trends["start_date"]),
-        "end_date": str(raw_trends["end_date"]),
-    }
+    start = time.perf_counter()
+    summary, history, daily_balance, week_trends = await _load_chat_context(user, db)
+    metrics.observe("chat.time_to_claude_ms", (time.perf_counter() - start) * 1000)
 
     # Claude Chat
-    response_text = await chat_with_nourish(
-        user_message=body.message,
-        chat_history=history,
-        user_profile=user,
-        daily_balance=daily_balance,
-        week_trends=week_trends,
+    with metrics.timer("chat.stage.claude_ms"):
+        response_text = await chat_with_nourish(
+            user_message=body.message,
+            chat_history=history,
+            user_profile=user,
+            daily_balance=daily_balance,
+            week_trends=week_trends,
+            chat_summary=summary,
+        )
+
+    with metrics.timer("chat.stage.save_ms"):
+        await _save_messages(user["id"], body.message, response_text, db)
+        await db.commit()
+
+    return ChatResponse(response=response_text, knowledge_links=_knowledge_links(response_text))
+
+
+@router.post("/stream")
+async def stream_chat_message(
+    body: ChatInput,
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Wie POST /chat, aber als Server-Sent Events:
+    - event: delta  data: {"text": "..."}            (je Text-Stueck von Claude)
+    - event: done   data: {"knowledge_links": [...]} (nach dem Speichern)
+    - event: error  data: {"detail": "..."}          (feste Meldung, Details nur im Server-Log)
+    Die komplette Antwort wird am Ende in chat_messages gespeichert.
+    """
+    start = time.perf_counter()
+    summary, history, daily_balance, week_trends = await _load_chat_context(user, db)
+    metrics.observe("chat.time_to_claude_ms", (time.perf_counter() - start) * 1000)
+
+    async def events():
+        parts = []
+        try:
+            async for chunk in stream_chat_with_nourish(
+                user_message=body.message,
+                chat_history=history,
+                user_profile=user,
+                daily_balance=daily_balance,
+                week_trends=week_trends,
+                chat_summary=summary,
+            ):
+                parts.append(chunk)
+                yield _sse("delta", {"text": chunk})
+        except Exception:
+            # Details (SQL, Anthropic-SDK) nur ins Log, nicht an den Client
+            log.exception("Chat-Stream abgebrochen")
+            metrics.incr("chat.stream.error")
+            yield _sse("error", {"detail": "Chat fehlgeschlagen. Bitte nochmal versuchen."})
+            return
+
+        response_text = "".join(parts)
+        # Die Request-Session ist hier schon geschlossen — eigene Session zum Speichern
+        async with session_scope() as session:
+            await _save_messages(user["id"], body.message, response_text, session)
+        yield _sse("done", {"knowledge_links": _knowledge_links(response_text)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    # Nachrichten speichern
+
+async def _load_chat_context(user: dict, db: AsyncSession) -> tuple[str, list[dict], dict, dict]:
+    """
+    Laedt Verlaufs-Zusammenfassung, juengste Nachrichten, Tagesbilanz und Wochentrends fuer den
+    Prompt — in einer Query ueber die Request-Session.
+    """
+    with metrics.timer("chat.stage.context_ms"):
+        return await get_chat_context(user, db)
+
+
+async def _save_messages(user_id, message: str, response_text: str, db: AsyncSession) -> None:
+    """Speichert Nutzer-Nachricht und Antwort (ohne Commit)."""
     await db.execute(
         text("INSERT INTO chat_messages (user_id, role, content) VALUES (:uid, 'user', :content)"),
-        {"uid": user["id"], "content": body.message},
+        {"uid": user_id, "content": message},
     )
     await db.execute(
         text("INSERT INTO chat_messages (user_id, role, content) VALUES (:uid, 'assistant', :content)"),
-        {"uid": user["id"], "content": response_text},
+        {"uid": user_id, "content": response_text},
     )
-    await db.commit()
 
-    # Knowledge-Links aus der Antwort extrahieren ([Mehr ueber XYZ])
-    links = re.findall(r'\[Mehr (?:ueber|über) ([^\]]+)\]', response_text)
 
-    return ChatResponse(response=response_text, knowledge_links=links)
+def _knowledge_links(response_text: str) -> list[str]:
+    """Knowledge-Links aus der Antwort extrahieren ([Mehr ueber XYZ])."""
+    return re.findall(r'\[Mehr (?:ueber|über) ([^\]]+)\]', response_text)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
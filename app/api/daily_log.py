@@ -2,18 +2,19 @@
 
 import json
 from datetime import date, timedelta
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from app.core.database import get_db
 from app.core.auth import get_current_user
-from app.models.schemas import DailyLogResponse, NutrientProfile
+from app.models.schemas import DailyLogResponse, DailyTotals, NutrientProfile
 from app.services.balance_service import (
-    aggregate_daily_nutrients,
-    calculate_target_nutrients,
     calculate_deficits,
     get_week_trends,
+    nutrients_from_log,
+    resolve_target_nutrients,
+    sum_nutrients_by_day,
 )
 
 router = APIRouter()
@@ -29,44 +30,36 @@ async def get_daily_log(
     target_date = log_date or date.today()
     user_id = user["id"]
 
-    # Ist-Naehrstoffe aus food_items aggregieren
-    actual = await aggregate_daily_nutrients(user_id, target_date, db)
+    # Tageszeile laden — actual_nutrients wird bei jeder Mahlzeit inkrementell gepflegt
+    log_result = await db.execute(
+        text("""
+            SELECT actual_nutrients, target_nutrients, hydration_water_ml, hydration_total_ml,
+                   health_data, ai_summary
+            FROM daily_logs WHERE user_id = :uid AND log_date = :date
+        """),
+        {"uid": user_id, "date": target_date},
+    )
+    log_data = log_result.mappings().first()
+    actual = nutrients_from_log(log_data["actual_nutrients"] if log_data else None)
 
     # Soll-Naehrstoffe: aus User-Profil oder frisch berechnen
-    user_target = user.get("target_nutrients")
-    if user_target:
-        if isinstance(user_target, str):
-            user_target = json.loads(user_target)
-        target = NutrientProfile(**user_target)
-    else:
-        target = calculate_target_nutrients(user)
+    target = resolve_target_nutrients(user)
 
     # Defizite berechnen
     deficits = calculate_deficits(actual, target)
 
-    # UPSERT in daily_logs — Tagesbilanz speichern/aktualisieren
-    await db.execute(
-        text("""
-            INSERT INTO daily_logs (user_id, log_date, target_nutrients, actual_nutrients,
-                                    caffeine_total_mg, alcohol_total_g)
-            VALUES (:uid, :date, :target, :actual, :caffeine, :alcohol)
-            ON CONFLICT (user_id, log_date)
-            DO UPDATE SET
-                target_nutrients = EXCLUDED.target_nutrients,
-                actual_nutrients = EXCLUDED.actual_nutrients,
-                caffeine_total_mg = EXCLUDED.caffeine_total_mg,
-                alcohol_total_g = EXCLUDED.alcohol_total_g,
-                updated_at = NOW()
-        """),
-        {
-            "uid": user_id,
-            "date": target_date,
-            "target": target.model_dump_json(),
-            "actual": actual.model_dump_json(),
-            "caffeine": actual.caffeine,
-            "alcohol": actual.alcohol,
-        },
-    )
+    # Zielwert-Snapshot nur schreiben, wenn er fehlt oder sich geaendert hat
+    stored_target = log_data["target_nutrients"] if log_data else None
+    if isinstance(stored_target, str):
+        stored_target = json.loads(stored_target)
+    if log_data and stored_target != target.model_dump():
+        await db.execute(
+            text("""
+                UPDATE daily_logs SET target_nutrients = :target
+                WHERE user_id = :uid AND log_date = :date
+            """),
+            {"uid": user_id, "date": target_date, "target": target.model_dump_json()},
+        )
 
     # Mahlzeiten des Tages laden
     meals_result = await db.execute(
@@ -77,7 +70,10 @@ async def get_daily_log(
                        'id', fi.id, 'name', fi.name, 'amount', fi.amount,
                        'unit', fi.unit, 'normalized_grams', fi.normalized_grams,
                        'calculated_nutrients', fi.calculated_nutrients
-                   ) ORDER BY fi.sort_order) FILTER (WHERE fi.id IS NOT NULL), '[]') as items
+                   ) ORDER BY fi.sort_order) FILTER (WHERE fi.id IS NOT NULL), '[]') as items,
+                   -- nutrient_vector[1] = calories, [2] = protein (siehe 007_nutrient_vector.sql)
+                   COALESCE(SUM(fi.nutrient_vector[1]), 0) as total_calories,
+                   COALESCE(SUM(fi.nutrient_vector[2]), 0) as total_protein
             FROM food_entries fe
             LEFT JOIN food_items fi ON fi.food_entry_id = fe.id
             WHERE fe.user_id = :uid AND fe.meal_date = :date
@@ -95,16 +91,11 @@ async def get_daily_log(
         if isinstance(items_data, str):
             items_data = json.loads(items_data)
 
-        total_cal = 0.0
-        total_prot = 0.0
         parsed_items = []
         for item in items_data:
             nutrients = item.get("calculated_nutrients")
             if isinstance(nutrients, str):
                 nutrients = json.loads(nutrients)
-            if nutrients:
-                total_cal += nutrients.get("calories", 0) or 0
-                total_prot += nutrients.get("protein", 0) or 0
             parsed_items.append({
                 "id": str(item["id"]),
                 "name": item["name"],
@@ -122,20 +113,10 @@ async def get_daily_log(
             "ai_feedback": row["ai_feedback"],
             "ai_feedback_knowledge_links": row["ai_feedback_knowledge_links"] or [],
             "logged_at": row["logged_at"],
-            "total_calories": round(total_cal, 1),
-            "total_protein": round(total_prot, 1),
+            "total_calories": round(row["total_calories"], 1),
+            "total_protein": round(row["total_protein"], 1),
         })
 
-    # Bestehenden Log laden fuer Hydration und Health-Daten
-    existing_log = await db.execute(
-        text("""
-            SELECT hydration_water_ml, hydration_total_ml, health_data, ai_summary
-            FROM daily_logs WHERE user_id = :uid AND log_date = :date
-        """),
-        {"uid": user_id, "date": target_date},
-    )
-    log_data = existing_log.mappings().first()
-
     return DailyLogResponse(
         log_date=target_date,
         target_nutrients=target,
@@ -151,6 +132,23 @@ async def get_daily_log(
     )
 
 
+@router.get("/totals", response_model=list[DailyTotals])
+async def get_daily_totals(
+    start: date = Query(default=None),
+    end: date = Query(default=None),
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Nährstoff-Summen je Tag (Standard: letzte 7 Tage) — in Postgres summiert."""
+    end_date = end or date.today()
+    start_date = start or end_date - timedelta(days=6)
+    if start_date > end_date:
+        raise HTTPException(400, "start muss vor end liegen")
+    if (end_date - start_date).days > 366:
+        raise HTTPException(400, "Maximal 366 Tage pro Abfrage")
+    return await sum_nutrients_by_day(user["id"], start_date, end_date, db)
+
+
 @router.get("/week")
 async def get_week_overview(
     user: dict = Depends(get_current_user),
@@ -160,13 +158,7 @@ async def get_week_overview(
     trends = await get_week_trends(user["id"], db)
 
     # Soll-Naehrstoffe fuer Kontext mitgeben
-    user_target = user.get("target_nutrients")
-    if user_target:
-        if isinstance(user_target, str):
-            user_target = json.loads(user_target)
-        target = NutrientProfile(**user_target)
-    else:
-        target = calculate_target_nutrients(user)
+    target = resolve_target_nutrients(user)
 
     return {
         "start_date": trends["start_date"],
@@ -1,13 +1,19 @@
 """Nourish API — Knowledge Base (Wissensdatenbank)."""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
+from app.core.config import get_settings
 from app.core.database import get_db
+from app.core.metrics import metrics
 from app.models.schemas import KnowledgeArticleListItem, KnowledgeArticleResponse
+from app.services import knowledge_cache
 
 router = APIRouter()
+settings = get_settings()
 
 
 @router.get("", response_model=list[KnowledgeArticleListItem])
@@ -80,35 +86,30 @@ async def search_articles(
 
 
 @router.get("/{slug}", response_model=KnowledgeArticleResponse)
-async def get_article(slug: str, db: AsyncSession = Depends(get_db)):
-    """Einzelnen Wissensartikel mit Health Effects und Studien laden."""
-    # Artikel
-    result = await db.execute(
-        text("SELECT * FROM knowledge_articles WHERE slug = :slug AND is_published = TRUE"),
-        {"slug": slug},
-    )
-    article = result.mappings().first()
-    if not article:
+async def get_article(
+    slug: str,
+    if_none_match: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Einzelnen Wissensartikel mit Health Effects und Studien laden.
+    Mit ETag + Cache-Control: Clients/CDNs revalidieren per If-None-Match und bekommen 304.
+    """
+    article = await knowledge_cache.get_article(slug, db)
+    if article is None:
         raise HTTPException(404, "Artikel nicht gefunden")
 
-    article_id = article["id"]
+    headers = {
+        "ETag": article["etag"],
+        "Cache-Control": f"public, max-age={settings.knowledge_max_age_seconds}",
+    }
+    if if_none_match and _etag_matches(if_none_match, article["etag"]):
+        metrics.incr("knowledge.not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=article["body"], media_type="application/json", headers=headers)
 
-    # Health Effects
-    effects_result = await db.execute(
-        text("SELECT * FROM health_effects WHERE article_id = :aid ORDER BY sort_order"),
-        {"aid": article_id},
-    )
-    effects = [dict(row) for row in effects_result.mappings()]
 
-    # Studien
-    studies_result = await db.execute(
-        text("SELECT * FROM study_references WHERE article_id = :aid ORDER BY sort_order"),
-        {"aid": article_id},
-    )
-    studies = [dict(row) for row in studies_result.mappings()]
-
-    return {
-        **dict(article),
-        "effects": effects,
-        "studies": studies,
-    }
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match: Liste von ETags oder "*"; schwache Vergleiche (W/) zaehlen als Treffer."""
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
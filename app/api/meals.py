@@ -1,61 +1,39 @@
 """Nourish API — Mahlzeiten erfassen und verwalten."""
 
+import asyncio
 import logging
 import json as json_mod
+import time
 from datetime import date as date_type, datetime, time as time_type
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from app.core.database import get_db
+from app.core.config import get_settings
+from app.core.database import get_db, session_scope
 from app.core.auth import get_current_user
+from app.core.metrics import metrics
 from app.models.schemas import (
-    VoiceInput, TextInput, PhotoInput, MealUpdate, MealResponse, MealType, NutrientProfile,
+    VoiceInput, TextInput, PhotoInput, MealUpdate, MealResponse, MealFeedback, MealTotals, MealType,
+    NutrientProfile,
+)
+from app.services.claude_service import (
+    generate_meal_feedback, parse_food_input, parse_food_input_with_feedback,
+)
+from app.services.nutrition_service import lookup_food, calculate_nutrient_vector
+from app.services.chat_context import invalidate_chat_context
+from app.services.feedback_worker import enqueue_feedback
+from app.services.balance_service import (
+    apply_daily_delta, load_daily_balance, resolve_target_nutrients, sum_nutrients_by_meal,
+)
+from app.services.nutrient_engine import from_arrays, sum_vectors, to_profile, total
+from app.services.quick_parser import (
+    UNIT_GRAMS, WEIGHT_PER_PIECE, detect_meal_type_from_text, parse_locally,
 )
-from app.services.claude_service import parse_food_input, generate_meal_feedback
-from app.services.nutrition_service import lookup_food, calculate_nutrients
 
 log = logging.getLogger(__name__)
 router = APIRouter()
-
-
-# ── Einheiten-Umrechnung: Stück/EL/TL/etc. → Gramm ──
-
-# Durchschnittsgewichte pro Stück (in Gramm)
-_WEIGHT_PER_PIECE: dict[str, float] = {
-    "ei": 60.0, "eier": 60.0, "hühnerei": 60.0,
-    "avocado": 150.0,
-    "apfel": 180.0, "banane": 120.0, "orange": 170.0,
-    "tomate": 120.0, "tomaten": 120.0, "cherrytomate": 15.0, "cherrytomaten": 15.0,
-    "kartoffel": 150.0, "kartoffeln": 150.0,
-    "zwiebel": 80.0, "knoblauchzehe": 4.0, "knoblauch": 4.0,
-    "paprika": 160.0,
-    "gurke": 400.0, "salatgurke": 400.0,
-    "möhre": 80.0, "karotte": 80.0, "möhren": 80.0, "karotten": 80.0,
-    "brötchen": 60.0, "scheibe brot": 50.0,
-    "kiwi": 75.0, "pfirsich": 150.0, "birne": 180.0, "pflaume": 60.0,
-    "mandarine": 70.0, "zitrone": 80.0,
-}
-
-# Generische Einheiten-Gewichte (in Gramm)
-_UNIT_GRAMS: dict[str, float] = {
-    "g": 1.0,
-    "kg": 1000.0,
-    "ml": 1.0,
-    "l": 1000.0,
-    "el": 15.0,        # Esslöffel
-    "tl": 5.0,         # Teelöffel
-    "esslöffel": 15.0,
-    "teelöffel": 5.0,
-    "tasse": 250.0,
-    "becher": 200.0,
-    "glas": 250.0,
-    "handvoll": 40.0,
-    "scheibe": 30.0,    # Brot, Käse, Wurst
-    "portion": 200.0,
-    "packung": 200.0,
-    "dose": 400.0,
-}
+settings = get_settings()
 
 
 def _normalize_grams(name: str, amount: float, unit: str) -> float:
@@ -72,20 +50,20 @@ def _normalize_grams(name: str, amount: float, unit: str) -> float:
 
     # 1. Direkte metrische Einheiten
     if unit_lower in ("g", "kg", "ml", "l"):
-        factor = _UNIT_GRAMS.get(unit_lower, 1.0)
+        factor = UNIT_GRAMS.get(unit_lower, 1.0)
         grams = amount * factor
         log.info("[UNIT] %s: %.1f %s → %.0fg (metrisch)", name, amount, unit, grams)
         return grams
 
     # 2. Stück → lebensmittelspezifisches Gewicht
     if unit_lower in ("stück", "stk", "stk.", "st"):
-        piece_weight = _WEIGHT_PER_PIECE.get(name_lower, 100.0)
+        piece_weight = WEIGHT_PER_PIECE.get(name_lower, 100.0)
         grams = amount * piece_weight
         log.info("[UNIT] %s: %.0f Stück × %.0fg = %.0fg", name, amount, piece_weight, grams)
         return grams
 
     # 3. Generische Einheiten (EL, TL, Tasse, Scheibe, etc.)
-    generic = _UNIT_GRAMS.get(unit_lower)
+    generic = UNIT_GRAMS.get(unit_lower)
     if generic:
         grams = amount * generic
         log.info("[UNIT] %s: %.1f %s × %.0fg = %.0fg", name, amount, unit, generic, grams)
@@ -96,6 +74,105 @@ def _normalize_grams(name: str, amount: float, unit: str) -> float:
     return amount
 
 
+async def _resolve_item(item: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Schlaegt ein einzelnes Item nach und berechnet seine Nährstoffe.
+
+    Jeder Lookup bekommt eine eigene Session — eine AsyncSession darf nicht
+    von mehreren Tasks gleichzeitig benutzt werden.
+    """
+    async with semaphore:
+        # Nährstoffe finden (erst persönliche Bibliothek, dann extern)
+        # TODO: Erst in products des Users suchen
+        async with session_scope() as lookup_db:
+            food_data = await lookup_food(item["name"], db=lookup_db)
+
+    nutrients = vector = None
+    normalized_grams = _normalize_grams(
+        item["name"], item["amount"], item.get("unit", "g")
+    )
+
+    if food_data and "nutrients_per_100" in food_data:
+        per_100 = food_data.get("per_100_vector")
+        vector = calculate_nutrient_vector(
+            food_data["nutrients_per_100"] if per_100 is None else per_100, normalized_grams,
+            food_name=f"{item['name']} (→ {food_data.get('name', '?')} via {food_data.get('source', '?')})",
+        )
+        nutrients = to_profile(vector, decimals=None)  # scale rundet bereits
+
+    return {
+        "name": item["name"],
+        "amount": item["amount"],
+        "unit": item.get("unit", "g"),
+        "normalized_grams": normalized_grams,
+        "calculated_nutrients": nutrients,
+        # Vektor fuer food_items.nutrient_vector und die Tagesbilanz (nicht Teil der Antwort)
+        "nutrient_vector": vector,
+    }
+
+
+async def _resolve_items(parsed_items: list[dict], db: AsyncSession) -> list[dict]:
+    """Löst alle Items einer Mahlzeit parallel auf (begrenzt durch meal_lookup_concurrency).
+
+    Vorher gibt die Request-Session ihre Verbindung frei (Commit — bis hierhin darf der
+    Aufrufer nichts geschrieben haben, was nicht committet werden soll). Sonst haelt jeder
+    Request eine Verbindung, waehrend er auf weitere fuer die Lookups wartet, und bei
+    vollem Pool warten alle aufeinander.
+    """
+    if db.in_transaction():
+        await db.commit()
+    semaphore = asyncio.Semaphore(max(1, settings.meal_lookup_concurrency))
+    return list(await asyncio.gather(
+        *(_resolve_item(item, semaphore) for item in parsed_items)
+    ))
+
+
+async def _insert_food_items(db: AsyncSession, entry_id, food_items: list[dict]) -> None:
+    """Schreibt alle Items einer Mahlzeit in einem Multi-Row-INSERT und setzt ihre IDs."""
+    if not food_items:
+        return
+
+    values = []
+    params = {"eid": entry_id}
+    for i, fi in enumerate(food_items):
+        values.append(
+            f"(:eid, :name_{i}, :amount_{i}, :unit_{i}, :grams_{i}, :nutrients_{i}, :vector_{i}, :order_{i})"
+        )
+        nutrients = fi["calculated_nutrients"]
+        vector = fi["nutrient_vector"]
+        params.update({
+            f"name_{i}": fi["name"],
+            f"amount_{i}": fi["amount"],
+            f"unit_{i}": fi["unit"],
+            f"grams_{i}": fi["normalized_grams"],
+            f"nutrients_{i}": nutrients.model_dump_json() if nutrients else None,
+            f"vector_{i}": vector.tolist() if vector is not None else None,
+            f"order_{i}": i,
+        })
+
+    result = await db.execute(
+        text(f"""
+            INSERT INTO food_items (food_entry_id, name, amount, unit, normalized_grams,
+                                    calculated_nutrients, nutrient_vector, sort_order)
+            VALUES {", ".join(values)}
+            RETURNING id, sort_order
+        """),
+        params,
+    )
+    for row in result.mappings():
+        food_items[row["sort_order"]]["id"] = str(row["id"])
+
+
+def _sum_items(food_items: list[dict]):
+    """Summenvektor der Nährstoffe frisch berechneter Items (nutrient_vector oder None)."""
+    return sum_vectors([fi["nutrient_vector"] for fi in food_items if fi["nutrient_vector"] is not None])
+
+
+async def _generate_feedback(parsed_items: list[dict], user: dict, daily_balance: dict) -> str:
+    """KI-Feedback mit Stage-Timing — braucht nur die geparsten Items, das Profil und die Tagesbilanz."""
+    with metrics.timer("meal.stage.feedback_ms"):
+        return await generate_meal_feedback(parsed_items, user, daily_balance)
+
+
 async def _process_meal(
     parsed_items: list[dict],
     meal_type: MealType,
@@ -104,78 +181,81 @@ async def _process_meal(
     user: dict,
     db: AsyncSession,
     meal_time: time_type | None = None,
+    ai_feedback: str | None = None,
 ) -> MealResponse:
-    """Gemeinsame Logik für alle Eingabemethoden."""
-    effective_time = meal_time or datetime.now().time().replace(second=0, microsecond=0)
+    """Gemeinsame Logik für alle Eingabemethoden.
 
-    # 1. Mahlzeit-Eintrag erstellen
-    result = await db.execute(
-        text("""
-            INSERT INTO food_entries (user_id, meal_type, input_method, raw_input, meal_date, meal_time)
-            VALUES (:uid, :mt, :im, :raw, :date, :mtime)
-            RETURNING id, logged_at
-        """),
-        {
-            "uid": user["id"], "mt": meal_type.value,
-            "im": input_method, "raw": raw_input,
-            "date": date_type.today(), "mtime": effective_time,
-        },
+    ai_feedback: bereits beim Parsen erzeugtes Feedback (MEAL_PARSE_MODE=combined).
+    """
+    effective_time = meal_time or datetime.now().time().replace(second=0, microsecond=0)
+    meal_date = date_type.today()
+
+    start = time.perf_counter()
+    mode = "combined" if ai_feedback is not None else settings.meal_feedback_mode
+    # Tagesbilanz vor dieser Mahlzeit (wie beim kombinierten Parse-Call)
+    daily_balance = await load_daily_balance(user, meal_date, db) if mode in ("parallel", "inline") else None
+    # parallel: Feedback braucht nur Items + Profil + Bilanz → sofort starten, am Ende einsammeln
+    feedback_task = (
+        asyncio.create_task(_generate_feedback(parsed_items, user, daily_balance)) if mode == "parallel" else None
     )
-    entry = result.mappings().first()
-    entry_id = entry["id"]
+    feedback_status = "pending" if mode == "background" else "done"
 
-    # 2. Für jedes Item: Nährstoffe nachschlagen und berechnen
-    food_items = []
-    for i, item in enumerate(parsed_items):
-        # Nährstoffe finden (erst persönliche Bibliothek, dann extern)
-        # TODO: Erst in products des Users suchen
-        food_data = await lookup_food(item["name"], db=db)
+    try:
+        # 1. Nährstoffe aller Items parallel nachschlagen (noch ohne offene Schreib-Transaktion)
+        with metrics.timer("meal.stage.lookup_ms"):
+            food_items = await _resolve_items(parsed_items, db)
 
-        nutrients = None
-        normalized_grams = _normalize_grams(
-            item["name"], item["amount"], item.get("unit", "g")
-        )
-
-        if food_data and "nutrients_per_100" in food_data:
-            nutrients = calculate_nutrients(
-                food_data["nutrients_per_100"], normalized_grams,
-                food_name=f"{item['name']} (→ {food_data.get('name', '?')} via {food_data.get('source', '?')})",
-            )
-
-        await db.execute(
+        # 2. Mahlzeit-Eintrag erstellen (Feedback entsteht ggf. im Hintergrund)
+        result = await db.execute(
             text("""
-                INSERT INTO food_items (food_entry_id, name, amount, unit, normalized_grams, calculated_nutrients, sort_order)
-                VALUES (:eid, :name, :amount, :unit, :grams, :nutrients, :order)
+                INSERT INTO food_entries (user_id, meal_type, input_method, raw_input, meal_date, meal_time,
+                                          ai_feedback_status, ai_feedback_requested_at)
+                VALUES (:uid, :mt, :im, :raw, :date, :mtime, :fbs, now())
+                RETURNING id, logged_at
             """),
             {
-                "eid": entry_id, "name": item["name"],
-                "amount": item["amount"], "unit": item.get("unit", "g"),
-                "grams": normalized_grams,
-                "nutrients": nutrients.model_dump_json() if nutrients else None,
-                "order": i,
+                "uid": user["id"], "mt": meal_type.value,
+                "im": input_method, "raw": raw_input,
+                "date": meal_date, "mtime": effective_time, "fbs": feedback_status,
             },
         )
+        entry = result.mappings().first()
+        entry_id = entry["id"]
 
-        food_items.append({
-            "id": str(entry_id),  # Vereinfachung
-            "name": item["name"],
-            "amount": item["amount"],
-            "unit": item.get("unit", "g"),
-            "normalized_grams": normalized_grams,
-            "calculated_nutrients": nutrients,
-        })
+        # 3. Items in einem INSERT speichern
+        with metrics.timer("meal.stage.store_ms"):
+            await _insert_food_items(db, entry_id, food_items)
 
-    # 3. KI-Feedback generieren
-    # TODO: Tagesbilanz aus daily_logs holen
-    daily_balance = {}  # Placeholder
-    ai_feedback = await generate_meal_feedback(parsed_items, user, daily_balance)
+            # Tagesbilanz inkrementell fortschreiben (gleiche Transaktion)
+            await apply_daily_delta(
+                user["id"], meal_date, _sum_items(food_items), db,
+                target=resolve_target_nutrients(user),
+            )
+    except BaseException:
+        if feedback_task is not None:
+            feedback_task.cancel()
+        raise
+
+    if mode == "background":
+        # 4. Speichern, Feedback erzeugt der Worker (Client pollt GET /meals/{id}/feedback)
+        await db.commit()
+        invalidate_chat_context(user["id"])
+        enqueue_feedback(entry_id)
+        ai_feedback = None
+    else:
+        # 4. KI-Feedback einsammeln (parallel) bzw. jetzt generieren (inline)
+        if ai_feedback is None:
+            with metrics.timer("meal.stage.feedback_wait_ms"):
+                ai_feedback = await (feedback_task or _generate_feedback(parsed_items, user, daily_balance))
 
-    # 4. Feedback speichern
-    await db.execute(
-        text("UPDATE food_entries SET ai_feedback = :fb WHERE id = :eid"),
-        {"fb": ai_feedback, "eid": entry_id},
-    )
-    await db.commit()
+        # 5. Feedback speichern
+        await db.execute(
+            text("UPDATE food_entries SET ai_feedback = :fb WHERE id = :eid"),
+            {"fb": ai_feedback, "eid": entry_id},
+        )
+        await db.commit()
+        invalidate_chat_context(user["id"])
+    metrics.observe(f"meal.process_ms.{mode}", (time.perf_counter() - start) * 1000)
 
     # Gesamtkalorien/-protein berechnen
     total_cal = sum(
@@ -196,6 +276,7 @@ async def _process_meal(
         items=food_items,
         ai_feedback=ai_feedback,
         ai_feedback_knowledge_links=[],
+        ai_feedback_status=feedback_status,
         logged_at=entry["logged_at"],
         meal_time=effective_time.strftime("%H:%M"),
         total_calories=total_cal,
@@ -203,6 +284,25 @@ async def _process_meal(
     )
 
 
+async def _parse_input(
+    raw_input: str, user: dict, db: AsyncSession, meal_date: date_type | None = None,
+) -> dict:
+    """
+    Einfache Eingaben parst der lokale Parser; Claude nur bei niedriger Konfidenz.
+    Mit MEAL_PARSE_MODE=combined liefert derselbe Claude-Call auch das Feedback ("feedback"),
+    bezogen auf die Tagesbilanz von meal_date (Standard: heute).
+    """
+    with metrics.timer("meal.stage.parse_ms"):
+        parsed = parse_locally(raw_input)
+        if parsed is not None:
+            log.info("[PARSE] Lokal geparst: %d Items", len(parsed["items"]))
+            return parsed
+        if settings.meal_parse_mode == "combined":
+            daily_balance = await load_daily_balance(user, meal_date or date_type.today(), db)
+            return await parse_food_input_with_feedback(raw_input, user, daily_balance, db)
+        return await parse_food_input(raw_input, db)
+
+
 def _parse_meal_time(meal_time_str: str | None) -> time_type:
     """Parst 'HH:MM' String zu time. Fallback: aktuelle Serverzeit."""
     if meal_time_str:
@@ -214,29 +314,6 @@ def _parse_meal_time(meal_time_str: str | None) -> time_type:
     return datetime.now().time().replace(second=0, microsecond=0)
 
 
-def _detect_meal_type_from_text(raw_input: str) -> MealType | None:
-    """Erkennt den Mahlzeittyp aus Keywords im Text. Gibt None zurueck wenn nichts erkannt."""
-    lower = raw_input.lower()
-    breakfast_kw = ("frühstück", "morgens", "morning", "zum frühstück", "heute morgen")
-    lunch_kw = ("mittag", "mittagessen", "lunch", "zum mittag")
-    dinner_kw = ("abend", "abendessen", "abendbrot", "dinner", "zum abend")
-    snack_kw = ("snack", "zwischendurch", "zwischenmahlzeit", "nachmittags")
-
-    for kw in breakfast_kw:
-        if kw in lower:
-            return MealType.breakfast
-    for kw in lunch_kw:
-        if kw in lower:
-            return MealType.lunch
-    for kw in dinner_kw:
-        if kw in lower:
-            return MealType.dinner
-    for kw in snack_kw:
-        if kw in lower:
-            return MealType.snack
-    return None
-
-
 def _detect_meal_type_from_time(meal_time: time_type) -> MealType:
     """Leitet den Mahlzeittyp aus der Uhrzeit ab."""
     h, m = meal_time.hour, meal_time.minute
@@ -262,14 +339,17 @@ async def create_meal_voice(
     db: AsyncSession = Depends(get_db),
 ):
     """Verarbeitet Spracheingabe → Mahlzeit."""
-    parsed = await parse_food_input(body.transcript)
+    parsed = await _parse_input(body.transcript, user, db)
     parsed_items = parsed["items"]
     if not parsed_items:
         raise HTTPException(400, "Konnte keine Lebensmittel erkennen. Bitte nochmal versuchen.")
 
     meal_time = _parse_meal_time(parsed.get("meal_time"))
-    meal_type = body.meal_type or _detect_meal_type_from_text(body.transcript) or _detect_meal_type_from_time(meal_time)
-    return await _process_meal(parsed_items, meal_type, "voice", body.transcript, user, db, meal_time=meal_time)
+    meal_type = body.meal_type or detect_meal_type_from_text(body.transcript) or _detect_meal_type_from_time(meal_time)
+    return await _process_meal(
+        parsed_items, meal_type, "voice", body.transcript, user, db,
+        meal_time=meal_time, ai_feedback=parsed.get("feedback"),
+    )
 
 
 @router.post("/text", response_model=MealResponse)
@@ -279,14 +359,17 @@ async def create_meal_text(
     db: AsyncSession = Depends(get_db),
 ):
     """Verarbeitet Texteingabe → Mahlzeit."""
-    parsed = await parse_food_input(body.text)
+    parsed = await _parse_input(body.text, user, db)
     parsed_items = parsed["items"]
     if not parsed_items:
         raise HTTPException(400, "Konnte keine Lebensmittel erkennen.")
 
     meal_time = _parse_meal_time(parsed.get("meal_time"))
-    meal_type = body.meal_type or _detect_meal_type_from_text(body.text) or _detect_meal_type_from_time(meal_time)
-    return await _process_meal(parsed_items, meal_type, "text", body.text, user, db, meal_time=meal_time)
+    meal_type = body.meal_type or detect_meal_type_from_text(body.text) or _detect_meal_type_from_time(meal_time)
+    return await _process_meal(
+        parsed_items, meal_type, "text", body.text, user, db,
+        meal_time=meal_time, ai_feedback=parsed.get("feedback"),
+    )
 
 
 @router.get("", response_model=list[MealResponse])
@@ -301,13 +384,16 @@ async def get_meals(
     result = await db.execute(
         text("""
             SELECT fe.id, fe.meal_type, fe.input_method, fe.ai_feedback,
-                   fe.ai_feedback_knowledge_links, fe.logged_at,
+                   fe.ai_feedback_knowledge_links, fe.ai_feedback_status, fe.logged_at,
                    fe.meal_time,
                    COALESCE(json_agg(json_build_object(
                        'id', fi.id, 'name', fi.name, 'amount', fi.amount,
                        'unit', fi.unit, 'normalized_grams', fi.normalized_grams,
                        'calculated_nutrients', fi.calculated_nutrients
-                   ) ORDER BY fi.sort_order) FILTER (WHERE fi.id IS NOT NULL), '[]') as items
+                   ) ORDER BY fi.sort_order) FILTER (WHERE fi.id IS NOT NULL), '[]') as items,
+                   -- nutrient_vector[1] = calories, [2] = protein (siehe 007_nutrient_vector.sql)
+                   COALESCE(SUM(fi.nutrient_vector[1]), 0) as total_calories,
+                   COALESCE(SUM(fi.nutrient_vector[2]), 0) as total_protein
             FROM food_entries fe
             LEFT JOIN food_items fi ON fi.food_entry_id = fe.id
             WHERE fe.user_id = :uid AND fe.meal_date = :date
@@ -323,16 +409,11 @@ async def get_meals(
         if isinstance(items_data, str):
             items_data = json_mod.loads(items_data)
 
-        total_cal = 0.0
-        total_prot = 0.0
         parsed_items = []
         for item in items_data:
             nutrients = item.get("calculated_nutrients")
             if isinstance(nutrients, str):
                 nutrients = json_mod.loads(nutrients)
-            if nutrients:
-                total_cal += nutrients.get("calories", 0) or 0
-                total_prot += nutrients.get("protein", 0) or 0
             parsed_items.append({
                 "id": item["id"],
                 "name": item["name"],
@@ -352,15 +433,52 @@ async def get_meals(
             items=parsed_items,
             ai_feedback=row["ai_feedback"],
             ai_feedback_knowledge_links=row["ai_feedback_knowledge_links"] or [],
+            ai_feedback_status=row["ai_feedback_status"],
             logged_at=row["logged_at"],
             meal_time=meal_time_str,
-            total_calories=round(total_cal, 1),
-            total_protein=round(total_prot, 1),
+            total_calories=round(row["total_calories"], 1),
+            total_protein=round(row["total_protein"], 1),
         ))
 
     return meals
 
 
+@router.get("/totals", response_model=list[MealTotals])
+async def get_meal_totals(
+    meal_date: date_type = Query(default=None, alias="date"),
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Nährstoff-Summen je Mahlzeit eines Tages — in Postgres summiert, ohne Item-Details."""
+    return await sum_nutrients_by_meal(user["id"], meal_date or date_type.today(), db)
+
+
+@router.get("/{meal_id}/feedback", response_model=MealFeedback)
+async def get_meal_feedback(
+    meal_id: str,
+    user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Status und Text des KI-Feedbacks — zum Pollen nach dem Erfassen einer Mahlzeit."""
+    result = await db.execute(
+        text("""
+            SELECT id, ai_feedback_status AS status, ai_feedback, ai_feedback_knowledge_links
+            FROM food_entries
+            WHERE id = :mid AND user_id = :uid
+        """),
+        {"mid": meal_id, "uid": user["id"]},
+    )
+    row = result.mappings().first()
+    if not row:
+        raise HTTPException(404, "Mahlzeit nicht gefunden")
+    return MealFeedback(
+        id=row["id"],
+        status=row["status"],
+        ai_feedback=row["ai_feedback"],
+        ai_feedback_knowledge_links=row["ai_feedback_knowledge_links"] or [],
+    )
+
+
 @router.put("/{meal_id}", response_model=MealResponse)
 async def update_meal(
     meal_id: str,
@@ -374,7 +492,7 @@ async def update_meal(
     result = await db.execute(
         text("""
             SELECT id, meal_type, input_method, raw_input, ai_feedback,
-                   ai_feedback_knowledge_links, logged_at, meal_time
+                   ai_feedback_knowledge_links, ai_feedback_status, logged_at, meal_time, meal_date
             FROM food_entries
             WHERE id = :mid AND user_id = :uid
         """),
@@ -392,66 +510,72 @@ async def update_meal(
 
     # 3. Falls neuer Text: Items komplett neu parsen
     if body.text:
-        parsed = await parse_food_input(body.text)
+        parsed = await _parse_input(body.text, user, db, meal_date=entry["meal_date"])
         parsed_items = parsed["items"]
         if not parsed_items:
             raise HTTPException(400, "Konnte keine Lebensmittel im neuen Text erkennen.")
 
-        # Alte Items loeschen
-        await db.execute(
-            text("DELETE FROM food_items WHERE food_entry_id = :eid"),
-            {"eid": entry["id"]},
+        # Neue Items nachschlagen (Feedback im Modus "parallel" gleichzeitig)
+        ai_feedback = parsed.get("feedback")
+        mode = "combined" if ai_feedback is not None else settings.meal_feedback_mode
+        daily_balance = (
+            await load_daily_balance(user, entry["meal_date"], db) if mode in ("parallel", "inline") else None
         )
+        feedback_task = (
+            asyncio.create_task(_generate_feedback(parsed_items, user, daily_balance)) if mode == "parallel" else None
+        )
+        try:
+            with metrics.timer("meal.stage.lookup_ms"):
+                food_items = await _resolve_items(parsed_items, db)
 
-        # Neue Items anlegen
-        food_items = []
-        for i, item in enumerate(parsed_items):
-            food_data = await lookup_food(item["name"], db=db)
-            nutrients = None
-            normalized_grams = _normalize_grams(
-                item["name"], item["amount"], item.get("unit", "g")
+            # Die Lookups liefen ohne Transaktion — Eintrag erneut pruefen und sperren
+            locked = await db.execute(
+                text("SELECT id FROM food_entries WHERE id = :mid AND user_id = :uid FOR UPDATE"),
+                {"mid": meal_id, "uid": user["id"]},
             )
-            if food_data and "nutrients_per_100" in food_data:
-                nutrients = calculate_nutrients(
-                    food_data["nutrients_per_100"], normalized_grams,
-                    food_name=f"{item['name']} (→ {food_data.get('name', '?')} via {food_data.get('source', '?')})",
-                )
-            await db.execute(
-                text("""
-                    INSERT INTO food_items (food_entry_id, name, amount, unit, normalized_grams, calculated_nutrients, sort_order)
-                    VALUES (:eid, :name, :amount, :unit, :grams, :nutrients, :order)
-                """),
-                {
-                    "eid": entry["id"], "name": item["name"],
-                    "amount": item["amount"], "unit": item.get("unit", "g"),
-                    "grams": normalized_grams,
-                    "nutrients": nutrients.model_dump_json() if nutrients else None,
-                    "order": i,
-                },
+            if locked.first() is None:
+                raise HTTPException(404, "Mahlzeit nicht gefunden")
+
+            # Alte Items loeschen (ihre Nährstoffe fuer das Tagesbilanz-Delta merken)
+            deleted = await db.execute(
+                text("DELETE FROM food_items WHERE food_entry_id = :eid RETURNING nutrient_vector"),
+                {"eid": entry["id"]},
             )
-            food_items.append({
-                "id": str(entry["id"]),
-                "name": item["name"],
-                "amount": item["amount"],
-                "unit": item.get("unit", "g"),
-                "normalized_grams": normalized_grams,
-                "calculated_nutrients": nutrients,
-            })
+            old_totals = total(from_arrays(row[0] for row in deleted))
 
-        # Neues AI-Feedback generieren
-        daily_balance = {}
-        ai_feedback = await generate_meal_feedback(parsed_items, user, daily_balance)
+            with metrics.timer("meal.stage.store_ms"):
+                await _insert_food_items(db, entry["id"], food_items)
+                await apply_daily_delta(
+                    user["id"], entry["meal_date"],
+                    _sum_items(food_items) - old_totals, db,
+                )
+        except BaseException:
+            if feedback_task is not None:
+                feedback_task.cancel()
+            raise
+
+        if mode == "background":
+            # Neues AI-Feedback im Hintergrund; laufende Jobs fuer die alten Items verwerfen ihr Ergebnis
+            ai_feedback = None
+            feedback_status = "pending"
+        else:
+            if ai_feedback is None:
+                with metrics.timer("meal.stage.feedback_wait_ms"):
+                    ai_feedback = await (feedback_task or _generate_feedback(parsed_items, user, daily_balance))
+            feedback_status = "done"
 
         # Entry updaten (inkl. raw_input und ai_feedback)
         await db.execute(
             text("""
                 UPDATE food_entries
-                SET meal_type = :mt, meal_time = :mtime, raw_input = :raw, ai_feedback = :fb
+                SET meal_type = :mt, meal_time = :mtime, raw_input = :raw, ai_feedback = :fb,
+                    ai_feedback_status = :fbs, ai_feedback_attempts = 0,
+                    ai_feedback_requested_at = now()
                 WHERE id = :eid
             """),
             {
                 "mt": new_meal_type, "mtime": new_meal_time,
-                "raw": body.text, "fb": ai_feedback, "eid": entry["id"],
+                "raw": body.text, "fb": ai_feedback, "fbs": feedback_status, "eid": entry["id"],
             },
         )
     else:
@@ -461,6 +585,7 @@ async def update_meal(
             {"mt": new_meal_type, "mtime": new_meal_time, "eid": entry["id"]},
         )
         ai_feedback = entry["ai_feedback"]
+        feedback_status = entry["ai_feedback_status"]
 
         # Bestehende Items laden
         items_result = await db.execute(
@@ -485,6 +610,9 @@ async def update_meal(
             })
 
     await db.commit()
+    invalidate_chat_context(user["id"])
+    if body.text and feedback_status == "pending":
+        enqueue_feedback(entry["id"])
 
     # Totals berechnen
     total_cal = sum(
@@ -505,6 +633,7 @@ async def update_meal(
         items=food_items,
         ai_feedback=ai_feedback,
         ai_feedback_knowledge_links=entry["ai_feedback_knowledge_links"] or [],
+        ai_feedback_status=feedback_status,
         logged_at=entry["logged_at"],
         meal_time=mt_str,
         total_calories=round(total_cal, 1),
@@ -518,12 +647,26 @@ async def delete_meal(
     user: dict = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Löscht eine Mahlzeit."""
+    """Löscht eine Mahlzeit und zieht ihre Nährstoffe von der Tagesbilanz ab."""
+    # Das SELECT sieht den Snapshot vor dem DELETE — die Items (ON DELETE CASCADE) sind noch lesbar
     result = await db.execute(
-        text("DELETE FROM food_entries WHERE id = :mid AND user_id = :uid RETURNING id"),
+        text("""
+            WITH deleted AS (
+                DELETE FROM food_entries WHERE id = :mid AND user_id = :uid
+                RETURNING id, meal_date
+            )
+            SELECT d.meal_date, fi.nutrient_vector
+            FROM deleted d
+            LEFT JOIN food_items fi ON fi.food_entry_id = d.id
+        """),
         {"mid": meal_id, "uid": user["id"]},
     )
-    if not result.first():
+    rows = result.all()
+    if not rows:
         raise HTTPException(404, "Mahlzeit nicht gefunden")
+
+    removed = total(from_arrays(row[1] for row in rows))
+    await apply_daily_delta(user["id"], rows[0][0], -removed, db)
     await db.commit()
+    invalidate_chat_context(user["id"])
     return {"deleted": True}
@@ -5,8 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from app.core.database import get_db
-from app.core.auth import get_current_user
+from app.core.auth import cache_user, get_current_user, invalidate_cached_user
 from app.models.schemas import UserUpdate, UserResponse
+from app.services.chat_context import invalidate_chat_context
 
 router = APIRouter()
 
@@ -37,13 +38,19 @@ async def update_profile(
     for key, value in update_fields.items():
         set_clauses.append(f"{key} = :{key}")
         params[key] = value
+    set_clauses.append("profile_version = profile_version + 1")
 
     query = f"UPDATE users SET {', '.join(set_clauses)} WHERE id = :user_id RETURNING *"
     result = await db.execute(text(query), params)
-    updated = result.mappings().first()
+    updated = dict(result.mappings().first())
     await db.commit()
 
+    # Gecachte User-Zeile ersetzen, damit Folge-Requests das neue Profil sehen
+    invalidate_cached_user(user)
+    cache_user(updated)
+    invalidate_chat_context(user["id"])
+
     # TODO: target_nutrients neu berechnen wenn relevante Felder geändert
     # (Gewicht, Größe, Alter, Aktivität, Ziel)
 
-    return dict(updated)
+    return updated
@@ -1,61 +1,116 @@
 """Nourish Backend — Apple Sign-In Authentifizierung."""
 
+import hashlib
+import hmac
+import secrets
+import time
 from typing import Optional
-from datetime import datetime, timezone
 import httpx
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import text
 
+from app.core.cache import SingleFlight, TTLCache
 from app.core.config import get_settings
 from app.core.database import get_db
+from app.core.metrics import metrics
 
 settings = get_settings()
 security = HTTPBearer()
 
 # Apple's öffentliche Schlüssel für JWT-Verifizierung
 APPLE_KEYS_URL = "https://appleid.apple.com/auth/keys"
-_apple_keys_cache: Optional[dict] = None
 
 
-async def _get_apple_public_keys() -> dict:
-    """Holt Apples öffentliche Schlüssel (mit Caching)."""
-    global _apple_keys_cache
-    if _apple_keys_cache is None:
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(APPLE_KEYS_URL)
+class AppleJWKS:
+    """Apples JWKS mit vorgeparsten RSA-Keys pro kid.
+
+    - Refresh nach ttl Sekunden (Key-Rotation wird ohne Neustart uebernommen)
+    - Unbekannter kid → sofortiger Refresh, hoechstens alle min_refresh_interval Sekunden
+    - Gleichzeitige Refreshes werden per Single-Flight zu einem HTTP-Call gebuendelt
+    """
+
+    def __init__(self, url: str, ttl: float, min_refresh_interval: float) -> None:
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, object] = {}
+        self._fetched_at: float = 0.0
+        self._flight = SingleFlight()
+
+    async def _fetch(self) -> None:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            resp = await client.get(self.url)
             resp.raise_for_status()
-            _apple_keys_cache = resp.json()
-    return _apple_keys_cache
+            jwks = resp.json()
+        self._keys = {
+            key["kid"]: jwt.algorithms.RSAAlgorithm.from_jwk(key)
+            for key in jwks.get("keys", [])
+        }
+        self._fetched_at = time.monotonic()
+        metrics.incr("auth.apple.jwks_refresh")
+
+    async def refresh(self) -> None:
+        await self._flight.do("jwks", self._fetch)
+
+    async def get_key(self, kid: str):
+        age = time.monotonic() - self._fetched_at
+        if not self._keys or age > self.ttl:
+            await self.refresh()
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at >= self.min_refresh_interval:
+            # Evtl. rotiert — einmal neu laden
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+
+_apple_jwks = AppleJWKS(
+    APPLE_KEYS_URL,
+    ttl=settings.apple_jwks_ttl_seconds,
+    min_refresh_interval=settings.apple_jwks_min_refresh_seconds,
+)
+
+# Verifizierte Claims pro Token-Hash, hoechstens bis zum exp des Tokens
+_apple_claims_cache = TTLCache(
+    maxsize=settings.apple_claims_cache_size,
+    ttl=settings.apple_claims_cache_max_seconds,
+)
 
 
 async def verify_apple_token(identity_token: str) -> dict:
     """
     Verifiziert ein Apple Identity Token.
     Gibt die Token-Claims zurück (sub = Apple User ID).
+    Bereits verifizierte Tokens kommen bis zu ihrem Ablauf aus dem Cache.
     """
+    token_hash = hashlib.sha256(identity_token.encode()).hexdigest()
+    cached = _apple_claims_cache.get(token_hash)
+    if cached is not None and cached.get("exp", 0) > time.time():
+        metrics.incr("auth.apple.claims_cache.hit")
+        return dict(cached)
+    metrics.incr("auth.apple.claims_cache.miss")
+
     try:
         # Header dekodieren um den richtigen Schlüssel zu finden
         header = jwt.get_unverified_header(identity_token)
-        apple_keys = await _get_apple_public_keys()
-
-        # Passenden Schlüssel finden
-        key_data = None
-        for key in apple_keys.get("keys", []):
-            if key["kid"] == header["kid"]:
-                key_data = key
-                break
+        try:
+            public_key = await _apple_jwks.get_key(header.get("kid", ""))
+        except httpx.HTTPError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Apple public keys unavailable: {e}",
+            )
 
-        if not key_data:
+        if public_key is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Apple public key not found",
             )
 
         # Token verifizieren
-        public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key_data)
         claims = jwt.decode(
             identity_token,
             public_key,
@@ -64,8 +119,6 @@ async def verify_apple_token(identity_token: str) -> dict:
             issuer="https://appleid.apple.com",
         )
 
-        return claims
-
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -77,6 +130,201 @@ async def verify_apple_token(identity_token: str) -> dict:
             detail=f"Invalid Apple token: {e}",
         )
 
+    remaining = claims.get("exp", 0) - time.time()
+    if remaining > 0:
+        _apple_claims_cache.set(
+            token_hash, claims, ttl=min(remaining, settings.apple_claims_cache_max_seconds)
+        )
+    return claims
+
+
+# ── Session-Tokens (von uns ausgestellt, HS256) ──
+# Access-Token: kurzlebig, wird bei jedem Request lokal verifiziert (kein DB-/Netzwerk-Call).
+# Refresh-Token: langlebig, nur fuer POST /auth/refresh, jede jti genau einmal einloesbar.
+SESSION_ISSUER = "nourish-api"
+SESSION_ALGORITHM = "HS256"
+SESSION_SECRET_MIN_LENGTH = 32
+_PLACEHOLDER_SECRETS = {"change-me", "changeme", "secret", "your-secret", "session-secret"}
+
+
+def _session_secret() -> str:
+    """Signatur-Schluessel. Ohne SESSION_SECRET wird einer aus dem Supabase Service Key abgeleitet."""
+    if settings.session_secret:
+        secret = settings.session_secret
+        if secret.strip().lower() in _PLACEHOLDER_SECRETS or len(secret) < SESSION_SECRET_MIN_LENGTH:
+            raise RuntimeError(
+                f"SESSION_SECRET ist ein Platzhalter oder kuerzer als {SESSION_SECRET_MIN_LENGTH} Zeichen — "
+                "eigenes Secret setzen (z.B. `openssl rand -hex 32`) oder leer lassen"
+            )
+        return secret
+    return hmac.new(
+        settings.supabase_service_key.encode(), b"nourish-session-tokens", hashlib.sha256,
+    ).hexdigest()
+
+
+_SESSION_SECRET = _session_secret()
+
+
+def issue_session_tokens(user: dict) -> dict:
+    """Stellt Access- und Refresh-Token fuer einen User aus.
+
+    Die jti des Refresh-Tokens kommt als "refresh_jti" mit zurueck und muss per
+    store_refresh_token gespeichert werden, bevor das Token ausgeliefert wird.
+    """
+    now = int(time.time())
+    jti = secrets.token_hex(16)
+    base = {
+        "iss": SESSION_ISSUER,
+        "sub": str(user["id"]),
+        "ver": user.get("profile_version") or 0,
+        "iat": now,
+    }
+    access = jwt.encode(
+        {**base, "typ": "access", "exp": now + settings.session_access_ttl_seconds},
+        _SESSION_SECRET, algorithm=SESSION_ALGORITHM,
+    )
+    refresh = jwt.encode(
+        {**base, "typ": "refresh", "jti": jti, "exp": now + settings.session_refresh_ttl_seconds},
+        _SESSION_SECRET, algorithm=SESSION_ALGORITHM,
+    )
+    return {
+        "access_token": access,
+        "refresh_token": refresh,
+        "expires_in": settings.session_access_ttl_seconds,
+        "refresh_jti": jti,
+    }
+
+
+async def store_refresh_token(user_id, jti: str, db: AsyncSession) -> None:
+    """Registriert die jti eines neu ausgestellten Refresh-Tokens."""
+    await db.execute(
+        text("""
+            INSERT INTO refresh_tokens (jti, user_id, expires_at)
+            VALUES (:jti, :uid, NOW() + make_interval(secs => :ttl))
+        """),
+        {"jti": jti, "uid": user_id, "ttl": settings.session_refresh_ttl_seconds},
+    )
+
+
+async def consume_refresh_token(claims: dict, db: AsyncSession) -> None:
+    """
+    Loest ein Refresh-Token ein (einmalig). Wird eine bereits verbrauchte jti erneut
+    vorgelegt, gilt das Token als gestohlen — alle offenen Refresh-Tokens des Users
+    werden widerrufen.
+    """
+    jti = claims.get("jti")
+    if not jti:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token without jti — please sign in again",
+        )
+    result = await db.execute(
+        text("""
+            UPDATE refresh_tokens SET used_at = NOW()
+            WHERE jti = :jti AND user_id = :uid AND used_at IS NULL AND expires_at > NOW()
+            RETURNING jti
+        """),
+        {"jti": jti, "uid": claims["sub"]},
+    )
+    if result.first() is not None:
+        return
+
+    metrics.incr("auth.refresh.reused")
+    await db.execute(
+        text("UPDATE refresh_tokens SET used_at = NOW() WHERE user_id = :uid AND used_at IS NULL"),
+        {"uid": claims["sub"]},
+    )
+    await db.commit()
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token already used or revoked",
+    )
+
+
+def verify_session_token(token: str, token_type: str = "access") -> dict:
+    """Verifiziert ein Session-Token lokal (HMAC, konstante Vergleichszeit)."""
+    try:
+        claims = jwt.decode(
+            token,
+            _SESSION_SECRET,
+            algorithms=[SESSION_ALGORITHM],
+            issuer=SESSION_ISSUER,
+            options={"require": ["exp", "sub", "typ"]},
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session token expired",
+        )
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid session token: {e}",
+        )
+    if claims["typ"] != token_type:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Expected {token_type} token",
+        )
+    return claims
+
+
+def _is_session_token(token: str) -> bool:
+    try:
+        return jwt.get_unverified_header(token).get("alg") == SESSION_ALGORITHM
+    except jwt.InvalidTokenError:
+        return False
+
+
+# ── Cache fuer aufgeloeste User-Zeilen ──
+# Schluessel: ("id", user_id) und ("apple", apple_user_id) → dieselbe User-Zeile.
+# Invalidierung bei PUT /users/me gilt nur fuer diesen Worker; andere Worker
+# sehen Profil-Aenderungen spaetestens nach user_cache_ttl_seconds.
+_user_cache = TTLCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl_seconds)
+
+
+def cache_user(user: dict) -> None:
+    """Legt eine User-Zeile unter ID und Apple-ID im Cache ab."""
+    if settings.user_cache_ttl_seconds <= 0:
+        return
+    _user_cache.set(("id", str(user["id"])), user)
+    if user.get("apple_user_id"):
+        _user_cache.set(("apple", user["apple_user_id"]), user)
+
+
+def invalidate_cached_user(user: dict) -> None:
+    """Entfernt einen User aus dem Cache (z.B. nach Profil-Update)."""
+    _user_cache.pop(("id", str(user["id"])))
+    if user.get("apple_user_id"):
+        _user_cache.pop(("apple", user["apple_user_id"]))
+
+
+async def load_user(
+    column: str, value: str, db: AsyncSession, min_version: int = 0,
+) -> Optional[dict]:
+    """Laedt eine User-Zeile — erst aus dem Cache, sonst aus der DB.
+
+    min_version: Profil-Version aus dem Session-Token. Ist die gecachte Zeile
+    aelter, wird sie neu geladen.
+    """
+    key = ("id" if column == "id" else "apple", value)
+    cached = _user_cache.get(key)
+    if cached is not None and (cached.get("profile_version") or 0) >= min_version:
+        metrics.incr("auth.user_cache.hit")
+        return dict(cached)
+    metrics.incr("auth.user_cache.miss")
+
+    result = await db.execute(
+        text(f"SELECT * FROM users WHERE {column} = :value"),
+        {"value": value},
+    )
+    user = result.mappings().first()
+    if not user:
+        return None
+    user = dict(user)
+    cache_user(user)
+    return dict(user)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -85,33 +333,31 @@ async def get_current_user(
     """
     FastAPI Dependency: Extrahiert und verifiziert den aktuellen Nutzer.
     Dev-Token (dev-{user_id}): User-ID direkt extrahieren.
-    Produktion: Apple Identity Token verifizieren.
+    Session-Token (POST /auth/apple, /auth/refresh): lokal per HMAC verifizieren.
+    Sonst: Apple Identity Token verifizieren.
+    Die User-Zeile kommt fuer user_cache_ttl_seconds aus dem Cache.
     """
     token = credentials.credentials
 
-    if token.startswith("dev-"):
+    if _is_session_token(token):
+        claims = verify_session_token(token)
+        user = await load_user("id", claims["sub"], db, min_version=claims.get("ver") or 0)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+    elif token.startswith("dev-") and settings.env == "development":
         # Dev-Modus: User-ID aus Token extrahieren
         user_id = token[4:]  # "dev-" abschneiden
-        from sqlalchemy import text
-        result = await db.execute(
-            text("SELECT * FROM users WHERE id = :id"),
-            {"id": user_id},
-        )
-        user = result.mappings().first()
+        user = await load_user("id", user_id, db)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        return dict(user)
+        return user
     else:
         # Produktion: Apple Identity Token verifizieren
         claims = await verify_apple_token(token)
         apple_user_id = claims["sub"]
 
-        from sqlalchemy import text
-        result = await db.execute(
-            text("SELECT * FROM users WHERE apple_user_id = :aid"),
-            {"aid": apple_user_id},
-        )
-        user = result.mappings().first()
+        user = await load_user("apple_user_id", apple_user_id, db)
         if not user:
             raise HTTPException(status_code=404, detail="User not found — please register first")
-        return dict(user)
+        return user
@@ -1,5 +1,8 @@
 """Nourish Backend — Konfiguration über Umgebungsvariablen."""
 
+from typing import Literal, Optional
+
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -11,18 +14,104 @@ class Settings(BaseSettings):
     supabase_service_key: str
     database_url: str
 
+    # Datenbank-Pool
+    db_pool_mode: str = "queue"        # "queue" (Pool) oder "null" (neue Verbindung pro Checkout)
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout: float = 10.0      # Sekunden Warten auf freie Verbindung
+    db_pool_recycle: int = 1800        # Sekunden, danach wird die Verbindung erneuert
+    db_pool_pre_ping: bool = True
+    db_pgbouncer: bool = False         # Supabase Pooler (Transaction Mode): keine Prepared Statements
+    db_echo: bool = False              # SQL-Logging (unabhaengig von debug)
+
     # Anthropic
     anthropic_api_key: str
 
     # Apple Auth
     apple_team_id: str = ""
     apple_bundle_id: str = "com.nourish.app"
+    apple_jwks_ttl_seconds: int = 3600          # Apple-Keys regelmaessig neu laden (Rotation)
+    apple_jwks_min_refresh_seconds: int = 60    # Refresh bei unbekanntem kid hoechstens so oft
+    apple_claims_cache_size: int = 10000
+    apple_claims_cache_max_seconds: int = 600   # Verifizierte Claims, hoechstens bis exp
+
+    # Session-Tokens (HS256, von uns ausgestellt)
+    session_secret: str = ""                          # leer = aus supabase_service_key abgeleitet
+    session_access_ttl_seconds: int = 900
+    session_refresh_ttl_seconds: int = 30 * 24 * 3600
+
+    # Cache fuer aufgeloeste User (get_current_user)
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 60       # 0 = deaktiviert
 
     # Externe APIs
     usda_api_key: str = ""
+    usda_rate_limit_per_hour: int = 1000   # Budget des USDA API Keys
+    usda_rate_limit_burst: int = 20
+    usda_rate_limit_shared: bool = True    # Bucket in Postgres, gilt fuer alle Worker
+    usda_rate_limit_lease: int = 5         # Tokens pro DB-Roundtrip, die ein Worker lokal verbraucht
+
+    # Food-Lookup-Cache (In-Process LRU vor Postgres-Tabelle food_lookup_cache)
+    food_cache_size: int = 5000
+    food_cache_ttl_seconds: int = 3600
+    food_cache_db_ttl_seconds: int = 30 * 24 * 3600
+    food_cache_negative_ttl_seconds: int = 600
+
+    # Parse-Cache (In-Process LRU vor Postgres-Tabelle parse_cache)
+    parse_cache_size: int = 5000
+    parse_cache_ttl_seconds: int = 3600
+    parse_cache_db_ttl_seconds: int = 90 * 24 * 3600
+
+    # HTTP-Client (USDA, Open Food Facts)
+    http_pool_limit: int = 50
+    http_pool_limit_per_host: int = 10
+    http_keepalive_timeout: float = 30.0
+    http_connect_timeout: float = 3.0
+    http_read_timeout: float = 10.0
+    http_total_timeout: float = 15.0
+
+    # Mahlzeiten-Verarbeitung
+    meal_lookup_concurrency: int = 4      # Parallele lookup_food-Aufrufe pro Mahlzeit
+
+    # "separate" = Parsing und Feedback als getrennte Claude-Calls,
+    # "combined" = ein Call liefert Items, meal_time und Feedback
+    meal_parse_mode: Literal["separate", "combined"] = "separate"
+
+    # KI-Feedback zu Mahlzeiten:
+    #   "background" = Worker nach dem Speichern (Client pollt), "parallel" = gleichzeitig mit
+    #   den Lookups im Request, "inline" = nach den Lookups im Request
+    meal_feedback_mode: Literal["background", "parallel", "inline"] = "background"
+    # Veraltet (vor MEAL_FEEDBACK_MODE): true = "background", false = "inline".
+    # Gilt nur, wenn MEAL_FEEDBACK_MODE nicht gesetzt ist.
+    meal_feedback_async: Optional[bool] = None
+    feedback_workers: int = 2
+    feedback_sweep_seconds: int = 30
+    feedback_stale_seconds: int = 120      # so lange darf ein Job 'pending' sein, bevor er neu startet
+    feedback_max_attempts: int = 3
+
+    # Chat-Kontext-Snapshot (Tagesbilanz + Wochentrends) pro User
+    chat_context_cache_size: int = 10000
+    chat_context_ttl_seconds: int = 300    # Obergrenze fuer Mahlzeiten aus anderen Worker-Prozessen
+
+    # Chat-Verlauf: juengste Nachrichten woertlich, aeltere als rollierende Zusammenfassung
+    chat_recent_messages: int = 6          # bleiben immer woertlich (3 Wechsel)
+    chat_history_max_messages: int = 12    # Obergrenze woertlich, falls die Zusammenfassung hinterherhaengt
+    chat_summary_max_tokens: int = 400
+    chat_summary_batch_messages: int = 40  # hoechstens so viele Nachrichten pro Zusammenfassungs-Call
+
+    # Wissensartikel (In-Process-Cache + HTTP-Caching per ETag)
+    knowledge_cache_size: int = 1000
+    knowledge_cache_ttl_seconds: int = 86400
+    knowledge_revalidate_seconds: int = 60    # danach wird version/updated_at in der DB geprueft
+    knowledge_max_age_seconds: int = 300      # Cache-Control max-age fuer Clients/CDN
+
+    # BLS In-Memory-Index
+    bls_index_enabled: bool = True
+    bls_index_refresh_seconds: int = 300   # Prueft periodisch, ob bls_foods neu importiert wurde
 
     # App
     env: str = "development"
+    metrics_token: str = ""                # /metrics nur mit Header X-Metrics-Token (leer: nur development)
     debug: bool = True
     port: int = 8000
     cors_origins: list[str] = ["http://localhost:3000", "https://nourish-app.de", "https://api.nourish-app.de"]
@@ -30,9 +119,18 @@ class Settings(BaseSettings):
     # Claude Modelle
     claude_model_fast: str = "claude-sonnet-4-5-20250929"  # Parsing, schnelle Aufgaben
     claude_model_chat: str = "claude-sonnet-4-5-20250929"   # Chat, ausführliche Beratung
+    claude_prompt_cache: bool = True       # statische Praefixe ab ~1024 Tokens cachen (Anthropic, derzeit Parsing)
+    claude_parse_repair_retries: int = 1   # Korrekturversuche bei ungueltigem Parse-Output
+    prompt_context_token_budget: int = 400  # Tagesbilanz + Wochentrends im System-Prompt
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
+    @model_validator(mode="after")
+    def _legacy_feedback_async(self) -> "Settings":
+        if self.meal_feedback_async is not None and "meal_feedback_mode" not in self.model_fields_set:
+            self.meal_feedback_mode = "background" if self.meal_feedback_async else "inline"
+        return self
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -1,11 +1,16 @@
 """Nourish Backend — Datenbankverbindung (Supabase/PostgreSQL)."""
 
 import re
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from supabase import create_client, Client
 
 from app.core.config import get_settings
+from app.core.metrics import metrics
 
 settings = get_settings()
 
@@ -23,17 +28,101 @@ def _make_psycopg_url(url: str) -> str:
     )
 
 
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue-Pool, der die Wartezeit auf eine freie Verbindung misst (db.pool.wait_ms).
+
+    Gemessen wird nur, wenn eine Session tatsaechlich eine Verbindung braucht —
+    Requests, die komplett aus Caches bedient werden, belegen keinen Pool-Slot.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe("db.pool.wait_ms", (time.perf_counter() - start) * 1000)
+
+
+def _engine_kwargs() -> dict:
+    """Pool-Optionen aus den Settings.
+
+    queue: Verbindungen werden wiederverwendet (TCP+TLS nur einmal pro Slot).
+    null:  Jede Session oeffnet eine neue Verbindung (altes Verhalten).
+    pgbouncer: Supabase Pooler im Transaction Mode kennt keine Prepared
+    Statements ueber Transaktionsgrenzen — psycopg darf daher nicht preparen.
+    """
+    kwargs: dict = {"echo": settings.db_echo}
+    if settings.db_pool_mode == "null":
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update(
+            poolclass=_TimedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    if settings.db_pgbouncer:
+        kwargs["connect_args"] = {"prepare_threshold": None}
+    return kwargs
+
+
+def _instrument_pool(engine) -> None:
+    """Haengt Pool-Events an die Metriken (Connects, Checkouts, Checkins)."""
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_conn, conn_record):
+        metrics.incr("db.pool.connect")
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        metrics.incr("db.pool.checkout")
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_conn, conn_record):
+        metrics.incr("db.pool.checkin")
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_conn, conn_record, exception):
+        metrics.incr("db.pool.invalidate")
+
+
 def _get_engine():
     global _engine
     if _engine is None:
         _engine = create_async_engine(
             _make_psycopg_url(settings.database_url),
-            echo=settings.debug,
-            poolclass=NullPool,
+            **_engine_kwargs(),
         )
+        _instrument_pool(_engine)
     return _engine
 
 
+def pool_status() -> dict:
+    """Momentaufnahme des Pools fuer /metrics."""
+    pool = _get_engine().sync_engine.pool
+    status = {"mode": settings.db_pool_mode, "status": pool.status()}
+    if hasattr(pool, "checkedout"):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checked_in=pool.checkedin(),
+        )
+    return status
+
+
+async def dispose_engine() -> None:
+    """Schliesst alle Pool-Verbindungen (Shutdown)."""
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _session_factory = None
+
+
 def _get_session_factory():
     global _session_factory
     if _session_factory is None:
@@ -47,6 +136,7 @@ async def get_db() -> AsyncSession:
     """FastAPI Dependency: liefert eine DB-Session pro Request."""
     async with _get_session_factory()() as session:
         try:
+            # Verbindung wird erst beim ersten Statement geholt (lazy)
             yield session
             await session.commit()
         except Exception:
@@ -56,6 +146,21 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """Eigene Session ausserhalb eines Requests (Startup, Hintergrund-Tasks).
+
+    Commit bei Erfolg, Rollback bei Fehler — analog zu get_db.
+    """
+    async with _get_session_factory()() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
 # ── Supabase Client (für Auth und Storage) ──
 def get_supabase() -> Client:
     return create_client(settings.supabase_url, settings.supabase_service_key)
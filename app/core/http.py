@@ -0,0 +1,45 @@
+"""Nourish Backend — Gemeinsamer HTTP-Client für externe APIs (USDA, Open Food Facts)."""
+
+from typing import Optional
+
+import aiohttp
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=settings.http_pool_limit,
+        limit_per_host=settings.http_pool_limit_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=settings.http_total_timeout,
+        sock_connect=settings.http_connect_timeout,
+        sock_read=settings.http_read_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Liefert die prozessweite ClientSession (Keep-Alive, Connection-Pool).
+
+    Wird im Lifespan angelegt; ausserhalb der App (Skripte) lazy beim ersten Aufruf.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+
+async def close_http_session() -> None:
+    """Schliesst die ClientSession und alle offenen Verbindungen (Shutdown)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
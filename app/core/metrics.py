@@ -0,0 +1,59 @@
+"""Nourish Backend — Einfache In-Process-Metriken (Zähler und Timings)."""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Thread-sichere Zähler und Timing-Aggregate pro Worker-Prozess.
+
+    Zähler: incr("bls.hit")
+    Timings: observe("db.pool.wait_ms", 1.7) → count/sum/max
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        self._timings: dict[str, list[float]] = {}  # name → [count, sum, max]
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            stat = self._timings.get(name)
+            if stat is None:
+                self._timings[name] = [1, value, value]
+            else:
+                stat[0] += 1
+                stat[1] += value
+                if value > stat[2]:
+                    stat[2] = value
+
+    @contextmanager
+    def timer(self, name: str):
+        """Misst die Dauer eines Blocks in Millisekunden."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {
+                    name: {
+                        "count": int(count),
+                        "avg": round(total / count, 3) if count else 0.0,
+                        "max": round(peak, 3),
+                    }
+                    for name, (count, total, peak) in self._timings.items()
+                },
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,121 @@
+"""Nourish Backend — Token-Bucket-Rate-Limiter (lokal und ueber Postgres geteilt)."""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+
+from app.core.database import session_scope
+from app.core.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token Bucket pro Prozess.
+
+    rate: Tokens pro Sekunde, capacity: maximale Burst-Groesse.
+    Das Lock serialisiert Wartende — kein Wettlauf um denselben Zeitstempel.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class SharedTokenBucket:
+    """Token Bucket in der Tabelle rate_limit_buckets — gilt fuer alle Worker.
+
+    Tokens werden in Batches (lease) aus der Tabelle geleast und lokal verbraucht:
+    nur jeder lease-te Aufruf kostet einen DB-Roundtrip. Refill und Entnahme
+    passieren atomar in einem UPDATE (Row-Lock); das Lock serialisiert Wartende
+    im Prozess, damit nicht jeder einzeln die Datenbank pollt. Ist die Datenbank
+    nicht erreichbar, wird auf einen lokalen TokenBucket mit gleichem Budget
+    zurueckgefallen.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, lease: int = 5) -> None:
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.lease = max(1, min(lease, int(capacity)))
+        self._leased = 0
+        self._lock = asyncio.Lock()
+        self._local = TokenBucket(rate, capacity)
+        self._initialized = False
+
+    async def _take_batch(self) -> tuple[int, float]:
+        """Least bis zu self.lease Tokens. Gibt (geleast, verfuegbar vor der Entnahme) zurueck."""
+        async with session_scope() as db:
+            if not self._initialized:
+                await db.execute(
+                    text("""
+                        INSERT INTO rate_limit_buckets (name, tokens, updated_at)
+                        VALUES (:name, :cap, clock_timestamp())
+                        ON CONFLICT (name) DO NOTHING
+                    """),
+                    {"name": self.name, "cap": self.capacity},
+                )
+                self._initialized = True
+            result = await db.execute(
+                text("""
+                    WITH b AS (
+                        SELECT name,
+                               LEAST(:cap, tokens + EXTRACT(EPOCH FROM clock_timestamp() - updated_at) * :rate)
+                                   AS avail
+                        FROM rate_limit_buckets
+                        WHERE name = :name
+                        FOR UPDATE
+                    )
+                    UPDATE rate_limit_buckets r
+                    SET tokens = b.avail - LEAST(FLOOR(b.avail), :lease),
+                        updated_at = clock_timestamp()
+                    FROM b
+                    WHERE r.name = b.name
+                    RETURNING LEAST(FLOOR(b.avail), :lease) AS taken, b.avail
+                """),
+                {"name": self.name, "cap": self.capacity, "rate": self.rate, "lease": self.lease},
+            )
+            row = result.one()
+            return int(row.taken), float(row.avail)
+
+    async def _ensure_lease(self) -> bool:
+        """Sorgt fuer mindestens ein geleastes Token. False = DB-Fehler, lokaler Bucket wurde benutzt."""
+        while self._leased < 1:
+            try:
+                taken, avail = await self._take_batch()
+            except Exception as e:
+                log.error("[RATE] Geteilter Bucket '%s' nicht verfuegbar, nutze lokalen: %s", self.name, e)
+                self._initialized = False
+                await self._local.acquire()
+                return False
+            metrics.incr(f"rate_limit.{self.name}.lease")
+            self._leased = taken
+            if taken < 1:
+                await asyncio.sleep((1 - avail) / self.rate)
+        return True
+
+    async def acquire(self) -> None:
+        start = time.perf_counter()
+        async with self._lock:
+            if await self._ensure_lease():
+                self._leased -= 1
+        metrics.observe(f"rate_limit.{self.name}.wait_ms", (time.perf_counter() - start) * 1000)
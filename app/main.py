@@ -1,12 +1,22 @@
 """Nourish Backend — FastAPI Application."""
 
+import asyncio
+import hmac
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
+from app.core.http import close_http_session, get_http_session
+from app.core.database import dispose_engine, pool_status, session_scope
+from app.core.metrics import metrics
 from app.api import auth, users, meals, products, daily_log, chat, knowledge
+from app.services.bls_service import load_bls_index, run_bls_index_refresher
+from app.services.feedback_worker import run_feedback_sweeper, run_feedback_worker
 
+log = logging.getLogger(__name__)
 settings = get_settings()
 
 
@@ -15,9 +25,31 @@ async def lifespan(app: FastAPI):
     """Startup/Shutdown Events."""
     # Startup
     print("🌿 Nourish Backend starting...")
+    background: list[asyncio.Task] = []
+    get_http_session()
+
+    # BLS-Referenzdaten in den Speicher laden (Fallback: ILIKE-Suche in der DB)
+    if settings.bls_index_enabled:
+        try:
+            async with session_scope() as db:
+                await load_bls_index(db)
+        except Exception as e:
+            log.error("BLS-Index konnte nicht geladen werden, nutze DB-Suche: %s", e)
+        background.append(asyncio.create_task(run_bls_index_refresher()))
+
+    # KI-Feedback zu Mahlzeiten (Queue + Sweeper fuer liegengebliebene Jobs)
+    if settings.meal_feedback_mode == "background":
+        background.append(asyncio.create_task(run_feedback_worker()))
+        background.append(asyncio.create_task(run_feedback_sweeper()))
+
     yield
     # Shutdown
     print("🌿 Nourish Backend shutting down...")
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await close_http_session()
+    await dispose_engine()
 
 
 app = FastAPI(
@@ -50,3 +82,17 @@ app.include_router(knowledge.router, prefix="/knowledge", tags=["Knowledge"])
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "nourish-api", "version": "0.1.0"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(x_metrics_token: Optional[str] = Header(default=None)):
+    """
+    In-Process-Metriken dieses Workers (Zähler, Timings, DB-Pool).
+    Nur mit Header X-Metrics-Token = METRICS_TOKEN; ohne gesetzten Token nur in development.
+    """
+    if settings.metrics_token:
+        if not x_metrics_token or not hmac.compare_digest(x_metrics_token, settings.metrics_token):
+            raise HTTPException(404, "Not Found")
+    elif settings.env != "development":
+        raise HTTPException(404, "Not Found")
+    return {**metrics.snapshot(), "db_pool": pool_status()}
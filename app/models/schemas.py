@@ -53,6 +53,11 @@ class InputMethod(str, Enum):
     text = "text"
     barcode = "barcode"
 
+class FeedbackStatus(str, Enum):
+    pending = "pending"
+    done = "done"
+    failed = "failed"
+
 
 # ── Nährstoffprofil ──
 
@@ -113,6 +118,7 @@ class NutrientProfile(BaseModel):
 
 class UserCreate(BaseModel):
     apple_user_id: str
+    identity_token: str             # Apple Identity Token (JWT), sub muss apple_user_id sein
     email: Optional[str] = None
     display_name: Optional[str] = None
 
@@ -147,7 +153,14 @@ class UserResponse(BaseModel):
 
 class AuthResponse(BaseModel):
     user: UserResponse
-    token: str
+    token: str                      # = access_token (Kompatibilitaet mit aelteren Clients)
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshInput(BaseModel):
+    refresh_token: str
 
 
 # ── Meal Schemas ──
@@ -192,12 +205,27 @@ class MealResponse(BaseModel):
     items: list[FoodItemResponse] = []
     ai_feedback: Optional[str]
     ai_feedback_knowledge_links: list[str] = []
+    ai_feedback_status: FeedbackStatus = FeedbackStatus.done
     logged_at: datetime
     meal_time: Optional[str] = None  # "HH:MM" — wann die Mahlzeit gegessen wurde
     total_calories: float = 0
     total_protein: float = 0
 
 
+class MealFeedback(BaseModel):
+    id: UUID
+    status: FeedbackStatus
+    ai_feedback: Optional[str] = None
+    ai_feedback_knowledge_links: list[str] = []
+
+
+class MealTotals(BaseModel):
+    id: UUID
+    meal_type: MealType
+    meal_time: Optional[str] = None
+    nutrients: NutrientProfile
+
+
 # ── Product Schemas ──
 
 class ProductCreate(BaseModel):
@@ -242,6 +270,11 @@ class DailyLogResponse(BaseModel):
     meals: list[MealResponse] = []
 
 
+class DailyTotals(BaseModel):
+    log_date: date
+    nutrients: NutrientProfile
+
+
 # ── Chat Schemas ──
 
 class ChatInput(BaseModel):
@@ -1,23 +1,21 @@
 """Nourish Backend — Nährstoff-Aggregation, Zielwert-Berechnung und Defizit-Analyse."""
 
+import json
 from datetime import date, timedelta
-from typing import Optional
+from typing import Iterable, Optional
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from app.models.schemas import NutrientProfile
+from app.services.nutrient_engine import (
+    FIELDS, compare, deficit_excess_counts, to_dict, to_matrix, to_profile, to_vector, total,
+)
 
 
-# ── Alle summierbaren Felder im NutrientProfile ──
-_NUTRIENT_FIELDS = [f.strip() for f in """
-    calories protein carbs carbs_sugar carbs_sugar_glucose carbs_sugar_fructose
-    carbs_starch fiber fat fat_saturated fat_mono fat_poly fat_omega3 fat_omega6
-    fat_trans sodium vitamin_a vitamin_b1 vitamin_b2 vitamin_b3 vitamin_b5
-    vitamin_b6 vitamin_b7 vitamin_b9 vitamin_b12 vitamin_c vitamin_d vitamin_e
-    vitamin_k calcium magnesium potassium phosphorus iron zinc copper iodine
-    selenium manganese chromium molybdenum caffeine alcohol
-""".split()]
+# ── Alle summierbaren Felder im NutrientProfile (feste Reihenfolge) ──
+_NUTRIENT_FIELDS = list(FIELDS)
 
 
 # ── Aktivitätsfaktoren (Harris-Benedict) ──
@@ -40,47 +38,239 @@ _MACRO_SPLITS = {
 }
 
 
+def sum_nutrients(rows: Iterable) -> np.ndarray:
+    """Summiert Naehrstoff-Dicts (oder JSONB-Strings / NutrientProfiles) zu einem Vektor."""
+    return total(to_matrix(rows))
+
+
+def nutrients_from_vector(values) -> NutrientProfile:
+    """Summenvektor aus Postgres → NutrientProfile (fehlende Stellen = 0)."""
+    vec = np.zeros(len(FIELDS))
+    values = np.asarray([v or 0 for v in (values or [])][:len(FIELDS)], dtype=float)
+    vec[:len(values)] = values
+    return to_profile(vec)
+
+
+async def sum_nutrients_by_day(
+    user_id: str,
+    start_date: date,
+    end_date: date,
+    db: AsyncSession,
+) -> list[dict]:
+    """
+    Summiert food_items.nutrient_vector je Tag in Postgres.
+    Nach Python wandert nur ein Summenvektor pro Tag statt aller JSONB-Dokumente.
+    """
+    result = await db.execute(
+        text("""
+            SELECT meal_date, array_agg(total ORDER BY idx) AS totals
+            FROM (
+                SELECT fe.meal_date, u.idx, SUM(u.val::float8) AS total
+                FROM food_entries fe
+                JOIN food_items fi ON fi.food_entry_id = fe.id
+                CROSS JOIN LATERAL unnest(fi.nutrient_vector) WITH ORDINALITY AS u(val, idx)
+                WHERE fe.user_id = :uid AND fe.meal_date BETWEEN :start AND :end
+                GROUP BY fe.meal_date, u.idx
+            ) per_idx
+            GROUP BY meal_date
+            ORDER BY meal_date
+        """),
+        {"uid": user_id, "start": start_date, "end": end_date},
+    )
+    return [
+        {"log_date": row["meal_date"], "nutrients": nutrients_from_vector(row["totals"])}
+        for row in result.mappings()
+    ]
+
+
+async def sum_nutrients_by_meal(
+    user_id: str,
+    target_date: date,
+    db: AsyncSession,
+) -> list[dict]:
+    """Summiert food_items.nutrient_vector je Mahlzeit eines Tages in Postgres."""
+    result = await db.execute(
+        text("""
+            SELECT fe.id, fe.meal_type, fe.meal_time, per_meal.totals
+            FROM food_entries fe
+            LEFT JOIN LATERAL (
+                SELECT array_agg(total ORDER BY idx) AS totals
+                FROM (
+                    SELECT u.idx, SUM(u.val::float8) AS total
+                    FROM food_items fi
+                    CROSS JOIN LATERAL unnest(fi.nutrient_vector) WITH ORDINALITY AS u(val, idx)
+                    WHERE fi.food_entry_id = fe.id
+                    GROUP BY u.idx
+                ) per_idx
+            ) per_meal ON TRUE
+            WHERE fe.user_id = :uid AND fe.meal_date = :date
+            ORDER BY fe.meal_time ASC NULLS LAST, fe.logged_at ASC
+        """),
+        {"uid": user_id, "date": target_date},
+    )
+    return [
+        {
+            "id": row["id"],
+            "meal_type": row["meal_type"],
+            "meal_time": row["meal_time"].strftime("%H:%M") if row["meal_time"] else None,
+            "nutrients": nutrients_from_vector(row["totals"]),
+        }
+        for row in result.mappings()
+    ]
+
+
+async def apply_daily_delta(
+    user_id: str,
+    target_date: date,
+    delta: np.ndarray,
+    db: AsyncSession,
+    target: Optional[NutrientProfile] = None,
+) -> None:
+    """
+    Addiert ein Naehrstoff-Delta auf daily_logs.actual_nutrients — in der
+    Transaktion des Aufrufers. Wird bei jedem Anlegen, Aendern und Loeschen
+    von Mahlzeiten aufgerufen, damit die Tagesbilanz nie neu aggregiert
+    werden muss. Der Row-Lock von ON CONFLICT serialisiert parallele Deltas.
+    """
+    delta = {k: round(v, 4) for k, v in to_dict(delta).items() if round(v, 4)}
+    if not delta:
+        return
+
+    await db.execute(
+        text("""
+            INSERT INTO daily_logs (user_id, log_date, target_nutrients, actual_nutrients,
+                                    caffeine_total_mg, alcohol_total_g)
+            VALUES (:uid, :date, :target, :delta, :caffeine, :alcohol)
+            ON CONFLICT (user_id, log_date)
+            DO UPDATE SET
+                actual_nutrients = (
+                    SELECT COALESCE(jsonb_object_agg(k, ROUND(
+                        COALESCE((daily_logs.actual_nutrients->>k)::numeric, 0)
+                        + COALESCE((EXCLUDED.actual_nutrients->>k)::numeric, 0), 2)), '{}'::jsonb)
+                    FROM jsonb_object_keys(
+                        COALESCE(daily_logs.actual_nutrients, '{}'::jsonb) || EXCLUDED.actual_nutrients
+                    ) AS k
+                ),
+                caffeine_total_mg = COALESCE(daily_logs.caffeine_total_mg, 0) + EXCLUDED.caffeine_total_mg,
+                alcohol_total_g = COALESCE(daily_logs.alcohol_total_g, 0) + EXCLUDED.alcohol_total_g,
+                target_nutrients = COALESCE(daily_logs.target_nutrients, EXCLUDED.target_nutrients),
+                updated_at = NOW()
+        """),
+        {
+            "uid": user_id,
+            "date": target_date,
+            "target": target.model_dump_json() if target else None,
+            "delta": json.dumps(delta),
+            "caffeine": delta.get("caffeine", 0),
+            "alcohol": delta.get("alcohol", 0),
+        },
+    )
+
+
+async def rebuild_daily_totals(
+    db: AsyncSession,
+    user_id: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> int:
+    """
+    Reparatur: berechnet daily_logs.actual_nutrients komplett aus food_items neu
+    (optional eingeschraenkt auf User und Zeitraum). Gibt die Anzahl der
+    neu geschriebenen Tage zurueck.
+    """
+    conditions = ["TRUE"]
+    params: dict = {}
+    if user_id:
+        conditions.append("user_id = :uid")
+        params["uid"] = user_id
+    if start_date:
+        conditions.append("log_date >= :start")
+        params["start"] = start_date
+    if end_date:
+        conditions.append("log_date <= :end")
+        params["end"] = end_date
+    log_where = " AND ".join(conditions)
+    entry_where = log_where.replace("user_id", "fe.user_id").replace("log_date", "fe.meal_date")
+
+    # Erst alles im Bereich auf 0, dann die Summen der vorhandenen Mahlzeiten schreiben
+    await db.execute(
+        text(f"""
+            UPDATE daily_logs
+            SET actual_nutrients = '{{}}'::jsonb, caffeine_total_mg = 0, alcohol_total_g = 0
+            WHERE {log_where}
+        """),
+        params,
+    )
+    result = await db.execute(
+        text(f"""
+            INSERT INTO daily_logs (user_id, log_date, actual_nutrients, caffeine_total_mg, alcohol_total_g)
+            SELECT user_id, meal_date, totals,
+                   COALESCE((totals->>'caffeine')::numeric, 0),
+                   COALESCE((totals->>'alcohol')::numeric, 0)
+            FROM (
+                SELECT user_id, meal_date, jsonb_object_agg(key, total) AS totals
+                FROM (
+                    SELECT fe.user_id, fe.meal_date, kv.key, ROUND(SUM(kv.value::numeric), 2) AS total
+                    FROM food_entries fe
+                    JOIN food_items fi ON fi.food_entry_id = fe.id
+                    CROSS JOIN LATERAL jsonb_each_text(fi.calculated_nutrients) kv
+                    WHERE jsonb_typeof(fi.calculated_nutrients) = 'object' AND {entry_where}
+                    GROUP BY fe.user_id, fe.meal_date, kv.key
+                ) per_key
+                GROUP BY user_id, meal_date
+            ) per_day
+            ON CONFLICT (user_id, log_date)
+            DO UPDATE SET
+                actual_nutrients = EXCLUDED.actual_nutrients,
+                caffeine_total_mg = EXCLUDED.caffeine_total_mg,
+                alcohol_total_g = EXCLUDED.alcohol_total_g,
+                updated_at = NOW()
+        """),
+        params,
+    )
+    return result.rowcount
+
+
 async def aggregate_daily_nutrients(
     user_id: str,
     target_date: date,
     db: AsyncSession,
 ) -> NutrientProfile:
     """
-    Summiert alle calculated_nutrients aus food_items fuer food_entries
-    des Users an einem bestimmten Datum.
+    Ist-Naehrstoffe des Users an einem Datum. Die Summe wird bei jeder
+    Mahlzeit-Aenderung inkrementell in daily_logs gepflegt (apply_daily_delta),
+    hier genuegt ein Lookup per Primaerschluessel.
     """
     result = await db.execute(
         text("""
-            SELECT fi.calculated_nutrients
-            FROM food_items fi
-            JOIN food_entries fe ON fe.id = fi.food_entry_id
-            WHERE fe.user_id = :uid AND fe.meal_date = :date
-              AND fi.calculated_nutrients IS NOT NULL
+            SELECT actual_nutrients FROM daily_logs
+            WHERE user_id = :uid AND log_date = :date
         """),
         {"uid": user_id, "date": target_date},
     )
+    return nutrients_from_log(result.scalar_one_or_none())
+
 
-    rows = result.mappings().all()
+def nutrients_from_log(actual_raw) -> NutrientProfile:
+    """Baut ein NutrientProfile aus daily_logs.actual_nutrients (fehlende Felder = 0)."""
+    return to_profile(to_vector(actual_raw))
 
-    # Alle Naehrstoffwerte aufsummieren
-    totals: dict[str, float] = {field: 0.0 for field in _NUTRIENT_FIELDS}
 
-    for row in rows:
-        nutrients = row["calculated_nutrients"]
-        # JSONB wird je nach Treiber als dict oder als str zurueckgegeben
-        if isinstance(nutrients, str):
-            import json
-            nutrients = json.loads(nutrients)
-        if not isinstance(nutrients, dict):
-            continue
-        for field in _NUTRIENT_FIELDS:
-            value = nutrients.get(field, 0)
-            if isinstance(value, (int, float)):
-                totals[field] += value
+def resolve_target_nutrients(user: dict) -> NutrientProfile:
+    """Soll-Naehrstoffe: aus dem User-Profil oder frisch berechnet."""
+    user_target = user.get("target_nutrients")
+    if isinstance(user_target, str):
+        user_target = json.loads(user_target)
+    if user_target:
+        return NutrientProfile(**user_target)
+    return calculate_target_nutrients(user)
 
-    # Auf 2 Nachkommastellen runden
-    rounded = {k: round(v, 2) for k, v in totals.items()}
-    return NutrientProfile(**rounded)
+
+def _as_dict(nutrients) -> Optional[dict]:
+    """JSONB wird je nach Treiber als dict oder als str zurueckgegeben."""
+    if isinstance(nutrients, str):
+        nutrients = json.loads(nutrients)
+    return nutrients if isinstance(nutrients, dict) else None
 
 
 def calculate_target_nutrients(user: dict) -> NutrientProfile:
@@ -214,50 +404,42 @@ def calculate_deficits(
     Gibt fuer jeden Naehrstoff actual, target, percentage und Status zurueck.
     Status: "deficit" (<80%), "ok" (80-120%), "excess" (>120%).
     """
-    result = {}
-
-    for field in _NUTRIENT_FIELDS:
-        actual_val = getattr(actual, field, 0) or 0
-        target_val = getattr(target, field, 0) or 0
-
-        # Limit-Felder: weniger ist besser, 0% ist optimal
-        # NICHT enthalten: sodium, fat_saturated (echte Zielwerte mit moeglichem Defizit)
-        _limit_fields = {
-            "caffeine", "alcohol", "fat_trans",
-            "carbs_sugar", "carbs_sugar_glucose", "carbs_sugar_fructose",
-            "carbs_starch",
+    actual_vec = to_vector(actual)
+    target_vec = to_vector(target)
+    percentage, status = compare(actual_vec, target_vec)
+
+    actual_r = np.round(actual_vec, 2).tolist()
+    target_r = np.round(target_vec, 2).tolist()
+    percentage = percentage.tolist()
+    status = status.tolist()
+    return {
+        field: {
+            "actual": actual_r[i],
+            "target": target_r[i],
+            "percentage": percentage[i],
+            "status": status[i],
         }
+        for i, field in enumerate(_NUTRIENT_FIELDS)
+    }
 
-        if target_val > 0:
-            percentage = round((actual_val / target_val) * 100, 1)
-        else:
-            # Zielwert = 0 (z.B. Alkohol, trans-Fette) — 0 ist perfekt
-            percentage = 0 if actual_val == 0 else 100
-
-        if field in _limit_fields:
-            # Limit-Felder: unter oder gleich Ziel → ok, darueber → excess
-            if actual_val <= target_val:
-                status = "ok"
-            else:
-                status = "excess"
-        elif target_val == 0:
-            # Kein Zielwert definiert und kein Limit → immer ok
-            status = "ok"
-        elif percentage < 80:
-            status = "deficit"
-        elif percentage > 120:
-            status = "excess"
-        else:
-            status = "ok"
-
-        result[field] = {
-            "actual": round(actual_val, 2),
-            "target": round(target_val, 2),
-            "percentage": percentage,
-            "status": status,
-        }
 
-    return result
+def build_daily_balance(actual: NutrientProfile, target: NutrientProfile) -> dict:
+    """Tagesbilanz fuer Claude-Prompts: Ist, Soll und nur die auffaelligen Defizite/Ueberschuesse."""
+    deficits = calculate_deficits(actual, target)
+    return {
+        "actual": actual.model_dump(),
+        "target": target.model_dump(),
+        "deficits": {
+            k: v for k, v in deficits.items()
+            if v["status"] != "ok"
+        },
+    }
+
+
+async def load_daily_balance(user: dict, target_date: date, db: AsyncSession) -> dict:
+    """Tagesbilanz des Users aus daily_logs (ein Lookup per Primaerschluessel)."""
+    actual = await aggregate_daily_nutrients(user["id"], target_date, db)
+    return build_daily_balance(actual, resolve_target_nutrients(user))
 
 
 async def get_week_trends(
@@ -280,8 +462,11 @@ async def get_week_trends(
         """),
         {"uid": user_id, "start": start_date, "end": end_date},
     )
-    logs = result.mappings().all()
+    return week_trends_from_logs(result.mappings().all(), start_date, end_date)
 
+
+def week_trends_from_logs(logs: list, start_date: date, end_date: date) -> dict:
+    """Wochentrends aus bereits geladenen daily_logs-Zeilen (actual_nutrients, target_nutrients)."""
     if not logs:
         return {
             "start_date": start_date,
@@ -292,40 +477,20 @@ async def get_week_trends(
             "chronic_excesses": [],
         }
 
-    # Naehrstoff-Summen und Deficit-Zaehler pro Tag sammeln
-    sums: dict[str, float] = {f: 0.0 for f in _NUTRIENT_FIELDS}
-    deficit_counts: dict[str, int] = {f: 0 for f in _NUTRIENT_FIELDS}
-    excess_counts: dict[str, int] = {f: 0 for f in _NUTRIENT_FIELDS}
+    # Ist/Soll aller Tage als Matrizen (Zeile = Tag); Tage ohne Ist-Werte zaehlen
+    # zum Durchschnitt (days_tracked), aber nicht zu Defiziten/Ueberschuessen
     days_tracked = len(logs)
-
-    for log in logs:
-        actual_raw = log["actual_nutrients"]
-        target_raw = log["target_nutrients"]
-
-        if isinstance(actual_raw, str):
-            import json
-            actual_raw = json.loads(actual_raw)
-        if isinstance(target_raw, str):
-            import json
-            target_raw = json.loads(target_raw)
-
-        if not actual_raw:
-            continue
-
-        for field in _NUTRIENT_FIELDS:
-            val = actual_raw.get(field, 0) or 0
-            sums[field] += val
-
-            target_val = (target_raw or {}).get(field, 0) or 0
-            if target_val > 0:
-                pct = (val / target_val) * 100
-                if pct < 80:
-                    deficit_counts[field] += 1
-                elif pct > 120:
-                    excess_counts[field] += 1
-
-    # Durchschnittswerte berechnen
-    averages = {f: round(sums[f] / days_tracked, 2) for f in _NUTRIENT_FIELDS}
+    rows = [(_as_dict(log["actual_nutrients"]), _as_dict(log["target_nutrients"])) for log in logs]
+    rows = [(actual_raw, target_raw) for actual_raw, target_raw in rows if actual_raw]
+    actual = to_matrix(a for a, _ in rows)
+    target = to_matrix(t for _, t in rows)
+
+    deficit_vec, excess_vec = deficit_excess_counts(actual, target)
+    averages = {
+        f: round(v, 2) for f, v in zip(_NUTRIENT_FIELDS, (total(actual) / days_tracked).tolist())
+    }
+    deficit_counts = dict(zip(_NUTRIENT_FIELDS, deficit_vec.tolist()))
+    excess_counts = dict(zip(_NUTRIENT_FIELDS, excess_vec.tolist()))
 
     # Chronische Defizite: >= 5 von den getrackteten Tagen
     threshold = min(5, days_tracked)  # Bei weniger als 5 Tagen: alle muessen betroffen sein
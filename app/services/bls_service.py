@@ -1,13 +1,22 @@
-"""Nourish Backend — BLS 4.0 Suche via ILIKE mit Alias-Mapping."""
+"""Nourish Backend — BLS 4.0 Suche (In-Memory-Index, Fallback ILIKE) mit Alias-Mapping."""
 
+import asyncio
+import json
 import logging
+from bisect import bisect_left
 from typing import Optional
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
+from app.core.database import session_scope
+from app.core.metrics import metrics
+
 log = logging.getLogger(__name__)
 
+settings = get_settings()
+
 # Exakte Alias-Mappings: Kurzformen → verifizierte BLS name_de
 # Alle Namen wurden gegen die bls_foods-Tabelle geprueft (2026-02-09)
 COMMON_ALIASES: dict[str, str] = {
@@ -83,12 +92,152 @@ COMMON_ALIASES: dict[str, str] = {
 }
 
 
+class BLSIndex:
+    """Kompakter In-Memory-Index ueber bls_foods.
+
+    Bildet die Ranking-Stufen der ILIKE-Suche nach:
+    exakt (1.0) > Prefix (0.9) > Wortanfang (0.8), sonst Contains (0.5);
+    innerhalb einer Stufe gewinnt der kuerzere name_de.
+    """
+
+    def __init__(self, rows: list[dict], fingerprint: tuple) -> None:
+        # Nach Namenslaenge sortiert → Contains-Scan und Tie-Break wie ORDER BY length(name_de)
+        self.rows = sorted(rows, key=lambda r: len(r["name_de"]))
+        self.fingerprint = fingerprint
+        self._lower_de = [r["name_de"].lower() for r in self.rows]
+        self._lower_en = [(r["name_en"] or "").lower() for r in self.rows]
+
+        # Sortierte (Schluessel, Zeilenindex)-Listen fuer Prefix-Bereiche per bisect
+        self._prefix_keys = sorted((name, i) for i, name in enumerate(self._lower_de))
+        word_keys = []
+        for i, name in enumerate(self._lower_de):
+            pos = name.find(" ")
+            while pos != -1:
+                word_keys.append((name[pos + 1:], i))
+                pos = name.find(" ", pos + 1)
+        self._word_keys = sorted(word_keys)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def _prefix_range(keys: list[tuple[str, int]], prefix: str):
+        start = bisect_left(keys, (prefix, -1))
+        for i in range(start, len(keys)):
+            key, idx = keys[i]
+            if not key.startswith(prefix):
+                break
+            yield idx
+
+    def search(self, query: str, limit: int = 5) -> list[dict]:
+        q = query.lower()
+
+        # Stufen 1-3: exakt / Prefix / Wortanfang
+        ranked: dict[int, float] = {}
+        for idx in self._prefix_range(self._prefix_keys, q):
+            ranked[idx] = 1.0 if self._lower_de[idx] == q else 0.9
+        for idx in self._prefix_range(self._word_keys, q):
+            ranked.setdefault(idx, 0.8)
+        if ranked:
+            best = sorted(ranked.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+            return [{**self.rows[idx], "sim": sim} for idx, sim in best]
+
+        # Stufe 4: Contains in name_de oder name_en (Zeilen sind bereits nach Laenge sortiert)
+        hits = []
+        for idx in range(len(self.rows)):
+            if q in self._lower_de[idx] or q in self._lower_en[idx]:
+                hits.append({**self.rows[idx], "sim": 0.5})
+                if len(hits) >= limit:
+                    break
+        return hits
+
+
+_index: Optional[BLSIndex] = None
+
+
+# Prefix-Treffer zaehlen nur als ganzes erstes Wort und ab dieser Laenge
+# ("reis" → "Reis, gekocht" ja; "ei" → "Eis" oder "Eierlikör" nein)
+_KNOWN_PREFIX_MIN_LEN = 4
+_WORD_END = frozenset(" ,(/-")
+
+
+def is_known_food(name: str) -> bool:
+    """Sicherer lokaler Treffer ohne DB: Alias, exakter Name oder Name als erstes Wort im Index."""
+    key = name.strip().lower()
+    if key in COMMON_ALIASES:
+        return True
+    if _index is None:
+        return False
+    rows = [row for row in _index.search(key, 20) if row["sim"] >= 0.9]
+    if rows and rows[0]["sim"] == 1.0:
+        return True
+    if len(key) < _KNOWN_PREFIX_MIN_LEN:
+        return False
+    return any(row["name_de"].lower()[len(key):len(key) + 1] in _WORD_END for row in rows)
+
+
+async def _bls_fingerprint(db: AsyncSession) -> tuple:
+    """Billiger Fingerprint der Tabelle — aendert sich bei jedem Reimport (TRUNCATE + INSERT)."""
+    result = await db.execute(
+        text("SELECT COUNT(*), COALESCE(MAX(xmin::text::bigint), 0) FROM bls_foods")
+    )
+    count, max_xmin = result.one()
+    return (int(count), int(max_xmin))
+
+
+async def load_bls_index(db: AsyncSession) -> BLSIndex:
+    """Laedt bls_foods komplett in den In-Memory-Index."""
+    global _index
+    fingerprint = await _bls_fingerprint(db)
+    result = await db.execute(
+        text("SELECT bls_code, name_de, name_en, nutrients_per_100 FROM bls_foods")
+    )
+    rows = []
+    for row in result.mappings():
+        nutrients = row["nutrients_per_100"]
+        if isinstance(nutrients, str):
+            nutrients = json.loads(nutrients)
+        rows.append({
+            "bls_code": row["bls_code"],
+            "name_de": row["name_de"],
+            "name_en": row["name_en"],
+            "nutrients_per_100": nutrients,
+        })
+    _index = BLSIndex(rows, fingerprint)
+    metrics.incr("bls.index.reload")
+    log.info("[BLS] In-Memory-Index geladen: %d Lebensmittel", len(_index))
+    return _index
+
+
+async def refresh_bls_index_if_changed(db: AsyncSession) -> bool:
+    """Laedt den Index neu, wenn sich bls_foods seit dem letzten Laden geaendert hat."""
+    if _index is not None and await _bls_fingerprint(db) == _index.fingerprint:
+        return False
+    await load_bls_index(db)
+    return True
+
+
+async def run_bls_index_refresher() -> None:
+    """Hintergrund-Task: prueft periodisch auf einen Reimport von bls_foods."""
+    while True:
+        await asyncio.sleep(settings.bls_index_refresh_seconds)
+        try:
+            async with session_scope() as db:
+                await refresh_bls_index_if_changed(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("[BLS] Index-Refresh fehlgeschlagen: %s", e)
+
+
 async def search_bls(name: str, db: AsyncSession, limit: int = 5) -> list[dict]:
     """BLS-Suche mit Alias-Mapping und Prefix-First-Strategie.
 
     1. Alias pruefen: exakter Kurzform-Match → expandiert zum BLS-Namen
     2. Bei Alias: Suche per Prefix (query%) — sehr praezise
     3. Ohne Alias: Suche per Prefix (query%) zuerst, dann Contains (%query%)
+
+    Ist der In-Memory-Index geladen, laeuft die Suche ohne DB-Roundtrip.
     """
     raw = name.strip()
     query = raw
@@ -99,6 +248,17 @@ async def search_bls(name: str, db: AsyncSession, limit: int = 5) -> list[dict]:
         log.info("[BLS] Alias: '%s' → '%s'", raw, alias)
         query = alias
 
+    if _index is not None:
+        metrics.incr("bls.index.search")
+        rows = _index.search(query, limit)
+        if rows:
+            _log_results(raw, query, rows)
+        else:
+            log.warning("[BLS] Kein Treffer fuer '%s' (expandiert: '%s')", raw, query)
+        return rows
+
+    metrics.incr("bls.db.search")
+
     # 2. Prefix-Suche zuerst (praezise, vermeidet "Ei" → "Reis")
     result = await db.execute(
         text("""
@@ -157,7 +317,6 @@ def _log_results(raw: str, query: str, rows: list[dict]) -> None:
     best = rows[0]
     nutrients = best["nutrients_per_100"]
     if isinstance(nutrients, str):
-        import json
         nutrients = json.loads(nutrients)
     cal = nutrients.get("calories", 0) if isinstance(nutrients, dict) else 0
     prot = nutrients.get("protein", 0) if isinstance(nutrients, dict) else 0
@@ -175,7 +334,6 @@ async def lookup_bls(name: str, db: AsyncSession) -> Optional[dict]:
 
     nutrients = best["nutrients_per_100"]
     if isinstance(nutrients, str):
-        import json
         nutrients = json.loads(nutrients)
 
     log.info("[BLS] lookup '%s' → '%s' (code=%s, cal=%.0f, prot=%.1f per 100g)",
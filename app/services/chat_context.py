@@ -0,0 +1,140 @@
+"""Nourish Backend — Chat-Kontext pro Nutzer: Verlauf, Tagesbilanz und Wochentrends.
+
+Alles kommt aus einer Query auf der Request-Session (keine zweite Pool-Verbindung).
+
+Mehrere Chat-Nachrichten hintereinander aendern an Bilanz und Trends nichts —
+dieser Snapshot wird deshalb pro User gecacht und nur ungueltig durch:
+- Mahlzeit anlegen/aendern/loeschen (invalidate_chat_context nach dem Commit)
+- Profil-Aenderung (profile_version im Snapshot passt nicht mehr)
+- Tageswechsel (Datum im Snapshot)
+Andere Worker-Prozesse sehen Mahlzeiten spaetestens nach chat_context_ttl_seconds.
+
+Jede Invalidierung vergibt dem User eine neue Generation. Ein Snapshot wird nur
+gespeichert, wenn sich die Generation waehrend des Ladens nicht geaendert hat —
+sonst koennte ein Request, der vor der Invalidierung gelesen hat, die alten Werte
+wieder in den Cache schreiben.
+"""
+
+import itertools
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.balance_service import (
+    build_daily_balance,
+    calculate_target_nutrients,
+    nutrients_from_log,
+    week_trends_from_logs,
+)
+from app.services.chat_summary import MESSAGE_ORDER_DESC, schedule_refresh
+
+settings = get_settings()
+
+_snapshots = TTLCache(maxsize=settings.chat_context_cache_size, ttl=settings.chat_context_ttl_seconds)
+# User-ID → Generation (global eindeutig; fehlt der Eintrag, gilt 0)
+_generations = TTLCache(maxsize=settings.chat_context_cache_size, ttl=settings.chat_context_ttl_seconds)
+_next_generation = itertools.count(1)
+
+
+async def get_chat_context(user: dict, db: AsyncSession) -> tuple[str, list[dict], dict, dict]:
+    """
+    Gibt (Verlaufs-Zusammenfassung, juengste Nachrichten, daily_balance, week_trends) fuer
+    den Chat-Prompt zurueck — mit einer Query auf der Request-Session. Ist der Snapshot
+    aktuell, laedt die Query nur Zusammenfassung und Verlauf.
+    """
+    key = str(user["id"])
+    today = date.today()
+    stamp = (today, user.get("profile_version"))
+    cached = _snapshots.get(key)
+    fresh = cached is not None and cached[0] == stamp
+    metrics.incr("chat.context.hit" if fresh else "chat.context.miss")
+
+    generation = _generations.get(key, 0)
+    with metrics.timer("chat.context.load_ms"):
+        summary, history, logs = await _load(user["id"], today, not fresh, db)
+    if len(history) > settings.chat_recent_messages:
+        schedule_refresh(user["id"])
+    if fresh:
+        return summary, history, cached[1], cached[2]
+
+    daily_balance, week_trends = _build_chat_context(user, today, logs)
+    if _generations.get(key, 0) == generation:
+        _snapshots.set(key, (stamp, daily_balance, week_trends))
+    else:
+        metrics.incr("chat.context.stale")
+    return summary, history, daily_balance, week_trends
+
+
+def invalidate_chat_context(user_id) -> None:
+    """Nach Mahlzeit- oder Profil-Aenderungen aufrufen (nach dem Commit)."""
+    key = str(user_id)
+    _generations.set(key, next(_next_generation))
+    _snapshots.pop(key)
+
+
+async def _load(user_id, today: date, with_logs: bool, db: AsyncSession) -> tuple[str, list[dict], list[dict]]:
+    """
+    Zusammenfassung, noch nicht zusammengefasste Nachrichten (hoechstens
+    chat_history_max_messages) und — mit with_logs — die daily_logs der letzten 7 Tage.
+    """
+    result = await db.execute(
+        text(f"""
+            WITH cs AS (
+                SELECT summary, covered_until FROM chat_summaries WHERE user_id = :uid
+            ),
+            recent AS (
+                SELECT role, content, created_at FROM chat_messages
+                WHERE user_id = :uid
+                  AND created_at > COALESCE((SELECT covered_until FROM cs), '-infinity'::timestamptz)
+                ORDER BY {MESSAGE_ORDER_DESC}
+                LIMIT :limit
+            ),
+            logs AS (
+                SELECT log_date, actual_nutrients, target_nutrients FROM daily_logs
+                WHERE CAST(:with_logs AS boolean)
+                  AND user_id = :uid AND log_date BETWEEN :start AND :end
+            )
+            SELECT
+                (SELECT summary FROM cs) AS summary,
+                (SELECT json_agg(json_build_object('role', role, 'content', content)
+                                 ORDER BY {MESSAGE_ORDER_DESC}) FROM recent) AS history,
+                (SELECT json_agg(json_build_object(
+                            'log_date', log_date,
+                            'actual_nutrients', actual_nutrients,
+                            'target_nutrients', target_nutrients) ORDER BY log_date) FROM logs) AS logs
+        """),
+        {
+            "uid": user_id,
+            "limit": settings.chat_history_max_messages,
+            "with_logs": with_logs,
+            "start": today - timedelta(days=6),
+            "end": today,
+        },
+    )
+    row = result.mappings().one()
+    history, logs = row["history"] or [], row["logs"] or []
+    if isinstance(history, str):
+        history = json.loads(history)
+    if isinstance(logs, str):
+        logs = json.loads(logs)
+    return row["summary"] or "", list(reversed(history)), logs
+
+
+def _build_chat_context(user: dict, today: date, logs: list[dict]) -> tuple[dict, dict]:
+    # Die Woche enthaelt auch den heutigen Tag (log_date kommt als ISO-String aus json_agg)
+    today_raw = next((log["actual_nutrients"] for log in logs if log["log_date"] == today.isoformat()), None)
+    daily_balance = build_daily_balance(nutrients_from_log(today_raw), calculate_target_nutrients(user))
+
+    # date-Objekte in Strings konvertieren fuer JSON
+    raw_trends = week_trends_from_logs(logs, today - timedelta(days=6), today)
+    week_trends = {
+        **raw_trends,
+        "start_date": str(raw_trends["start_date"]),
+        "end_date": str(raw_trends["end_date"]),
+    }
+    return daily_balance, week_trends
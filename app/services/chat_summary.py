@@ -0,0 +1,143 @@
+"""Nourish Backend — Rollierende Zusammenfassung des Chat-Verlaufs pro Nutzer.
+
+Statt der letzten 10 Nachrichten woertlich gehen in den Chat-Prompt:
+- die Zusammenfassung aller Nachrichten bis chat_summaries.covered_until
+- alle juengeren Nachrichten woertlich (hoechstens chat_history_max_messages)
+Geladen werden beide zusammen mit dem Chat-Kontext (chat_context.get_chat_context).
+Sind mehr als chat_recent_messages juengere Nachrichten da, fasst ein
+Hintergrund-Task die aelteren davon in die Zusammenfassung ein. Die Prompt-
+Groesse bleibt so unabhaengig von der Gespraechslaenge ungefaehr konstant.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.cache import SingleFlight
+from app.core.config import get_settings
+from app.core.database import session_scope
+from app.core.metrics import metrics
+from app.services.claude_service import summarize_chat
+
+log = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_refreshing = SingleFlight()
+_tasks: set[asyncio.Task] = set()
+
+# User- und Assistant-Nachricht einer Runde werden in einer Transaktion gespeichert
+# und haben dasselbe created_at — bei Gleichstand steht die Nutzer-Nachricht vorne
+MESSAGE_ORDER_DESC = "created_at DESC, (role = 'user')"
+MESSAGE_ORDER_ASC = "created_at, (role = 'user') DESC"
+
+
+def schedule_refresh(user_id) -> None:
+    """Aktualisiert die Zusammenfassung im Hintergrund (pro User hoechstens ein Lauf gleichzeitig)."""
+    key = str(user_id)
+    if key in _refreshing:
+        return
+    task = asyncio.create_task(_refreshing.do(key, lambda: _refresh(key)))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _refresh(user_id: str) -> None:
+    try:
+        with metrics.timer("chat.summary.refresh_ms"):
+            await refresh_summary(user_id)
+    except Exception as e:
+        metrics.incr("chat.summary.error")
+        log.error("[CHAT] Zusammenfassung fuer %s fehlgeschlagen: %s", user_id, e)
+
+
+async def refresh_summary(user_id) -> Optional[str]:
+    """
+    Fasst alle Nachrichten zwischen covered_until und den juengsten chat_recent_messages
+    in die Zusammenfassung ein — aelteste zuerst, in Batches von hoechstens
+    chat_summary_batch_messages Nachrichten. covered_until rueckt nach jedem Batch vor,
+    eine lange Historie (erster Lauf fuer Bestandsnutzer) sprengt so keinen Claude-Call.
+    Gibt die neue Zusammenfassung zurueck (None = nichts zu tun).
+    """
+    summary = None
+    while True:
+        # 1. Zusammenfassung + naechsten Batch laden — Session vor Claude freigeben
+        batch = await _next_batch(user_id)
+        if batch is None:
+            return summary
+        previous, covered_until, older = batch
+
+        # 2. Claude
+        new_summary = await summarize_chat(previous, older)
+
+        # 3. Speichern — nur wenn kein anderer Lauf (z.B. anderer Worker-Prozess) schneller war
+        if not await _store(user_id, new_summary, older[-1]["created_at"], covered_until):
+            metrics.incr("chat.summary.conflict")
+            return summary
+        summary = new_summary
+        metrics.incr("chat.summary.refreshed")
+        metrics.incr("chat.summary.messages", len(older))
+
+
+async def _next_batch(user_id) -> Optional[tuple[str, Optional[datetime], list[dict]]]:
+    """(bisherige Zusammenfassung, covered_until, aelteste noch nicht zusammengefasste Nachrichten)."""
+    async with session_scope() as session:
+        result = await session.execute(
+            text("SELECT summary, covered_until FROM chat_summaries WHERE user_id = :uid"),
+            {"uid": user_id},
+        )
+        row = result.mappings().first()
+        previous, covered_until = (row["summary"], row["covered_until"]) if row else ("", None)
+
+        # Die juengsten chat_recent_messages bleiben woertlich — und mit ihnen alles, was dasselbe
+        # created_at hat wie die aelteste davon (Runden nicht zerschneiden)
+        result = await session.execute(
+            text(f"""
+                SELECT role, content, created_at FROM chat_messages
+                WHERE user_id = :uid
+                  AND (CAST(:covered AS timestamptz) IS NULL OR created_at > :covered)
+                  AND created_at < (
+                      SELECT created_at FROM chat_messages
+                      WHERE user_id = :uid
+                      ORDER BY {MESSAGE_ORDER_DESC}
+                      OFFSET :recent LIMIT 1
+                  )
+                ORDER BY {MESSAGE_ORDER_ASC}
+                LIMIT :batch
+            """),
+            {
+                "uid": user_id,
+                "covered": covered_until,
+                "recent": max(settings.chat_recent_messages - 1, 0),
+                "batch": settings.chat_summary_batch_messages,
+            },
+        )
+        older = [dict(r) for r in result.mappings()]
+
+    if not older:
+        return None
+    if len(older) == settings.chat_summary_batch_messages:
+        # Volle Batch: die letzte Runde kann angeschnitten sein — sie kommt komplett in die naechste
+        last = older[-1]["created_at"]
+        older = [m for m in older if m["created_at"] < last] or older
+    return previous, covered_until, older
+
+
+async def _store(user_id, summary: str, until: datetime, covered_until: Optional[datetime]) -> bool:
+    async with session_scope() as session:
+        result = await session.execute(
+            text("""
+                INSERT INTO chat_summaries (user_id, summary, covered_until)
+                VALUES (:uid, :summary, :until)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    summary = EXCLUDED.summary,
+                    covered_until = EXCLUDED.covered_until,
+                    updated_at = now()
+                WHERE chat_summaries.covered_until IS NOT DISTINCT FROM CAST(:covered AS timestamptz)
+            """),
+            {"uid": user_id, "summary": summary, "until": until, "covered": covered_until},
+        )
+    return result.rowcount > 0
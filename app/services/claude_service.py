@@ -1,9 +1,21 @@
 """Nourish Backend — Claude API Service für Parsing und Beratung."""
 
+import hashlib
 import json
+import logging
+import time
+from typing import AsyncIterator, Literal, Optional
+
 from anthropic import AsyncAnthropic
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services import parse_cache
+from app.services.prompt_context import encode_context, estimate_tokens
+
+log = logging.getLogger(__name__)
 
 settings = get_settings()
 client = AsyncAnthropic(api_key=settings.anthropic_api_key)
@@ -16,12 +28,16 @@ client = AsyncAnthropic(api_key=settings.anthropic_api_key)
 PARSING_SYSTEM_PROMPT = """Du bist der Nourish Food Parser. Deine Aufgabe: Extrahiere aus natürlicher Sprache eine strukturierte Liste von Lebensmitteln mit Mengen und erkenne die Uhrzeit der Mahlzeit.
 
 Regeln:
-- Gib IMMER ein JSON-Objekt zurück mit "items" (Array) und "meal_time" (String oder null)
+- Gib das Ergebnis IMMER über das bereitgestellte Tool zurück: "items" (Array) und "meal_time" (String oder null)
 - Jedes Item: {"name": "...", "amount": Zahl, "unit": "g|ml|Stück|Tasse|EL|TL|Handvoll|Scheibe|Portion"}
 - Schätze realistische Mengen wenn keine angegeben ("ein Apfel" → 150g, "etwas Butter" → 10g)
 - Erkenne deutsche Lebensmittelnamen und Umgangssprache
 - Bei Getränken: Standardgrößen verwenden ("Tasse Kaffee" → 200ml, "Glas Wasser" → 250ml)
 - Trenne zusammengesetzte Mahlzeiten in Einzelkomponenten
+- Kilogramm und Liter umrechnen: "1,5 kg" → 1500 g, "ein halber Liter" → 500 ml
+- Zahlwörter und Brüche als Zahl: "zwei" → 2, "eine halbe" → 0.5, "anderthalb" → 1.5
+- "um" oder "gegen" mit Zahl ist nur mit "Uhr" oder Minuten eine Uhrzeit ("um 2 Eier" = zwei Eier)
+- Keine Lebensmittel erkannt → "items": []
 
 meal_time Regeln:
 - Explizite Uhrzeit: "um 10:20" → "10:20", "gegen 14 Uhr" → "14:00"
@@ -52,39 +68,74 @@ Beispiel Output:
     {"name": "Kaffee", "amount": 400, "unit": "ml"},
     {"name": "Hafermilch", "amount": 60, "unit": "ml"}
   ]
+}
+
+Beispiel Input: "mittags ne große Portion Spaghetti Bolognese und ein Glas Cola"
+Beispiel Output:
+{
+  "meal_time": "12:30",
+  "items": [
+    {"name": "Spaghetti (gekocht)", "amount": 300, "unit": "g"},
+    {"name": "Bolognese-Sauce", "amount": 200, "unit": "g"},
+    {"name": "Cola", "amount": 250, "unit": "ml"}
+  ]
+}
+
+Beispiel Input: "gegen 19 Uhr zwei Scheiben Vollkornbrot mit etwas Butter, Gouda und eine halbe Avocado"
+Beispiel Output:
+{
+  "meal_time": "19:00",
+  "items": [
+    {"name": "Vollkornbrot", "amount": 2, "unit": "Scheibe"},
+    {"name": "Butter", "amount": 10, "unit": "g"},
+    {"name": "Gouda", "amount": 2, "unit": "Scheibe"},
+    {"name": "Avocado", "amount": 0.5, "unit": "Stück"}
+  ]
+}
+
+Beispiel Input: "ein Müsliriegel, 'ne Banane und anderthalb Liter Wasser"
+Beispiel Output:
+{
+  "meal_time": null,
+  "items": [
+    {"name": "Müsliriegel", "amount": 1, "unit": "Stück"},
+    {"name": "Banane", "amount": 1, "unit": "Stück"},
+    {"name": "Wasser", "amount": 1500, "unit": "ml"}
+  ]
+}
+
+Beispiel Input: "zum Abendbrot Linsencurry mit Reis, dazu 2 EL Joghurt"
+Beispiel Output:
+{
+  "meal_time": "19:00",
+  "items": [
+    {"name": "Linsencurry", "amount": 350, "unit": "g"},
+    {"name": "Reis (gekocht)", "amount": 150, "unit": "g"},
+    {"name": "Joghurt", "amount": 2, "unit": "EL"}
+  ]
 }"""
 
 
-def build_feedback_prompt(user_profile: dict, daily_balance: dict) -> str:
-    """Baut den System-Prompt für KI-Feedback nach einer Mahlzeit."""
-    return f"""Du bist Nourish — ein kluger, wohlwollender Ernährungsberater. 
+FEEDBACK_GUIDELINES = """Du bist Nourish — ein kluger, wohlwollender Ernährungsberater. 
 
 WICHTIGSTE REGEL: Erkläre immer das WARUM, nicht nur das WAS. Verbinde jedes Feedback mit einer konkreten Körperreaktion.
 
 Ton: Wie ein kluger Freund. Warm, motivierend, nie verurteilend. Nie Arzt-Ton. Duze den Nutzer.
 
-Nutzer-Profil:
-- Name: {user_profile.get('display_name', 'Nutzer')}
-- Geschlecht: {user_profile.get('gender', 'nicht angegeben')}
-- Ernährung: {user_profile.get('diet_type', 'omnivore')}
-- Ziel: {user_profile.get('health_goal', 'general_health')}
-- Intoleranzen: {', '.join(user_profile.get('intolerances', [])) or 'keine'}
-
-Aktuelle Tagesbilanz:
-{json.dumps(daily_balance, indent=2, ensure_ascii=False)}
-
 Aufgabe: Gib ein kurzes Feedback (2-4 Sätze) zur gerade erfassten Mahlzeit. 
 - Bei Defiziten: Erkläre was im Körper passiert und schlage konkrete Lebensmittel vor
 - Bei guten Werten: Fun Fact über die positive Wirkung
 - Wenn relevant: Verlinke auf Knowledge-Base-Artikel mit [Mehr über THEMA]
-- Maximal 1 Knowledge-Link pro Feedback
+- Maximal 1 Knowledge-Link pro Feedback"""
 
-Antworte NUR mit dem Feedback-Text, kein JSON."""
+FEEDBACK_SYSTEM_PROMPT = FEEDBACK_GUIDELINES + """
 
+Antworte NUR mit dem Feedback-Text, kein JSON.
 
-def build_chat_prompt(user_profile: dict, daily_balance: dict, week_trends: dict) -> str:
-    """Baut den System-Prompt für den Nourish Chat."""
-    return f"""Du bist Nourish — ein kluger, wohlwollender Ernährungsbegleiter mit dem Ziel, Menschen zu befähigen, ihre Ernährung zu verstehen.
+Nutzer-Profil und aktuelle Tagesbilanz folgen unten."""
+
+
+CHAT_SYSTEM_PROMPT = """Du bist Nourish — ein kluger, wohlwollender Ernährungsbegleiter mit dem Ziel, Menschen zu befähigen, ihre Ernährung zu verstehen.
 
 PHILOSOPHIE: "Erkenntnis vor Compliance" — Erkläre immer WARUM etwas wichtig ist, nicht nur WAS der Nutzer tun soll. Verbinde abstrakte Nährstoffe mit konkreten Körperreaktionen, die der Nutzer fühlen kann.
 
@@ -95,57 +146,318 @@ Wenn du über Studien sprichst:
 - Erkläre die Kernaussage verständlich
 - Markiere Evidenzstärke (Meta-Analyse > RCT > Kohortenstudie > Einzelstudie)
 
-Nutzer-Profil:
+WICHTIG: Du bist kein Arzt. Bei medizinischen Fragen empfiehl einen Arztbesuch. Disclaimer: "Das ist Ernährungswissen, keine medizinische Beratung."
+
+Nutzer-Profil, Tagesbilanz und Wochentrends folgen unten, bei längeren Gesprächen auch eine Zusammenfassung des bisherigen Verlaufs."""
+
+
+CHAT_SUMMARY_SYSTEM_PROMPT = """Du fasst ein Gespräch zwischen einem Nutzer und Nourish (Ernährungsbegleiter) für den weiteren Chat zusammen.
+
+Regeln:
+- Ergänze die bisherige Zusammenfassung (falls vorhanden) um die neuen Nachrichten zu EINER Zusammenfassung
+- Behalte: Fragen und Anliegen des Nutzers, persönliche Angaben (Beschwerden, Vorlieben, Ziele, Umstände), gegebene Empfehlungen und Zusagen, offene Punkte
+- Lass weg: Begrüßungen, Wiederholungen, ausführliche Erklärungen (nur die Kernaussage), Studien-Details
+- Stichpunkte, knapp, auf Deutsch, aus Sicht eines Beobachters ("Nutzer fragt ...", "Nourish empfahl ...")
+- Gib nur die Zusammenfassung zurück, ohne Einleitung"""
+
+
+# Parsing + Feedback in einem Call: statischer Teil = Parsing-Regeln + Feedback-Regeln
+PARSE_FEEDBACK_SYSTEM_PROMPT = PARSING_SYSTEM_PROMPT + """
+
+Zusätzlich: Feedback zur Mahlzeit
+Gib im Tool-Feld "feedback" (String) ein Feedback zur Mahlzeit zurück. Dafür gilt:
+""" + FEEDBACK_GUIDELINES + """
+
+Nutzer-Profil und aktuelle Tagesbilanz folgen unten."""
+
+
+# ══════════════════════════════════════════════
+# Strukturierte Ausgabe (Tool Use)
+# ══════════════════════════════════════════════
+
+PARSE_UNITS = ["g", "ml", "Stück", "Tasse", "EL", "TL", "Handvoll", "Scheibe", "Portion"]
+ParseUnit = Literal[tuple(PARSE_UNITS)]
+
+# HH:MM bzw. H:MM mit gueltiger Stunde (0-23) und Minute (0-59)
+MEAL_TIME_PATTERN = r"^([01]?\d|2[0-3]):[0-5]\d$"
+
+_MEAL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "meal_time": {
+            "type": ["string", "null"],
+            "pattern": MEAL_TIME_PATTERN,
+            "description": "Uhrzeit der Mahlzeit als HH:MM oder null",
+        },
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "minLength": 1},
+                    "amount": {"type": "number", "exclusiveMinimum": 0},
+                    "unit": {"type": "string", "enum": PARSE_UNITS},
+                },
+                "required": ["name", "amount", "unit"],
+            },
+        },
+    },
+    "required": ["meal_time", "items"],
+}
+
+PARSE_TOOL = {
+    "name": "record_meal",
+    "description": "Speichert die erkannten Lebensmittel mit Mengen und die Uhrzeit der Mahlzeit.",
+    "input_schema": _MEAL_SCHEMA,
+}
+
+PARSE_FEEDBACK_TOOL = {
+    "name": "record_meal_with_feedback",
+    "description": "Speichert die erkannten Lebensmittel, die Uhrzeit und das Feedback zur Mahlzeit.",
+    "input_schema": {
+        **_MEAL_SCHEMA,
+        "properties": {
+            **_MEAL_SCHEMA["properties"],
+            "feedback": {"type": "string", "minLength": 1, "description": "Feedback-Text (2-4 Sätze)"},
+        },
+        "required": ["meal_time", "items", "feedback"],
+    },
+}
+
+
+class ParsedItem(BaseModel):
+    name: str = Field(min_length=1)
+    amount: float = Field(gt=0)
+    unit: ParseUnit
+
+
+class ParsedMeal(BaseModel):
+    items: list[ParsedItem]
+    meal_time: Optional[str] = Field(default=None, pattern=MEAL_TIME_PATTERN)
+
+
+class ParsedMealWithFeedback(ParsedMeal):
+    feedback: str = Field(min_length=1)
+
+
+# Version fuer den Parse-Cache: aendert sich mit Prompt oder Modell
+PARSE_PROMPT_VERSION = hashlib.sha256(
+    f"{settings.claude_model_fast}\n{PARSING_SYSTEM_PROMPT}\n{json.dumps(PARSE_TOOL, sort_keys=True)}".encode()
+).hexdigest()[:16]
+
+
+# Prompt Caching: Anthropic cacht den Praefix (Tools + System) erst ab ~1024 Tokens,
+# darunter kostet die Markierung nur. Markiert werden deshalb nur Prompts, deren
+# statischer Teil (geschaetzt) lang genug ist — derzeit die Parse-Prompts mit Beispielen.
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+def _cacheable(static: str, tool: Optional[dict] = None) -> bool:
+    tokens = estimate_tokens(static)
+    if tool is not None:
+        tokens += estimate_tokens(json.dumps(tool, ensure_ascii=False))
+    return settings.claude_prompt_cache and tokens >= PROMPT_CACHE_MIN_TOKENS
+
+
+_CACHE_PARSE = _cacheable(PARSING_SYSTEM_PROMPT, PARSE_TOOL)
+_CACHE_PARSE_FEEDBACK = _cacheable(PARSE_FEEDBACK_SYSTEM_PROMPT, PARSE_FEEDBACK_TOOL)
+_CACHE_FEEDBACK = _cacheable(FEEDBACK_SYSTEM_PROMPT)
+_CACHE_CHAT = _cacheable(CHAT_SYSTEM_PROMPT)
+_CACHE_CHAT_SUMMARY = _cacheable(CHAT_SUMMARY_SYSTEM_PROMPT)
+
+
+def _profile_block(user_profile: dict) -> str:
+    return f"""Nutzer-Profil:
 - Name: {user_profile.get('display_name', 'Nutzer')}
 - Geschlecht: {user_profile.get('gender', 'nicht angegeben')}
 - Ernährung: {user_profile.get('diet_type', 'omnivore')}
 - Ziel: {user_profile.get('health_goal', 'general_health')}
-- Intoleranzen: {', '.join(user_profile.get('intolerances', [])) or 'keine'}
+- Intoleranzen: {', '.join(user_profile.get('intolerances', [])) or 'keine'}"""
 
-Tagesbilanz heute:
-{json.dumps(daily_balance, indent=2, ensure_ascii=False)}
 
-Wochentrends (Ø der letzten 7 Tage):
-{json.dumps(week_trends, indent=2, ensure_ascii=False)}
+def build_system(static: str, dynamic: str = "", cache: bool = False) -> list[dict]:
+    """
+    System-Prompt als Content-Blocks: statischer Praefix (mit cache=True fuer Prompt
+    Caching markiert) plus optionaler nutzerspezifischer Suffix.
+    """
+    prefix = {"type": "text", "text": static}
+    if cache:
+        prefix["cache_control"] = {"type": "ephemeral"}
+    blocks = [prefix]
+    if dynamic:
+        blocks.append({"type": "text", "text": dynamic})
+    return blocks
 
-WICHTIG: Du bist kein Arzt. Bei medizinischen Fragen empfiehl einen Arztbesuch. Disclaimer: "Das ist Ernährungswissen, keine medizinische Beratung."
-"""
+
+def build_feedback_prompt(user_profile: dict, daily_balance: dict) -> list[dict]:
+    """Baut den System-Prompt für KI-Feedback nach einer Mahlzeit."""
+    return build_system(FEEDBACK_SYSTEM_PROMPT, f"""{_profile_block(user_profile)}
+
+Aktuelle Tagesbilanz:
+{encode_context(daily_balance)}""", cache=_CACHE_FEEDBACK)
+
+
+def build_chat_prompt(
+    user_profile: dict,
+    daily_balance: dict,
+    week_trends: dict,
+    chat_summary: str = "",
+) -> list[dict]:
+    """Baut den System-Prompt für den Nourish Chat."""
+    dynamic = f"""{_profile_block(user_profile)}
+
+Tagesbilanz und Wochentrends (Ist/Soll, % vom Tagesziel):
+{encode_context(daily_balance, week_trends)}"""
+    if chat_summary:
+        dynamic += f"""
+
+Bisheriger Gesprächsverlauf (Zusammenfassung älterer Nachrichten):
+{chat_summary}"""
+    return build_system(CHAT_SYSTEM_PROMPT, dynamic, cache=_CACHE_CHAT)
+
+
+def record_usage(kind: str, usage) -> None:
+    """
+    Token-Verbrauch pro Call als Metriken:
+    claude.{kind}.input_tokens.{uncached,cache_read,cache_write} und .output_tokens.
+    """
+    if usage is None:
+        return
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    metrics.incr(f"claude.{kind}.calls")
+    metrics.incr(f"claude.{kind}.input_tokens.uncached", usage.input_tokens or 0)
+    metrics.incr(f"claude.{kind}.input_tokens.cache_read", cache_read)
+    metrics.incr(f"claude.{kind}.input_tokens.cache_write", cache_write)
+    metrics.incr(f"claude.{kind}.output_tokens", usage.output_tokens or 0)
+    if cache_read:
+        metrics.incr(f"claude.{kind}.cache_hit")
 
 
 # ══════════════════════════════════════════════
 # API Calls
 # ══════════════════════════════════════════════
 
-async def parse_food_input(text: str) -> dict:
+async def parse_food_input(text: str, db: Optional[AsyncSession] = None) -> dict:
     """Parst natürliche Sprache in strukturierte Lebensmittel-Liste mit optionaler Uhrzeit.
 
+    Gleiche Eingaben (nach Normalisierung) kommen aus dem Parse-Cache statt von Claude.
+
     Returns: {"items": [...], "meal_time": "HH:MM" oder None}
     """
-    response = await client.messages.create(
-        model=settings.claude_model_fast,
+    key = parse_cache.normalize(text)
+    cached = await parse_cache.get(PARSE_PROMPT_VERSION, key, db)
+    if cached is not None:
+        return cached
+
+    parsed = await _parse_with_claude(text)
+    await parse_cache.put(PARSE_PROMPT_VERSION, key, parsed, db)
+    return parsed
+
+
+async def _parse_with_claude(text: str) -> dict:
+    return await _call_meal_tool(
+        "parse", PARSE_TOOL, ParsedMeal, build_system(PARSING_SYSTEM_PROMPT, cache=_CACHE_PARSE), text,
         max_tokens=1024,
-        system=PARSING_SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": text}],
     )
 
-    try:
-        content = response.content[0].text.strip()
-        # Manchmal kommt JSON in Backticks
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        parsed = json.loads(content)
-
-        # Abwaertskompatibilitaet: falls Claude noch ein Array liefert
-        if isinstance(parsed, list):
-            return {"items": parsed, "meal_time": None}
-        return {
-            "items": parsed.get("items", []),
-            "meal_time": parsed.get("meal_time"),
-        }
-    except (json.JSONDecodeError, IndexError):
-        return {"items": [], "meal_time": None}
+
+async def _call_meal_tool(
+    kind: str,
+    tool: dict,
+    model: type[BaseModel],
+    system: list[dict],
+    text: str,
+    max_tokens: int,
+) -> dict:
+    """
+    Erzwingt einen Tool-Aufruf und validiert dessen Input gegen das Pydantic-Model.
+    Bei ungueltigem Output bekommt Claude den Validierungsfehler als tool_result zurueck
+    und darf claude_parse_repair_retries-mal korrigieren. Danach: leere Item-Liste.
+
+    Metriken: claude.{kind}.invalid, .repaired, .failed
+    """
+    messages: list[dict] = [{"role": "user", "content": text}]
+    for attempt in range(settings.claude_parse_repair_retries + 1):
+        with metrics.timer(f"claude.{kind}.ms"):
+            response = await client.messages.create(
+                model=settings.claude_model_fast,
+                max_tokens=max_tokens,
+                system=system,
+                tools=[tool],
+                tool_choice={"type": "tool", "name": tool["name"]},
+                messages=messages,
+            )
+        record_usage(kind, response.usage)
+
+        block = next((b for b in response.content if b.type == "tool_use"), None)
+        try:
+            if block is None:
+                raise ValueError(f"Kein Tool-Aufruf (stop_reason={response.stop_reason})")
+            result = model.model_validate(block.input).model_dump()
+        except (ValidationError, ValueError) as e:
+            error = _describe_error(e)
+            metrics.incr(f"claude.{kind}.invalid")
+            log.warning("[PARSE] Ungueltiger %s-Output (Versuch %d): %s", kind, attempt + 1, error)
+            if block is not None:
+                messages = messages + [
+                    {"role": "assistant", "content": [b.model_dump(exclude_none=True) for b in response.content]},
+                    {"role": "user", "content": [{
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "is_error": True,
+                        "content": f"Ungültige Eingabe: {error}\nBitte rufe {tool['name']} korrigiert erneut auf.",
+                    }]},
+                ]
+            continue
+
+        if attempt:
+            metrics.incr(f"claude.{kind}.repaired")
+        return result
+
+    metrics.incr(f"claude.{kind}.failed")
+    log.error("[PARSE] %s nach %d Versuchen ohne gueltiges Ergebnis", kind, settings.claude_parse_repair_retries + 1)
+    return {"items": [], "meal_time": None}
+
+
+def _describe_error(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+        )
+    return str(e)
+
+
+async def parse_food_input_with_feedback(
+    text: str,
+    user_profile: dict,
+    daily_balance: dict,
+    db: Optional[AsyncSession] = None,
+) -> dict:
+    """Parsing und Mahlzeit-Feedback in einem Claude-Call (MEAL_PARSE_MODE=combined).
+
+    Returns: {"items": [...], "meal_time": ..., "feedback": str oder None}. Bei einem
+    Parse-Cache-Treffer ist feedback None — der Aufrufer erzeugt es dann wie gewohnt.
+    Ergebnisse dieses Calls werden nicht gecacht: sie stammen aus einem anderen Prompt
+    (PARSE_FEEDBACK_SYSTEM_PROMPT) als PARSE_PROMPT_VERSION beschreibt.
+    """
+    key = parse_cache.normalize(text)
+    cached = await parse_cache.get(PARSE_PROMPT_VERSION, key, db)
+    if cached is not None:
+        return {**cached, "feedback": None}
+
+    parsed = await _parse_and_feedback_with_claude(text, user_profile, daily_balance)
+    return {**parsed, "feedback": parsed.get("feedback")}
+
+
+async def _parse_and_feedback_with_claude(text: str, user_profile: dict, daily_balance: dict) -> dict:
+    system = build_system(PARSE_FEEDBACK_SYSTEM_PROMPT, f"""{_profile_block(user_profile)}
+
+Aktuelle Tagesbilanz:
+{encode_context(daily_balance)}""", cache=_CACHE_PARSE_FEEDBACK)
+    return await _call_meal_tool(
+        "parse_feedback", PARSE_FEEDBACK_TOOL, ParsedMealWithFeedback, system, text, max_tokens=1536,
+    )
 
 
 async def generate_meal_feedback(
@@ -161,15 +473,17 @@ async def generate_meal_feedback(
         for item in meal_items
     )
 
-    response = await client.messages.create(
-        model=settings.claude_model_fast,
-        max_tokens=512,
-        system=system,
-        messages=[{
-            "role": "user",
-            "content": f"Gerade erfasste Mahlzeit:\n{items_text}",
-        }],
-    )
+    with metrics.timer("claude.feedback.ms"):
+        response = await client.messages.create(
+            model=settings.claude_model_fast,
+            max_tokens=512,
+            system=system,
+            messages=[{
+                "role": "user",
+                "content": f"Gerade erfasste Mahlzeit:\n{items_text}",
+            }],
+        )
+    record_usage("feedback", response.usage)
 
     return response.content[0].text
 
@@ -180,24 +494,88 @@ async def chat_with_nourish(
     user_profile: dict,
     daily_balance: dict,
     week_trends: dict,
+    chat_summary: str = "",
 ) -> str:
     """Freitext-Chat mit Nourish."""
-    system = build_chat_prompt(user_profile, daily_balance, week_trends)
+    with metrics.timer("claude.chat.ms"):
+        response = await client.messages.create(
+            **_chat_request(user_message, chat_history, user_profile, daily_balance, week_trends, chat_summary)
+        )
+    record_usage("chat", response.usage)
+
+    return response.content[0].text
+
+
+async def stream_chat_with_nourish(
+    user_message: str,
+    chat_history: list[dict],
+    user_profile: dict,
+    daily_balance: dict,
+    week_trends: dict,
+    chat_summary: str = "",
+) -> AsyncIterator[str]:
+    """Wie chat_with_nourish, liefert die Antwort aber stückweise, sobald Claude Text erzeugt.
+
+    Metriken: claude.chat.ttft_ms (Zeit bis zum ersten Text), claude.chat.stream_ms (gesamt).
+    """
+    start = time.perf_counter()
+    first = True
+    async with client.messages.stream(
+        **_chat_request(user_message, chat_history, user_profile, daily_balance, week_trends, chat_summary)
+    ) as stream:
+        async for chunk in stream.text_stream:
+            if first and chunk:
+                metrics.observe("claude.chat.ttft_ms", (time.perf_counter() - start) * 1000)
+                first = False
+            yield chunk
+        final = await stream.get_final_message()
+    record_usage("chat", final.usage)
+    metrics.observe("claude.chat.stream_ms", (time.perf_counter() - start) * 1000)
+
+
+def _chat_request(
+    user_message: str,
+    chat_history: list[dict],
+    user_profile: dict,
+    daily_balance: dict,
+    week_trends: dict,
+    chat_summary: str = "",
+) -> dict:
+    """Gemeinsame Request-Parameter fuer Chat (blockierend und gestreamt)."""
+    system = build_chat_prompt(user_profile, daily_balance, week_trends, chat_summary)
 
-    # Letzte N Chat-Nachrichten als Kontext
+    # Juengste Chat-Nachrichten woertlich, aeltere stecken in chat_summary
     messages = []
-    for msg in chat_history[-10:]:
+    for msg in chat_history[-settings.chat_history_max_messages:]:
         messages.append({
             "role": msg["role"],
             "content": msg["content"],
         })
     messages.append({"role": "user", "content": user_message})
 
-    response = await client.messages.create(
-        model=settings.claude_model_chat,
-        max_tokens=2048,
-        system=system,
-        messages=messages,
-    )
+    return {
+        "model": settings.claude_model_chat,
+        "max_tokens": 2048,
+        "system": system,
+        "messages": messages,
+    }
 
-    return response.content[0].text
+
+async def summarize_chat(previous_summary: str, messages: list[dict]) -> str:
+    """Fasst aeltere Chat-Nachrichten (plus bisherige Zusammenfassung) zu einer neuen Zusammenfassung zusammen."""
+    transcript = "\n\n".join(
+        f"{'Nutzer' if msg['role'] == 'user' else 'Nourish'}: {msg['content']}"
+        for msg in messages
+    )
+    content = f"Bisherige Zusammenfassung:\n{previous_summary or '(keine)'}\n\nNeue Nachrichten:\n{transcript}"
+
+    with metrics.timer("claude.chat_summary.ms"):
+        response = await client.messages.create(
+            model=settings.claude_model_fast,
+            max_tokens=settings.chat_summary_max_tokens,
+            system=build_system(CHAT_SUMMARY_SYSTEM_PROMPT, cache=_CACHE_CHAT_SUMMARY),
+            messages=[{"role": "user", "content": content}],
+        )
+    record_usage("chat_summary", response.usage)
+
+    return response.content[0].text.strip()
@@ -0,0 +1,148 @@
+"""Nourish Backend — KI-Feedback zu Mahlzeiten im Hintergrund erzeugen.
+
+Die Mahlzeit wird mit ai_feedback_status = 'pending' gespeichert und sofort
+zurueckgegeben; der Worker erzeugt das Feedback danach und schreibt es in
+food_entries.ai_feedback. Die Zeile selbst ist der Job: eine In-Process-Queue
+sorgt fuer sofortige Abarbeitung, der Sweeper holt liegengebliebene Jobs
+(Neustart, anderer Worker-Prozess abgestuerzt) per SKIP LOCKED wieder ab.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.core.database import session_scope
+from app.core.metrics import metrics
+from app.services.balance_service import load_daily_balance
+from app.services.claude_service import generate_meal_feedback
+
+log = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_queue: asyncio.Queue = asyncio.Queue()
+
+
+def enqueue_feedback(entry_id) -> None:
+    """Plant die Feedback-Erzeugung ein. Erst nach dem Commit der Mahlzeit aufrufen."""
+    _queue.put_nowait(str(entry_id))
+    metrics.incr("feedback.enqueued")
+
+
+async def run_feedback_worker() -> None:
+    """Hintergrund-Task: arbeitet die Queue mit feedback_workers parallelen Consumern ab."""
+    await asyncio.gather(*(_consume() for _ in range(settings.feedback_workers)))
+
+
+async def run_feedback_sweeper() -> None:
+    """Hintergrund-Task: reiht liegengebliebene 'pending'-Eintraege erneut ein."""
+    while True:
+        await asyncio.sleep(settings.feedback_sweep_seconds)
+        try:
+            async with session_scope() as db:
+                result = await db.execute(
+                    text("""
+                        UPDATE food_entries SET ai_feedback_requested_at = now()
+                        WHERE id IN (
+                            SELECT id FROM food_entries
+                            WHERE ai_feedback_status = 'pending'
+                              AND ai_feedback_requested_at < now() - make_interval(secs => :stale)
+                            ORDER BY ai_feedback_requested_at
+                            LIMIT 50
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING id
+                    """),
+                    {"stale": settings.feedback_stale_seconds},
+                )
+                stale = [row[0] for row in result]
+            for entry_id in stale:
+                enqueue_feedback(entry_id)
+            if stale:
+                metrics.incr("feedback.swept", len(stale))
+                log.warning("[FEEDBACK] %d liegengebliebene Jobs neu eingereiht", len(stale))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("[FEEDBACK] Sweep fehlgeschlagen: %s", e)
+
+
+async def _consume() -> None:
+    while True:
+        entry_id = await _queue.get()
+        try:
+            with metrics.timer("feedback.generate_ms"):
+                await generate_feedback_for_entry(entry_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("[FEEDBACK] Unerwarteter Fehler fuer %s: %s", entry_id, e)
+        finally:
+            _queue.task_done()
+
+
+async def generate_feedback_for_entry(entry_id: str) -> None:
+    """Erzeugt das Feedback fuer einen Eintrag und speichert es (oder zaehlt den Fehlversuch)."""
+    # 1. Eintrag + Items + Nutzer laden — Session vor dem Claude-Call wieder freigeben
+    async with session_scope() as db:
+        result = await db.execute(
+            text("""
+                SELECT fe.ai_feedback_status, fe.ai_feedback_requested_at, fe.meal_date AS entry_meal_date, u.*
+                FROM food_entries fe
+                JOIN users u ON u.id = fe.user_id
+                WHERE fe.id = :eid
+            """),
+            {"eid": entry_id},
+        )
+        row = result.mappings().first()
+        if row is None or row["ai_feedback_status"] != "pending":
+            return
+        requested_at = row["ai_feedback_requested_at"]
+        user = {k: v for k, v in row.items() if not k.startswith("ai_feedback_") and k != "entry_meal_date"}
+        items_result = await db.execute(
+            text("""
+                SELECT name, amount, unit FROM food_items
+                WHERE food_entry_id = :eid ORDER BY sort_order
+            """),
+            {"eid": entry_id},
+        )
+        items = [dict(r) for r in items_result.mappings()]
+        # Tagesbilanz inkl. dieser Mahlzeit (sie ist beim Enqueue bereits gespeichert)
+        daily_balance = await load_daily_balance(user, row["entry_meal_date"], db)
+
+    # 2. Claude
+    try:
+        feedback = await generate_meal_feedback(items, user, daily_balance)
+    except Exception as e:
+        metrics.incr("feedback.error")
+        log.error("[FEEDBACK] Claude-Fehler fuer %s: %s", entry_id, e)
+        async with session_scope() as db:
+            await db.execute(
+                text("""
+                    UPDATE food_entries
+                    SET ai_feedback_attempts = ai_feedback_attempts + 1,
+                        ai_feedback_status = CASE
+                            WHEN ai_feedback_attempts + 1 >= :max THEN 'failed' ELSE 'pending' END
+                    WHERE id = :eid AND ai_feedback_status = 'pending'
+                      AND ai_feedback_requested_at IS NOT DISTINCT FROM :req
+                """),
+                {"eid": entry_id, "req": requested_at, "max": settings.feedback_max_attempts},
+            )
+        return
+
+    # 3. Speichern — nur wenn der Job nicht inzwischen neu angefordert wurde
+    #    (Mahlzeit neu geparst oder vom Sweeper uebernommen)
+    async with session_scope() as db:
+        await db.execute(
+            text("""
+                UPDATE food_entries
+                SET ai_feedback = :fb, ai_feedback_status = 'done',
+                    ai_feedback_attempts = ai_feedback_attempts + 1
+                WHERE id = :eid AND ai_feedback_status = 'pending'
+                  AND ai_feedback_requested_at IS NOT DISTINCT FROM :req
+            """),
+            {"eid": entry_id, "req": requested_at, "fb": feedback},
+        )
+    metrics.incr("feedback.done")
@@ -0,0 +1,106 @@
+"""Nourish Backend — Gecachte Wissensartikel (Artikel + Health Effects + Studien).
+
+Artikel aendern sich wenige Male im Monat. Ein Artikel wird deshalb mit einer
+einzigen Query geladen, fertig serialisiert im Prozess gecacht und mit einem
+ETag aus (version, updated_at) ausgeliefert. Nach knowledge_revalidate_seconds
+prueft eine kleine Query, ob sich version/updated_at geaendert hat — nur dann
+wird neu geladen. Aenderungen an health_effects/study_references setzen per
+Trigger updated_at des Artikels (012_knowledge_touch.sql).
+"""
+
+import json
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.models.schemas import KnowledgeArticleResponse
+
+settings = get_settings()
+
+_articles = TTLCache(maxsize=settings.knowledge_cache_size, ttl=settings.knowledge_cache_ttl_seconds)
+
+
+async def get_article(slug: str, db: AsyncSession) -> Optional[dict]:
+    """
+    Gibt {"etag": ..., "body": bytes} fuer einen veroeffentlichten Artikel zurueck, None wenn
+    es ihn nicht (mehr) gibt. body ist das fertig serialisierte KnowledgeArticleResponse-JSON.
+    """
+    entry = _articles.get(slug)
+    if entry is not None:
+        if time.monotonic() - entry["checked_at"] < settings.knowledge_revalidate_seconds:
+            metrics.incr("knowledge.cache.hit")
+            return entry
+        stamp = await _load_stamp(slug, db)
+        if stamp is not None and stamp == entry["stamp"]:
+            metrics.incr("knowledge.cache.revalidated")
+            entry["checked_at"] = time.monotonic()
+            _articles.set(slug, entry)
+            return entry
+        _articles.pop(slug)
+    metrics.incr("knowledge.cache.miss")
+
+    with metrics.timer("knowledge.load_ms"):
+        row = await _load_article(slug, db)
+    if row is None:
+        return None
+    stamp = (row["version"], row["updated_at"])
+    entry = {
+        "stamp": stamp,
+        "etag": _etag(stamp),
+        "body": KnowledgeArticleResponse.model_validate(row).model_dump_json().encode(),
+        "checked_at": time.monotonic(),
+    }
+    _articles.set(slug, entry)
+    return entry
+
+
+def _etag(stamp: tuple) -> str:
+    version, updated_at = stamp
+    micros = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    return f'"{version}-{micros:x}"'
+
+
+async def _load_stamp(slug: str, db: AsyncSession) -> Optional[tuple]:
+    result = await db.execute(
+        text("""
+            SELECT COALESCE(version, 1) AS version, updated_at FROM knowledge_articles
+            WHERE slug = :slug AND is_published = TRUE
+        """),
+        {"slug": slug},
+    )
+    row = result.mappings().first()
+    return (row["version"], row["updated_at"]) if row else None
+
+
+async def _load_article(slug: str, db: AsyncSession) -> Optional[dict]:
+    """Artikel mit Health Effects und Studien in einer Query (JSON-Aggregation)."""
+    result = await db.execute(
+        text("""
+            SELECT ka.*,
+                   COALESCE((
+                       SELECT json_agg(he ORDER BY he.sort_order)
+                       FROM health_effects he WHERE he.article_id = ka.id
+                   ), '[]'::json) AS effects,
+                   COALESCE((
+                       SELECT json_agg(sr ORDER BY sr.sort_order)
+                       FROM study_references sr WHERE sr.article_id = ka.id
+                   ), '[]'::json) AS studies
+            FROM knowledge_articles ka
+            WHERE ka.slug = :slug AND ka.is_published = TRUE
+        """),
+        {"slug": slug},
+    )
+    row = result.mappings().first()
+    if row is None:
+        return None
+    article = dict(row)
+    article["version"] = article["version"] or 1
+    for key in ("effects", "studies"):
+        if isinstance(article[key], str):
+            article[key] = json.loads(article[key])
+    return article
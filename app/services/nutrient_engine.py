@@ -0,0 +1,179 @@
+"""Nourish Backend — Vektorisierte Nährstoff-Berechnungen (NumPy).
+
+Alle Nährstoffe werden als float64-Vektor in der festen Feldreihenfolge von
+NutrientProfile gerechnet: Skalieren, Summieren über viele Items/Tage,
+Soll/Ist-Vergleich und Status-Klassifikation laufen als Array-Operationen.
+Das Pydantic-Model wird erst an der API-Grenze gebaut (to_profile).
+"""
+
+import json
+from itertools import repeat
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.models.schemas import NutrientProfile
+
+
+# Feste Reihenfolge — identisch mit food_items.nutrient_vector (007_nutrient_vector.sql)
+FIELDS: tuple[str, ...] = tuple(NutrientProfile.model_fields)
+N_FIELDS = len(FIELDS)
+INDEX = {field: i for i, field in enumerate(FIELDS)}
+
+# Limit-Felder: weniger ist besser, 0% ist optimal
+# NICHT enthalten: sodium, fat_saturated (echte Zielwerte mit moeglichem Defizit)
+LIMIT_FIELDS = frozenset({
+    "caffeine", "alcohol", "fat_trans",
+    "carbs_sugar", "carbs_sugar_glucose", "carbs_sugar_fructose",
+    "carbs_starch",
+})
+_LIMIT_MASK = np.array([field in LIMIT_FIELDS for field in FIELDS])
+
+_STATUS = np.array(["ok", "deficit", "excess"])
+
+
+def _as_dict(nutrients) -> Optional[dict]:
+    """JSONB wird je nach Treiber als dict oder als str zurueckgegeben."""
+    if isinstance(nutrients, str):
+        nutrients = json.loads(nutrients)
+    return nutrients if isinstance(nutrients, dict) else None
+
+
+def _row_dict(nutrients) -> dict:
+    if isinstance(nutrients, NutrientProfile):
+        return nutrients.__dict__
+    return _as_dict(nutrients) or {}
+
+
+def _slow_vector(nutrients: dict) -> np.ndarray:
+    """Feldweise, fuer Dicts mit nicht-numerischen Werten (Strings, Listen, ...)."""
+    vec = np.zeros(N_FIELDS)
+    for key, value in nutrients.items():
+        i = INDEX.get(key)
+        if i is not None and isinstance(value, (int, float)) and not isinstance(value, bool):
+            vec[i] = value
+    return vec
+
+
+def _dicts_to_matrix(rows: list[dict]) -> np.ndarray:
+    """
+    Eine Konvertierung fuer alle Zeilen statt Feld fuer Feld — der Normalfall sind
+    reine Zahlen-Dicts. None wird zu 0, Zahl-Strings werden als Zahl gelesen;
+    alles, was NumPy nicht als Zahl nimmt, geht den feldweisen Weg.
+    """
+    try:
+        matrix = np.array([[row.get(f, 0.0) for f in FIELDS] for row in rows], dtype=float)
+    except (TypeError, ValueError):
+        return np.vstack([_slow_vector(row) for row in rows])
+    return _zero_missing(matrix)
+
+
+def _zero_missing(values: np.ndarray) -> np.ndarray:
+    missing = np.isnan(values)
+    if missing.any():
+        values[missing] = 0.0
+    return values
+
+
+def to_vector(nutrients) -> np.ndarray:
+    """dict / JSONB-String / NutrientProfile → Vektor (unbekannte oder nicht-numerische Werte = 0)."""
+    nutrients = _row_dict(nutrients)
+    if not nutrients:
+        return np.zeros(N_FIELDS)
+    try:
+        vec = np.fromiter(map(nutrients.get, FIELDS, repeat(0.0)), dtype=float, count=N_FIELDS)
+    except (TypeError, ValueError):
+        return _slow_vector(nutrients)
+    return _zero_missing(vec)
+
+
+def to_matrix(rows: Iterable) -> np.ndarray:
+    """Viele Naehrstoff-Dicts → Matrix (Zeilen = Items/Tage, Spalten = FIELDS)."""
+    rows = [_row_dict(row) for row in rows]
+    if not rows:
+        return np.zeros((0, N_FIELDS))
+    return _dicts_to_matrix(rows)
+
+
+def from_arrays(arrays: Iterable) -> np.ndarray:
+    """
+    food_items.nutrient_vector-Arrays aus Postgres → Matrix. NULL-Arrays (Items ohne
+    Naehrstoffe) werden uebersprungen, kuerzere Arrays (aeltere Feldliste) mit 0 aufgefuellt.
+    """
+    arrays = [a for a in arrays if a]
+    if not arrays:
+        return np.zeros((0, N_FIELDS))
+    if all(len(a) == N_FIELDS for a in arrays):
+        return _zero_missing(np.array(arrays, dtype=float))
+    matrix = np.zeros((len(arrays), N_FIELDS))
+    for i, values in enumerate(arrays):
+        values = values[:N_FIELDS]
+        matrix[i, :len(values)] = [v or 0.0 for v in values]
+    return matrix
+
+
+def to_profile(vec: np.ndarray, decimals: Optional[int] = 2) -> NutrientProfile:
+    """Vektor → NutrientProfile (nur an der API-Grenze verwenden). decimals=None: schon gerundet."""
+    if decimals is not None:
+        vec = np.round(vec, decimals)
+    return NutrientProfile(**dict(zip(FIELDS, vec.tolist())))
+
+
+def to_dict(vec: np.ndarray) -> dict[str, float]:
+    return dict(zip(FIELDS, vec.tolist()))
+
+
+def scale(per_100: np.ndarray, grams) -> np.ndarray:
+    """
+    Skaliert per-100g-Werte auf eine Menge, gerundet auf 2 Nachkommastellen.
+    grams darf Skalar oder Vektor (ein Wert pro Zeile) sein.
+    """
+    # per_100 * grams / 100, auf Hundertstel gerundet = rint(per_100 * grams) / 100
+    if isinstance(grams, (int, float)):
+        return np.rint(per_100 * grams) / 100
+    grams = np.asarray(grams, dtype=float)
+    if grams.ndim:
+        grams = grams[:, None]
+    return np.rint(per_100 * grams) / 100
+
+
+def total(matrix: np.ndarray) -> np.ndarray:
+    """Summe ueber alle Zeilen."""
+    return matrix.sum(axis=0) if len(matrix) else np.zeros(N_FIELDS)
+
+
+def sum_vectors(vectors: list[np.ndarray]) -> np.ndarray:
+    """Summe weniger fertiger Vektoren (z.B. Items einer Mahlzeit) ohne Umweg ueber eine Matrix."""
+    return np.add.reduce(vectors) if vectors else np.zeros(N_FIELDS)
+
+
+def compare(actual: np.ndarray, target: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Soll/Ist-Vergleich fuer alle Felder auf einmal.
+    Gibt (percentage, status) zurueck. Status: "deficit" (<80%), "ok" (80-120%), "excess" (>120%);
+    Limit-Felder sind ok bis zum Zielwert, darueber excess; Felder ohne Zielwert immer ok.
+    """
+    has_target = target > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(has_target, np.round(actual / np.where(has_target, target, 1) * 100, 1), 0.0)
+    # Zielwert = 0 (z.B. Alkohol, trans-Fette) — 0 ist perfekt
+    pct = np.where(~has_target & (actual != 0), 100.0, pct)
+
+    code = np.zeros(N_FIELDS, dtype=int)
+    code = np.where(has_target & (pct < 80), 1, code)
+    code = np.where(has_target & (pct > 120), 2, code)
+    code = np.where(_LIMIT_MASK, np.where(actual <= target, 0, 2), code)
+    return pct, _STATUS[code]
+
+
+def deficit_excess_counts(actual: np.ndarray, target: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Zaehlt je Feld die Tage (Zeilen) unter 80% bzw. ueber 120% des Tagesziels.
+    Tage ohne Zielwert fuer ein Feld zaehlen nicht.
+    """
+    has_target = target > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(has_target, actual / np.where(has_target, target, 1) * 100, 100.0)
+    deficits = (has_target & (pct < 80)).sum(axis=0)
+    excesses = (has_target & (pct > 120)).sum(axis=0)
+    return deficits, excesses
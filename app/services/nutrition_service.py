@@ -1,15 +1,24 @@
 """Nourish Backend — Nährstoff-Lookup über externe APIs + BLS."""
 
 import asyncio
+import json
 import logging
 import aiohttp
 from typing import Optional
 
+import numpy as np
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import SingleFlight, TTLCache
 from app.core.config import get_settings
+from app.core.http import get_http_session
+from app.core.metrics import metrics
+from app.core.rate_limit import SharedTokenBucket, TokenBucket
 from app.models.schemas import NutrientProfile
 from app.services.bls_service import lookup_bls
+from app.services.nutrient_engine import INDEX, scale, to_profile, to_vector
 
 log = logging.getLogger(__name__)
 
@@ -159,23 +168,26 @@ async def search_usda(query: str, max_results: int = 10, _retries: int = 3) -> l
 
     for attempt in range(_retries + 1):
         try:
-            async with aiohttp.ClientSession() as session:
-                params = {
-                    "api_key": settings.usda_api_key,
-                    "query": query,
-                    "pageSize": max_results,
-                    "dataType": ["Survey (FNDDS)", "Foundation", "SR Legacy"],
-                }
-                async with session.get(f"{USDA_BASE_URL}/foods/search", params=params) as resp:
-                    if resp.status != 200:
-                        # USDA gibt 400 bei Rate-Limiting (statt 429)
-                        log.warning("USDA API %s fuer '%s' (Versuch %d/%d)",
-                                    resp.status, query, attempt + 1, _retries + 1)
-                        await asyncio.sleep(1.0 * (attempt + 1))
-                        continue
-                    data = await resp.json(content_type=None)
-                    return _parse_usda_results(data.get("foods", []))
-        except (aiohttp.ClientError, ValueError, KeyError) as e:
+            # Jeder HTTP-Versuch (auch Retries) verbraucht ein Token des Stundenbudgets
+            await _usda_limiter.acquire()
+            metrics.incr("usda.request")
+            session = get_http_session()
+            params = {
+                "api_key": settings.usda_api_key,
+                "query": query,
+                "pageSize": max_results,
+                "dataType": ["Survey (FNDDS)", "Foundation", "SR Legacy"],
+            }
+            async with session.get(f"{USDA_BASE_URL}/foods/search", params=params) as resp:
+                if resp.status != 200:
+                    # USDA gibt 400 bei Rate-Limiting (statt 429)
+                    log.warning("USDA API %s fuer '%s' (Versuch %d/%d)",
+                                resp.status, query, attempt + 1, _retries + 1)
+                    await asyncio.sleep(1.0 * (attempt + 1))
+                    continue
+                data = await resp.json(content_type=None)
+                return _parse_usda_results(data.get("foods", []))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
             log.warning("USDA Fehler fuer '%s': %s (Versuch %d/%d)",
                         query, e, attempt + 1, _retries + 1)
             await asyncio.sleep(1.0 * (attempt + 1))
@@ -255,37 +267,37 @@ def _parse_usda_results(foods: list[dict]) -> list[dict]:
 
 async def search_open_food_facts(barcode: str) -> Optional[dict]:
     """Sucht ein Produkt per Barcode in Open Food Facts."""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{OFF_BASE_URL}/product/{barcode}") as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-
-            if data.get("status") != 1:
-                return None
-
-            product = data.get("product", {})
-            nutriments = product.get("nutriments", {})
-
-            return {
-                "name": product.get("product_name", "Unbekanntes Produkt"),
-                "brand": product.get("brands", ""),
-                "barcode": barcode,
-                "source": "open_food_facts",
-                "nutrients_per_100": {
-                    "calories": nutriments.get("energy-kcal_100g", 0),
-                    "protein": nutriments.get("proteins_100g", 0),
-                    "carbs": nutriments.get("carbohydrates_100g", 0),
-                    "carbs_sugar": nutriments.get("sugars_100g", 0),
-                    "fiber": nutriments.get("fiber_100g", 0),
-                    "fat": nutriments.get("fat_100g", 0),
-                    "fat_saturated": nutriments.get("saturated-fat_100g", 0),
-                    "sodium": nutriments.get("sodium_100g", 0) * 1000,  # g → mg
-                    "vitamin_c": nutriments.get("vitamin-c_100g", 0),
-                    "calcium": nutriments.get("calcium_100g", 0) * 1000,
-                    "iron": nutriments.get("iron_100g", 0) * 1000,
-                },
-            }
+    session = get_http_session()
+    async with session.get(f"{OFF_BASE_URL}/product/{barcode}") as resp:
+        if resp.status != 200:
+            return None
+        data = await resp.json()
+
+        if data.get("status") != 1:
+            return None
+
+        product = data.get("product", {})
+        nutriments = product.get("nutriments", {})
+
+        return {
+            "name": product.get("product_name", "Unbekanntes Produkt"),
+            "brand": product.get("brands", ""),
+            "barcode": barcode,
+            "source": "open_food_facts",
+            "nutrients_per_100": {
+                "calories": nutriments.get("energy-kcal_100g", 0),
+                "protein": nutriments.get("proteins_100g", 0),
+                "carbs": nutriments.get("carbohydrates_100g", 0),
+                "carbs_sugar": nutriments.get("sugars_100g", 0),
+                "fiber": nutriments.get("fiber_100g", 0),
+                "fat": nutriments.get("fat_100g", 0),
+                "fat_saturated": nutriments.get("saturated-fat_100g", 0),
+                "sodium": nutriments.get("sodium_100g", 0) * 1000,  # g → mg
+                "vitamin_c": nutriments.get("vitamin-c_100g", 0),
+                "calcium": nutriments.get("calcium_100g", 0) * 1000,
+                "iron": nutriments.get("iron_100g", 0) * 1000,
+            },
+        }
 
 
 def _translate_food_name(name: str) -> Optional[str]:
@@ -317,21 +329,24 @@ def _pick_best_result(results: list[dict], query: str) -> Optional[dict]:
     return best
 
 
-# Globaler Timestamp fuer Rate-Limit-Schutz
-_last_usda_call: float = 0.0
-_USDA_MIN_INTERVAL = 0.4  # Sekunden zwischen USDA-Anfragen
+# Rate-Limit-Schutz: Token Bucket auf das Stundenbudget des USDA Keys
+_USDA_RATE = settings.usda_rate_limit_per_hour / 3600.0
+_usda_limiter = (
+    SharedTokenBucket("usda", _USDA_RATE, settings.usda_rate_limit_burst, settings.usda_rate_limit_lease)
+    if settings.usda_rate_limit_shared
+    else TokenBucket(_USDA_RATE, settings.usda_rate_limit_burst)
+)
+_usda_inflight = SingleFlight()
 
 
 async def _throttled_search_usda(query: str, max_results: int = 10) -> list[dict]:
-    """USDA-Suche mit Throttling zum Schutz vor Rate-Limiting."""
-    global _last_usda_call
-    import time
-    now = time.monotonic()
-    wait = _USDA_MIN_INTERVAL - (now - _last_usda_call)
-    if wait > 0:
-        await asyncio.sleep(wait)
-    _last_usda_call = time.monotonic()
-    return await search_usda(query, max_results)
+    """USDA-Suche mit Rate-Limit; gleichzeitige identische Anfragen teilen sich einen Aufruf."""
+    key = (query.lower().strip(), max_results)
+    if key in _usda_inflight:
+        metrics.incr("usda.coalesced")
+    results = await _usda_inflight.do(key, lambda: search_usda(query, max_results))
+    # Kopien ausgeben — _pick_best_result entfernt "_raw" aus den Treffern
+    return [dict(r) for r in results]
 
 
 async def _log_missing_food(name: str, search_query: str, db: Optional[AsyncSession]) -> None:
@@ -339,29 +354,122 @@ async def _log_missing_food(name: str, search_query: str, db: Optional[AsyncSess
     if db is None:
         return
     try:
-        from sqlalchemy import text as sa_text
-        await db.execute(
-            sa_text("""
-                INSERT INTO missing_foods (name, search_query)
-                VALUES (:name, :query)
-                ON CONFLICT (lower(name)) WHERE NOT resolved DO NOTHING
-            """),
-            {"name": name, "query": search_query},
-        )
+        async with db.begin_nested():
+            await db.execute(
+                text("""
+                    INSERT INTO missing_foods (name, search_query)
+                    VALUES (:name, :query)
+                    ON CONFLICT (lower(name)) WHERE NOT resolved DO NOTHING
+                """),
+                {"name": name, "query": search_query},
+            )
         log.warning("[MISSING] Lebensmittel nicht gefunden: '%s' (query: '%s')", name, search_query)
     except Exception as e:
         log.error("[MISSING] Fehler beim Speichern: %s", e)
 
 
+# ── Food-Lookup-Cache ──
+# L1: In-Process LRU (alle Quellen), L2: Tabelle food_lookup_cache (nur externe Quellen,
+# BLS ist dank In-Memory-Index ohnehin lokal). Negative Eintraege leben kurz.
+_food_cache = TTLCache(maxsize=settings.food_cache_size, ttl=settings.food_cache_ttl_seconds)
+_NOT_FOUND = {"found": False}
+
+
+def _food_cache_key(name: str) -> str:
+    """Normalisiert einen Lebensmittelnamen fuer den Cache ("  Haferflocken " → "haferflocken")."""
+    return " ".join(name.lower().split())
+
+
+async def _food_cache_get_db(key: str, db: AsyncSession) -> Optional[dict]:
+    """Liest einen nicht abgelaufenen Eintrag aus food_lookup_cache."""
+    try:
+        # Savepoint: ein Fehler hier darf die Transaktion des Aufrufers nicht abbrechen
+        async with db.begin_nested():
+            result = await db.execute(
+                text("""
+                    SELECT found, name, source, external_id, nutrients_per_100
+                    FROM food_lookup_cache
+                    WHERE name_key = :key AND expires_at > now()
+                """),
+                {"key": key},
+            )
+            row = result.mappings().first()
+    except Exception as e:
+        log.error("[CACHE] Fehler beim Lesen von food_lookup_cache: %s", e)
+        return None
+    if row is None:
+        return None
+    if not row["found"]:
+        return _NOT_FOUND
+    nutrients = row["nutrients_per_100"]
+    if isinstance(nutrients, str):
+        nutrients = json.loads(nutrients)
+    return {
+        "name": row["name"],
+        "source": row["source"],
+        "external_id": row["external_id"],
+        "nutrients_per_100": nutrients,
+    }
+
+
+async def _food_cache_put_db(key: str, food: Optional[dict], db: AsyncSession) -> None:
+    """Schreibt ein Ergebnis (oder einen negativen Eintrag) in food_lookup_cache."""
+    ttl = settings.food_cache_db_ttl_seconds if food else settings.food_cache_negative_ttl_seconds
+    try:
+        async with db.begin_nested():
+            await db.execute(
+                text("""
+                    INSERT INTO food_lookup_cache
+                        (name_key, found, name, source, external_id, nutrients_per_100, expires_at)
+                    VALUES (:key, :found, :name, :source, :eid, :nutrients,
+                            now() + make_interval(secs => :ttl))
+                    ON CONFLICT (name_key) DO UPDATE SET
+                        found = EXCLUDED.found,
+                        name = EXCLUDED.name,
+                        source = EXCLUDED.source,
+                        external_id = EXCLUDED.external_id,
+                        nutrients_per_100 = EXCLUDED.nutrients_per_100,
+                        created_at = now(),
+                        expires_at = EXCLUDED.expires_at
+                """),
+                {
+                    "key": key,
+                    "found": food is not None,
+                    "name": food["name"] if food else None,
+                    "source": food["source"] if food else None,
+                    "eid": food.get("external_id") if food else None,
+                    "nutrients": json.dumps(food["nutrients_per_100"]) if food else None,
+                    "ttl": ttl,
+                },
+            )
+    except Exception as e:
+        log.error("[CACHE] Fehler beim Schreiben von food_lookup_cache: %s", e)
+
+
+def _food_cache_put(key: str, food: Optional[dict]) -> Optional[dict]:
+    """Legt ein Ergebnis im L1-Cache ab — mit fertigem per-100g-Vektor fuer calculate_nutrient_vector."""
+    if food is None:
+        _food_cache.set(key, _NOT_FOUND, ttl=settings.food_cache_negative_ttl_seconds)
+        return None
+    food = {**food, "per_100_vector": to_vector(food["nutrients_per_100"])}
+    _food_cache.set(key, food)
+    return food
+
+
 async def lookup_food(
     name: str, db: Optional[AsyncSession] = None, barcode: Optional[str] = None,
 ) -> Optional[dict]:
     """
     Sucht ein Lebensmittel — Reihenfolge:
     1. Barcode → Open Food Facts (exakt)
-    2. BLS 4.0 → Fuzzy-Suche (primaer, schnell, deutsche Daten)
-    3. USDA → Fallback (englisch, mit Uebersetzung)
-    4. Nicht gefunden → in missing_foods loggen
+    2. In-Process-Cache (normalisierter Name, inkl. negativer Eintraege)
+    3. BLS 4.0 → Fuzzy-Suche (primaer, schnell, deutsche Daten)
+    4. Postgres-Cache food_lookup_cache
+    5. USDA → Fallback (englisch, mit Uebersetzung)
+    6. Nicht gefunden → in missing_foods loggen (und negativ cachen)
+
+    db muss eine eigene Session des Aufrufers sein: vor der externen Kette wird sie
+    committet, damit ihre Verbindung waehrend der USDA-Calls nicht belegt bleibt.
     """
     # 1. Barcode-Suche (exakt)
     if barcode:
@@ -369,48 +477,85 @@ async def lookup_food(
         if result:
             return result
 
-    # 2. BLS-Suche (primaer fuer deutsche Lebensmittel)
+    # 2. L1-Cache
+    key = _food_cache_key(name)
+    cached = _food_cache.get(key)
+    if cached is not None:
+        if cached is _NOT_FOUND:
+            metrics.incr("food_cache.l1.negative_hit")
+            return None
+        metrics.incr("food_cache.l1.hit")
+        return dict(cached)
+    metrics.incr("food_cache.l1.miss")
+
+    # 3. BLS-Suche (primaer fuer deutsche Lebensmittel)
     if db is not None:
         bls_result = await lookup_bls(name, db)
         if bls_result:
             log.info("BLS Treffer fuer '%s': %s", name, bls_result["name"])
-            return bls_result
+            return dict(_food_cache_put(key, bls_result))
+
+        # 4. L2-Cache (Ergebnisse der externen Kette)
+        cached = await _food_cache_get_db(key, db)
+        if cached is not None:
+            if cached is _NOT_FOUND:
+                _food_cache_put(key, None)
+                metrics.incr("food_cache.l2.negative_hit")
+                return None
+            metrics.incr("food_cache.l2.hit")
+            return dict(_food_cache_put(key, cached))
+        metrics.incr("food_cache.l2.miss")
+
+    # 5. Externe Kette (USDA) — Verbindung bis zum Schreiben des Ergebnisses freigeben
+    if db is not None and db.in_transaction():
+        await db.commit()
+    result = await _lookup_food_external(name, db)
+    if db is not None:
+        await _food_cache_put_db(key, result, db)
+    result = _food_cache_put(key, result)
+    return dict(result) if result else None
 
-    # 3. Deutschen Namen uebersetzen (falls moeglich)
+
+async def _lookup_food_external(name: str, db: Optional[AsyncSession]) -> Optional[dict]:
+    """USDA-Suche mit Uebersetzung; bei Misserfolg Eintrag in missing_foods."""
+    # Deutschen Namen uebersetzen (falls moeglich)
     translated = _translate_food_name(name)
     search_name = translated if translated else name
 
-    # 4. USDA-Suche mit mehreren Ergebnissen + Ranking (throttled)
+    # USDA-Suche mit mehreren Ergebnissen + Ranking (throttled)
     results = await _throttled_search_usda(search_name, max_results=10)
     best = _pick_best_result(results, search_name)
     if best:
         return best
 
-    # 5. Fallback: Originalname versuchen (falls Uebersetzung fehlschlug)
+    # Fallback: Originalname versuchen (falls Uebersetzung fehlschlug)
     if translated and translated.lower() != name.lower():
         results = await _throttled_search_usda(name, max_results=10)
         best = _pick_best_result(results, name)
         if best:
             return best
 
-    # 6. Nichts gefunden → in missing_foods loggen
+    # Nichts gefunden → in missing_foods loggen
     await _log_missing_food(name, search_name, db)
     return None
 
 
-def calculate_nutrients(nutrients_per_100: dict, amount_grams: float, food_name: str = "") -> NutrientProfile:
+def calculate_nutrient_vector(nutrients_per_100, amount_grams: float, food_name: str = "") -> np.ndarray:
+    """
+    Nährstoffe für eine Menge als Vektor. nutrients_per_100: dict oder bereits fertiger
+    per-100g-Vektor (per_100_vector aus lookup_food — dann entfaellt die Umwandlung).
+    """
+    if not isinstance(nutrients_per_100, np.ndarray):
+        nutrients_per_100 = to_vector(nutrients_per_100)
+    calculated = scale(nutrients_per_100, amount_grams)
+
+    if log.isEnabledFor(logging.INFO):
+        cal, prot, carbs, fat = (calculated[INDEX[f]] for f in ("calories", "protein", "carbs", "fat"))
+        log.info("[CALC] %s: %.0fg → %.0f kcal, %.1fg P, %.1fg C, %.1fg F (factor=%.2f)",
+                 food_name or "?", amount_grams, cal, prot, carbs, fat, amount_grams / 100.0)
+    return calculated
+
+
+def calculate_nutrients(nutrients_per_100, amount_grams: float, food_name: str = "") -> NutrientProfile:
     """Berechnet Nährstoffe für eine bestimmte Menge basierend auf per-100g-Werten."""
-    factor = amount_grams / 100.0
-    calculated = {}
-    for key, value in nutrients_per_100.items():
-        if isinstance(value, (int, float)):
-            calculated[key] = round(value * factor, 2)
-
-    cal = calculated.get("calories", 0)
-    prot = calculated.get("protein", 0)
-    carbs = calculated.get("carbs", 0)
-    fat = calculated.get("fat", 0)
-    log.info("[CALC] %s: %.0fg → %.0f kcal, %.1fg P, %.1fg C, %.1fg F (factor=%.2f)",
-             food_name or "?", amount_grams, cal, prot, carbs, fat, factor)
-
-    return NutrientProfile(**calculated)
+    return to_profile(calculate_nutrient_vector(nutrients_per_100, amount_grams, food_name), decimals=None)
@@ -0,0 +1,126 @@
+"""Nourish Backend — Cache fuer Parse-Ergebnisse (Freitext → Items + meal_time).
+
+L1: In-Process LRU, L2: Tabelle parse_cache. Schluessel ist der normalisierte
+Eingabetext plus die Version des Parsing-Prompts — aendert sich der Prompt oder das
+Modell, greifen alte Eintraege automatisch nicht mehr und koennen mit purge_stale()
+bzw. scripts/purge_parse_cache.py entfernt werden.
+"""
+
+import copy
+import json
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_cache = TTLCache(maxsize=settings.parse_cache_size, ttl=settings.parse_cache_ttl_seconds)
+
+# Satzzeichen → Leerzeichen, ausser zwischen Ziffern ("10:20", "1,5" bleiben erhalten)
+_PUNCT = re.compile(r"(?<!\d)[^\w\s]|[^\w\s](?!\d)")
+
+
+def normalize(raw: str) -> str:
+    """'Kaffee, mit  Hafermilch!' → 'kaffee mit hafermilch'"""
+    return " ".join(_PUNCT.sub(" ", raw.lower()).split())
+
+
+async def get(version: str, key: str, db: Optional[AsyncSession] = None) -> Optional[dict]:
+    """Liefert ein gecachtes Parse-Ergebnis (Kopie) oder None."""
+    if not key:
+        return None
+    cached = _cache.get((version, key))
+    if cached is not None:
+        metrics.incr("parse.cache.hit")
+        return copy.deepcopy(cached)
+
+    if db is not None:
+        cached = await _get_db(version, key, db)
+        if cached is not None:
+            metrics.incr("parse.cache.hit_db")
+            _cache.set((version, key), cached)
+            return copy.deepcopy(cached)
+
+    metrics.incr("parse.cache.miss")
+    return None
+
+
+async def put(version: str, key: str, parsed: dict, db: Optional[AsyncSession] = None) -> None:
+    """Speichert ein Parse-Ergebnis. Leere Ergebnisse werden nicht gecacht."""
+    if not key or not parsed.get("items"):
+        return
+    entry = {"items": copy.deepcopy(parsed["items"]), "meal_time": parsed.get("meal_time")}
+    _cache.set((version, key), entry)
+    if db is not None:
+        await _put_db(version, key, entry, db)
+
+
+async def purge_stale(version: str, db: AsyncSession, purge_all: bool = False) -> int:
+    """Loescht Eintraege anderer Prompt-Versionen und abgelaufene (purge_all: alle). Ohne Commit."""
+    _cache.clear()
+    if purge_all:
+        result = await db.execute(text("DELETE FROM parse_cache"))
+    else:
+        result = await db.execute(
+            text("DELETE FROM parse_cache WHERE prompt_version <> :version OR expires_at <= now()"),
+            {"version": version},
+        )
+    return result.rowcount
+
+
+async def _get_db(version: str, key: str, db: AsyncSession) -> Optional[dict]:
+    try:
+        # Savepoint: ein Fehler hier darf die Transaktion des Aufrufers nicht abbrechen
+        async with db.begin_nested():
+            result = await db.execute(
+                text("""
+                    SELECT items, meal_time FROM parse_cache
+                    WHERE text_key = :key AND prompt_version = :version AND expires_at > now()
+                """),
+                {"key": key, "version": version},
+            )
+            row = result.mappings().first()
+    except Exception as e:
+        log.error("[CACHE] Fehler beim Lesen von parse_cache: %s", e)
+        return None
+    if row is None:
+        return None
+    items = row["items"]
+    if isinstance(items, str):
+        items = json.loads(items)
+    return {"items": items, "meal_time": row["meal_time"]}
+
+
+async def _put_db(version: str, key: str, entry: dict, db: AsyncSession) -> None:
+    try:
+        async with db.begin_nested():
+            await db.execute(
+                text("""
+                    INSERT INTO parse_cache (text_key, prompt_version, items, meal_time, expires_at)
+                    VALUES (:key, :version, :items, :meal_time,
+                            now() + make_interval(secs => :ttl))
+                    ON CONFLICT (text_key, prompt_version) DO UPDATE SET
+                        items = EXCLUDED.items,
+                        meal_time = EXCLUDED.meal_time,
+                        created_at = now(),
+                        expires_at = EXCLUDED.expires_at
+                """),
+                {
+                    "key": key,
+                    "version": version,
+                    "items": json.dumps(entry["items"], ensure_ascii=False),
+                    "meal_time": entry["meal_time"],
+                    "ttl": settings.parse_cache_db_ttl_seconds,
+                },
+            )
+    except Exception as e:
+        log.error("[CACHE] Fehler beim Schreiben von parse_cache: %s", e)
@@ -0,0 +1,138 @@
+"""Nourish Backend — Kompakte Darstellung von Tagesbilanz und Wochentrends fuer Prompts.
+
+Statt json.dumps(indent=2) der vollen Naehrstoffprofile (44 Felder, meist 0)
+gehen nur Makros, Defizite/Ueberschuesse und chronische Trends als dichte
+Zeilen in den Prompt. Ein Token-Budget begrenzt die Laenge: reicht es nicht,
+fallen zuerst die am wenigsten wichtigen Eintraege weg.
+"""
+
+import json
+import logging
+import math
+from typing import Optional
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+settings = get_settings()
+
+MACRO_FIELDS = ("calories", "protein", "carbs", "fat", "fiber")
+
+# Grobe Schaetzung fuer deutschen Text mit Zahlen (kein Tokenizer-Call pro Request)
+_CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def _num(value: float) -> str:
+    return f"{value:.0f}" if abs(value) >= 10 else f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def _vs_target(field: str, actual: float, target: float, pct: Optional[float] = None) -> str:
+    if not target:
+        return f"{field} {_num(actual)}"
+    pct = pct if pct is not None else actual / target * 100
+    return f"{field} {_num(actual)}/{_num(target)} {pct:.0f}%"
+
+
+def _daily_sections(daily_balance: dict) -> list[tuple[str, list[str]]]:
+    actual = daily_balance.get("actual") or {}
+    target = daily_balance.get("target") or {}
+    deficits = daily_balance.get("deficits") or {}
+
+    macros = [_vs_target(f, actual.get(f, 0), target.get(f, 0)) for f in MACRO_FIELDS if f in actual or f in target]
+    low = sorted(
+        ((f, v) for f, v in deficits.items() if v["status"] == "deficit" and f not in MACRO_FIELDS),
+        key=lambda kv: kv[1]["percentage"],
+    )
+    high = sorted(
+        ((f, v) for f, v in deficits.items() if v["status"] == "excess" and f not in MACRO_FIELDS),
+        key=lambda kv: -kv[1]["percentage"],
+    )
+    return [
+        ("Heute Makros (Ist/Soll)", macros),
+        ("Heute Defizite", [_vs_target(f, v["actual"], v["target"], v["percentage"]) for f, v in low]),
+        ("Heute Überschüsse", [_vs_target(f, v["actual"], v["target"], v["percentage"]) for f, v in high]),
+    ]
+
+
+def _week_sections(week_trends: dict) -> list[tuple[str, list[str]]]:
+    averages = week_trends.get("averages") or {}
+    return [
+        ("Woche chronische Defizite (Tage, Ø)", [
+            f"{d['nutrient']} {d['deficit_days']}d Ø{_num(d['avg_value'])}"
+            for d in week_trends.get("chronic_deficits", [])
+        ]),
+        ("Woche chronische Überschüsse (Tage, Ø)", [
+            f"{e['nutrient']} {e['excess_days']}d Ø{_num(e['avg_value'])}"
+            for e in week_trends.get("chronic_excesses", [])
+        ]),
+        ("Woche Ø Makros", [f"{f} {_num(averages[f])}" for f in MACRO_FIELDS if averages.get(f)]),
+    ]
+
+
+# Reihenfolge beim Kuerzen: zuerst faellt weg, was hier vorne steht
+_DROP_ORDER = (
+    "Woche Ø Makros",
+    "Woche chronische Überschüsse (Tage, Ø)",
+    "Heute Überschüsse",
+    "Woche chronische Defizite (Tage, Ø)",
+    "Heute Defizite",
+    "Heute Makros (Ist/Soll)",
+)
+
+
+def _render(sections: list[tuple[str, list[str]]], dropped: dict[str, int]) -> str:
+    lines = []
+    for title, entries in sections:
+        parts = list(entries)
+        if dropped.get(title):
+            parts.append(f"+{dropped[title]} weitere")
+        if parts:
+            lines.append(f"{title}: {' | '.join(parts)}")
+    return "\n".join(lines)
+
+
+def encode_context(
+    daily_balance: dict,
+    week_trends: Optional[dict] = None,
+    budget: Optional[int] = None,
+) -> str:
+    """
+    Tagesbilanz (+ optional Wochentrends) als kompakter Text innerhalb des Token-Budgets.
+    Loggt die geschaetzte Tokenzahl vorher (JSON, indent=2) und nachher.
+    """
+    budget = budget or settings.prompt_context_token_budget
+    if daily_balance:
+        sections = _daily_sections(daily_balance)
+    else:
+        sections = [("Heute", ["noch keine Daten"])]
+    if week_trends is not None:
+        sections.append((
+            f"Woche {week_trends.get('start_date')} bis {week_trends.get('end_date')}",
+            [f"{week_trends.get('days_tracked', 0)} Tage erfasst"],
+        ))
+        sections += _week_sections(week_trends)
+
+    dropped: dict[str, int] = {}
+    text = _render(sections, dropped)
+    by_title = dict(sections)
+    for title in _DROP_ORDER:
+        entries = by_title.get(title)
+        while entries and estimate_tokens(text) > budget:
+            entries.pop()
+            dropped[title] = dropped.get(title, 0) + 1
+            text = _render(sections, dropped)
+
+    before = estimate_tokens(json.dumps(daily_balance, indent=2, ensure_ascii=False))
+    if week_trends is not None:
+        before += estimate_tokens(json.dumps(week_trends, indent=2, ensure_ascii=False))
+    after = estimate_tokens(text)
+    metrics.observe("prompt.context.tokens_before", before)
+    metrics.observe("prompt.context.tokens_after", after)
+    log.info("[PROMPT] Kontext: ~%d → ~%d Tokens (Budget %d)", before, after, budget)
+    return text
@@ -0,0 +1,242 @@
+"""Nourish Backend — Lokaler Parser fuer einfach strukturierte Mahlzeit-Eingaben.
+
+"200g Reis, 1 Apfel, 2 EL Olivenöl" braucht keinen LLM-Roundtrip: Menge, Einheit
+und Lebensmittel werden per fester Grammatik erkannt. Nur wenn jedes Segment
+eindeutig ist (bekannte Einheit, bekanntes Lebensmittel, keine Restwoerter),
+gilt das Ergebnis — sonst liefert parse_locally None und Claude parst.
+"""
+
+import re
+import time
+from typing import Optional
+
+from app.core.metrics import metrics
+from app.models.schemas import MealType
+from app.services.bls_service import is_known_food
+
+
+# ── Vokabular: Stück/EL/TL/etc. → Gramm ──
+
+# Durchschnittsgewichte pro Stück (in Gramm)
+WEIGHT_PER_PIECE: dict[str, float] = {
+    "ei": 60.0, "eier": 60.0, "hühnerei": 60.0,
+    "avocado": 150.0,
+    "apfel": 180.0, "banane": 120.0, "orange": 170.0,
+    "tomate": 120.0, "tomaten": 120.0, "cherrytomate": 15.0, "cherrytomaten": 15.0,
+    "kartoffel": 150.0, "kartoffeln": 150.0,
+    "zwiebel": 80.0, "knoblauchzehe": 4.0, "knoblauch": 4.0,
+    "paprika": 160.0,
+    "gurke": 400.0, "salatgurke": 400.0,
+    "möhre": 80.0, "karotte": 80.0, "möhren": 80.0, "karotten": 80.0,
+    "brötchen": 60.0, "scheibe brot": 50.0,
+    "kiwi": 75.0, "pfirsich": 150.0, "birne": 180.0, "pflaume": 60.0,
+    "mandarine": 70.0, "zitrone": 80.0,
+}
+
+# Generische Einheiten-Gewichte (in Gramm)
+UNIT_GRAMS: dict[str, float] = {
+    "g": 1.0,
+    "kg": 1000.0,
+    "ml": 1.0,
+    "l": 1000.0,
+    "el": 15.0,        # Esslöffel
+    "tl": 5.0,         # Teelöffel
+    "esslöffel": 15.0,
+    "teelöffel": 5.0,
+    "tasse": 250.0,
+    "becher": 200.0,
+    "glas": 250.0,
+    "handvoll": 40.0,
+    "scheibe": 30.0,    # Brot, Käse, Wurst
+    "portion": 200.0,
+    "packung": 200.0,
+    "dose": 400.0,
+}
+
+
+def detect_meal_type_from_text(raw_input: str) -> MealType | None:
+    """Erkennt den Mahlzeittyp aus Keywords im Text. Gibt None zurueck wenn nichts erkannt."""
+    lower = raw_input.lower()
+    breakfast_kw = ("frühstück", "morgens", "morning", "zum frühstück", "heute morgen")
+    lunch_kw = ("mittag", "mittagessen", "lunch", "zum mittag")
+    dinner_kw = ("abend", "abendessen", "abendbrot", "dinner", "zum abend")
+    snack_kw = ("snack", "zwischendurch", "zwischenmahlzeit", "nachmittags")
+
+    for kw in breakfast_kw:
+        if kw in lower:
+            return MealType.breakfast
+    for kw in lunch_kw:
+        if kw in lower:
+            return MealType.lunch
+    for kw in dinner_kw:
+        if kw in lower:
+            return MealType.dinner
+    for kw in snack_kw:
+        if kw in lower:
+            return MealType.snack
+    return None
+
+
+# ── Grammatik ──
+
+# Eingabe-Einheit → (Einheit aus PARSE_UNITS, Faktor auf die Menge). Der lokale Parser
+# liefert dieselben Einheiten wie Claude: kg/l werden umgerechnet, Gefaesse (Becher, Glas,
+# Packung, Dose) mit ihrem Standardgewicht aus UNIT_GRAMS in g bzw. ml ausgedrueckt.
+_UNIT_ALIASES: dict[str, tuple[str, float]] = {
+    "g": ("g", 1.0), "gr": ("g", 1.0), "gramm": ("g", 1.0),
+    "kg": ("g", 1000.0), "kilo": ("g", 1000.0),
+    "ml": ("ml", 1.0), "l": ("ml", 1000.0), "liter": ("ml", 1000.0),
+    "el": ("EL", 1.0), "esslöffel": ("EL", 1.0),
+    "tl": ("TL", 1.0), "teelöffel": ("TL", 1.0),
+    "tasse": ("Tasse", 1.0), "tassen": ("Tasse", 1.0),
+    "becher": ("g", UNIT_GRAMS["becher"]),
+    "glas": ("ml", UNIT_GRAMS["glas"]), "gläser": ("ml", UNIT_GRAMS["glas"]),
+    "handvoll": ("Handvoll", 1.0),
+    "scheibe": ("Scheibe", 1.0), "scheiben": ("Scheibe", 1.0),
+    "portion": ("Portion", 1.0), "portionen": ("Portion", 1.0),
+    "packung": ("g", UNIT_GRAMS["packung"]),
+    "dose": ("g", UNIT_GRAMS["dose"]), "dosen": ("g", UNIT_GRAMS["dose"]),
+    "stück": ("Stück", 1.0), "stk": ("Stück", 1.0), "st": ("Stück", 1.0),
+}
+
+_NUMBER_WORDS: dict[str, float] = {
+    "ein": 1, "eine": 1, "einen": 1, "einem": 1, "einer": 1,
+    "zwei": 2, "drei": 3, "vier": 4, "fünf": 5, "sechs": 6,
+    "halb": 0.5, "halbe": 0.5, "halben": 0.5, "halber": 0.5,
+    "anderthalb": 1.5,
+}
+
+# Woerter ohne Lebensmittel-Bedeutung (Mahlzeit-Keywords werden separat erkannt)
+_FILLER = frozenset({
+    "ich", "hatte", "habe", "hab", "gegessen", "getrunken", "gerade", "eben", "heute",
+    "zum", "zur", "als", "gegen", "um", "uhr",
+    "frühstück", "morgens", "morning", "mittag", "mittags", "mittagessen", "lunch",
+    "abend", "abends", "abendessen", "abendbrot", "dinner",
+    "snack", "zwischendurch", "zwischenmahlzeit", "nachmittags",
+})
+
+# Datumsangaben ("gestern", "morgen", "am Montag") kann der lokale Parser nicht
+# auswerten — solche Eingaben gehen an Claude
+_DATE_WORDS = frozenset({
+    "gestern", "vorgestern", "morgen", "übermorgen", "letzte", "letzten", "letztes",
+    "montag", "dienstag", "mittwoch", "donnerstag", "freitag", "samstag", "sonntag",
+    "wochenende", "datum",
+})
+_DATE_RE = re.compile(r"\d{1,2}\.\d{1,2}\.")
+
+# Uhrzeit wie in den meal_time-Regeln des Parsing-Prompts
+_MEAL_TYPE_TIMES: dict[MealType, str] = {
+    MealType.breakfast: "08:00",
+    MealType.lunch: "12:30",
+    MealType.snack: "15:30",
+    MealType.dinner: "19:00",
+}
+
+# "um 2 Eier" ist keine Uhrzeit: nach "um"/"gegen" muss ":MM" oder "Uhr" folgen
+_TIME_RE = re.compile(
+    r"\b(?:um|gegen)\s+(\d{1,2})(?::(\d{2})(?:\s*uhr)?|\s*uhr)\b"
+    r"|\b(\d{1,2}):(\d{2})(?:\s*uhr)?\b"
+    r"|\b(\d{1,2})\s*uhr\b"
+)
+# Segment-Trenner; Kommas zwischen Ziffern sind Dezimalkommas ("1,5 kg")
+_SPLIT_RE = re.compile(r"(?<!\d),|,(?!\d)|[;+&\n]|\b(?:und|mit|dazu|sowie|plus)\b")
+# "200g" → "200 g"
+_NUM_UNIT_RE = re.compile(r"(\d)([a-zäöüß]+)", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"^\d+(?:[.,]\d+)?$")
+
+_MAX_NAME_WORDS = 3
+_MAX_AMOUNT = 5000.0
+
+
+def _extract_meal_time(lower: str) -> tuple[Optional[str], str]:
+    """Findet eine explizite Uhrzeit; gibt (HH:MM oder None, Text ohne Uhrzeit) zurueck."""
+    match = _TIME_RE.search(lower)
+    if match is None:
+        return None, lower
+    groups = match.groups()
+    hour = groups[0] or groups[2] or groups[4]
+    minute = groups[1] or groups[3] or "00"
+    if int(hour) > 23 or int(minute) > 59:
+        return None, lower
+    return f"{int(hour):02d}:{minute}", lower[:match.start()] + " " + lower[match.end():]
+
+
+def _parse_segment(segment: str, original: str) -> Optional[dict]:
+    """Ein Segment ("2 el olivenöl") → Item oder None bei niedriger Konfidenz."""
+    tokens = [t.strip(".:!?()\"'") for t in _NUM_UNIT_RE.sub(r"\1 \2", segment).split()]
+    tokens = [t for t in tokens if t and t not in _FILLER]
+    if not tokens:
+        return {}  # nur Fuellwoerter — Segment ignorieren
+
+    amount: Optional[float] = None
+    if _NUMBER_RE.match(tokens[0]):
+        amount = float(tokens.pop(0).replace(",", "."))
+    elif tokens[0] in _NUMBER_WORDS:
+        amount = _NUMBER_WORDS[tokens.pop(0)]
+        if tokens and tokens[0] in ("halbe", "halben", "halber"):  # "eine halbe Avocado"
+            amount = _NUMBER_WORDS[tokens.pop(0)]
+
+    unit, factor = _UNIT_ALIASES.get(tokens[0], (None, 1.0)) if tokens else (None, 1.0)
+    if unit:
+        tokens.pop(0)
+
+    if not tokens or len(tokens) > _MAX_NAME_WORDS or any(ch.isdigit() for t in tokens for ch in t):
+        return None
+    name_key = " ".join(tokens)
+    is_piece_food = name_key in WEIGHT_PER_PIECE
+    if not (is_piece_food or is_known_food(name_key)):
+        return None
+
+    if unit is None:
+        # Ohne Einheit nur Stueck-Lebensmittel ("1 Apfel", "Banane"); "2 Reis" ist mehrdeutig
+        if not is_piece_food:
+            return None
+        unit = "Stück"
+    if amount is None:
+        amount = 1.0
+    if not 0 < amount <= _MAX_AMOUNT:
+        return None
+    amount = round(amount * factor, 2)
+
+    # Originale Schreibweise des Namens behalten
+    match = re.search(re.escape(name_key), original, re.IGNORECASE)
+    name = original[match.start():match.end()] if match else name_key
+    return {"name": name[0].upper() + name[1:], "amount": amount, "unit": unit}
+
+
+def parse_locally(raw_input: str) -> Optional[dict]:
+    """
+    Parst einfach strukturierte Eingaben ohne LLM.
+    Returns: {"items": [...], "meal_time": "HH:MM" oder None} wie parse_food_input,
+    oder None wenn ein Teil der Eingabe nicht sicher erkannt wurde.
+    """
+    start = time.perf_counter()
+    try:
+        result = _parse(raw_input)
+    finally:
+        metrics.observe("parse.fast_path.ms", (time.perf_counter() - start) * 1000)
+    metrics.incr("parse.fast_path.hit" if result is not None else "parse.fast_path.miss")
+    return result
+
+
+def _parse(raw_input: str) -> Optional[dict]:
+    lower = raw_input.lower()
+    if _DATE_RE.search(lower) or not _DATE_WORDS.isdisjoint(re.findall(r"\w+", lower)):
+        return None
+    meal_time, rest = _extract_meal_time(lower)
+    if meal_time is None:
+        meal_type = detect_meal_type_from_text(lower)
+        meal_time = _MEAL_TYPE_TIMES.get(meal_type) if meal_type else None
+
+    items = []
+    for segment in _SPLIT_RE.split(rest):
+        if not segment.strip():
+            continue
+        item = _parse_segment(segment, raw_input)
+        if item is None:
+            return None
+        if item:
+            items.append(item)
+    if not items:
+        return None
+    return {"items": items, "meal_time": meal_time}
@@ -0,0 +1,21 @@
+-- Nourish Database Migration
+-- Migration: 004_food_lookup_cache.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Persistenter Cache fuer lookup_food (inkl. negativer Eintraege)
+
+CREATE TABLE IF NOT EXISTS food_lookup_cache (
+    name_key          TEXT PRIMARY KEY,          -- normalisierter Lebensmittelname
+    found             BOOLEAN NOT NULL,          -- false = negativer Eintrag (nichts gefunden)
+    name              TEXT,                      -- aufgeloester Name in der Quelle
+    source            TEXT,                      -- 'bls', 'usda', 'open_food_facts'
+    external_id       TEXT,
+    nutrients_per_100 JSONB,
+    created_at        TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at        TIMESTAMPTZ NOT NULL
+);
+
+-- Aufraeumen abgelaufener Eintraege
+CREATE INDEX IF NOT EXISTS idx_food_lookup_cache_expires ON food_lookup_cache (expires_at);
+
+-- Nur der Service-Role-Zugang (Backend) darf lesen/schreiben — keine Policies
+ALTER TABLE food_lookup_cache ENABLE ROW LEVEL SECURITY;
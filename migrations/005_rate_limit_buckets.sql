@@ -0,0 +1,13 @@
+-- Nourish Database Migration
+-- Migration: 005_rate_limit_buckets.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Geteilte Token Buckets fuer externe APIs (z.B. USDA-Stundenbudget)
+
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    name       TEXT PRIMARY KEY,       -- z.B. 'usda'
+    tokens     DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+-- Nur der Service-Role-Zugang (Backend) darf lesen/schreiben — keine Policies
+ALTER TABLE rate_limit_buckets ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,32 @@
+-- Nourish Database Migration
+-- Migration: 006_daily_totals_backfill.sql
+-- Datum: 2026-10-17
+-- Beschreibung: daily_logs.actual_nutrients wird ab jetzt inkrementell bei jeder
+-- Mahlzeit-Aenderung gepflegt. Einmaliger Backfill aus food_items.
+-- Reparatur bei Drift: python scripts/rebuild_daily_totals.py
+
+UPDATE daily_logs
+SET actual_nutrients = '{}'::jsonb, caffeine_total_mg = 0, alcohol_total_g = 0;
+
+INSERT INTO daily_logs (user_id, log_date, actual_nutrients, caffeine_total_mg, alcohol_total_g)
+SELECT user_id, meal_date, totals,
+       COALESCE((totals->>'caffeine')::numeric, 0),
+       COALESCE((totals->>'alcohol')::numeric, 0)
+FROM (
+    SELECT user_id, meal_date, jsonb_object_agg(key, total) AS totals
+    FROM (
+        SELECT fe.user_id, fe.meal_date, kv.key, ROUND(SUM(kv.value::numeric), 2) AS total
+        FROM food_entries fe
+        JOIN food_items fi ON fi.food_entry_id = fe.id
+        CROSS JOIN LATERAL jsonb_each_text(fi.calculated_nutrients) kv
+        WHERE jsonb_typeof(fi.calculated_nutrients) = 'object'
+        GROUP BY fe.user_id, fe.meal_date, kv.key
+    ) per_key
+    GROUP BY user_id, meal_date
+) per_day
+ON CONFLICT (user_id, log_date)
+DO UPDATE SET
+    actual_nutrients = EXCLUDED.actual_nutrients,
+    caffeine_total_mg = EXCLUDED.caffeine_total_mg,
+    alcohol_total_g = EXCLUDED.alcohol_total_g,
+    updated_at = NOW();
@@ -0,0 +1,101 @@
+-- Nourish Database Migration
+-- Migration: 007_nutrient_vector.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Kompakte Array-Darstellung von food_items.calculated_nutrients,
+-- damit Summen in Postgres gebildet werden koennen (kein JSONB-Transfer nach Python).
+--
+-- Feste Reihenfolge (= NutrientProfile / _NUTRIENT_FIELDS). NIE umsortieren,
+-- neue Felder nur hinten anhaengen.
+--    1 calories
+--    2 protein
+--    3 carbs
+--    4 carbs_sugar
+--    5 carbs_sugar_glucose
+--    6 carbs_sugar_fructose
+--    7 carbs_starch
+--    8 fiber
+--    9 fat
+--   10 fat_saturated
+--   11 fat_mono
+--   12 fat_poly
+--   13 fat_omega3
+--   14 fat_omega6
+--   15 fat_trans
+--   16 sodium
+--   17 vitamin_a
+--   18 vitamin_b1
+--   19 vitamin_b2
+--   20 vitamin_b3
+--   21 vitamin_b5
+--   22 vitamin_b6
+--   23 vitamin_b7
+--   24 vitamin_b9
+--   25 vitamin_b12
+--   26 vitamin_c
+--   27 vitamin_d
+--   28 vitamin_e
+--   29 vitamin_k
+--   30 calcium
+--   31 magnesium
+--   32 potassium
+--   33 phosphorus
+--   34 iron
+--   35 zinc
+--   36 copper
+--   37 iodine
+--   38 selenium
+--   39 manganese
+--   40 chromium
+--   41 molybdenum
+--   42 caffeine
+--   43 alcohol
+
+ALTER TABLE food_items ADD COLUMN IF NOT EXISTS nutrient_vector REAL[];
+
+-- Backfill bestehender Items
+UPDATE food_items SET nutrient_vector = ARRAY[
+    COALESCE((calculated_nutrients->>'calories')::real, 0),
+    COALESCE((calculated_nutrients->>'protein')::real, 0),
+    COALESCE((calculated_nutrients->>'carbs')::real, 0),
+    COALESCE((calculated_nutrients->>'carbs_sugar')::real, 0),
+    COALESCE((calculated_nutrients->>'carbs_sugar_glucose')::real, 0),
+    COALESCE((calculated_nutrients->>'carbs_sugar_fructose')::real, 0),
+    COALESCE((calculated_nutrients->>'carbs_starch')::real, 0),
+    COALESCE((calculated_nutrients->>'fiber')::real, 0),
+    COALESCE((calculated_nutrients->>'fat')::real, 0),
+    COALESCE((calculated_nutrients->>'fat_saturated')::real, 0),
+    COALESCE((calculated_nutrients->>'fat_mono')::real, 0),
+    COALESCE((calculated_nutrients->>'fat_poly')::real, 0),
+    COALESCE((calculated_nutrients->>'fat_omega3')::real, 0),
+    COALESCE((calculated_nutrients->>'fat_omega6')::real, 0),
+    COALESCE((calculated_nutrients->>'fat_trans')::real, 0),
+    COALESCE((calculated_nutrients->>'sodium')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_a')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b1')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b2')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b3')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b5')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b6')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b7')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b9')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_b12')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_c')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_d')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_e')::real, 0),
+    COALESCE((calculated_nutrients->>'vitamin_k')::real, 0),
+    COALESCE((calculated_nutrients->>'calcium')::real, 0),
+    COALESCE((calculated_nutrients->>'magnesium')::real, 0),
+    COALESCE((calculated_nutrients->>'potassium')::real, 0),
+    COALESCE((calculated_nutrients->>'phosphorus')::real, 0),
+    COALESCE((calculated_nutrients->>'iron')::real, 0),
+    COALESCE((calculated_nutrients->>'zinc')::real, 0),
+    COALESCE((calculated_nutrients->>'copper')::real, 0),
+    COALESCE((calculated_nutrients->>'iodine')::real, 0),
+    COALESCE((calculated_nutrients->>'selenium')::real, 0),
+    COALESCE((calculated_nutrients->>'manganese')::real, 0),
+    COALESCE((calculated_nutrients->>'chromium')::real, 0),
+    COALESCE((calculated_nutrients->>'molybdenum')::real, 0),
+    COALESCE((calculated_nutrients->>'caffeine')::real, 0),
+    COALESCE((calculated_nutrients->>'alcohol')::real, 0)
+]
+WHERE nutrient_vector IS NULL AND jsonb_typeof(calculated_nutrients) = 'object';
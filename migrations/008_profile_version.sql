@@ -0,0 +1,7 @@
+-- Nourish Database Migration
+-- Migration: 008_profile_version.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Profil-Version fuer Session-Tokens. Jede Profil-Aenderung zaehlt hoch;
+-- Tokens mit neuerer Version erzwingen ein Neuladen der gecachten User-Zeile.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,20 @@
+-- Nourish Database Migration
+-- Migration: 009_parse_cache.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Persistenter Cache fuer parse_food_input (normalisierter Text → Items + meal_time)
+
+CREATE TABLE IF NOT EXISTS parse_cache (
+    text_key       TEXT NOT NULL,            -- normalisierter Eingabetext
+    prompt_version TEXT NOT NULL,            -- Hash aus Parsing-Prompt + Modell
+    items          JSONB NOT NULL,
+    meal_time      TEXT,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at     TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (text_key, prompt_version)
+);
+
+-- Aufraeumen abgelaufener / veralteter Eintraege
+CREATE INDEX IF NOT EXISTS idx_parse_cache_expires ON parse_cache (expires_at);
+
+-- Nur der Service-Role-Zugang (Backend) darf lesen/schreiben — keine Policies
+ALTER TABLE parse_cache ENABLE ROW LEVEL SECURITY;
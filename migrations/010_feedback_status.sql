@@ -0,0 +1,16 @@
+-- Nourish Database Migration
+-- Migration: 010_feedback_status.sql
+-- Datum: 2026-10-17
+-- Beschreibung: KI-Feedback wird asynchron erzeugt — Status pro Mahlzeit
+--   pending = in Arbeit, done = ai_feedback gesetzt, failed = aufgegeben
+
+ALTER TABLE food_entries
+    ADD COLUMN IF NOT EXISTS ai_feedback_status TEXT NOT NULL DEFAULT 'done'
+        CHECK (ai_feedback_status IN ('pending', 'done', 'failed')),
+    ADD COLUMN IF NOT EXISTS ai_feedback_attempts INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS ai_feedback_requested_at TIMESTAMPTZ;
+
+-- Sweeper sucht liegengebliebene Jobs (z.B. nach Neustart)
+CREATE INDEX IF NOT EXISTS idx_food_entries_feedback_pending
+    ON food_entries (ai_feedback_requested_at)
+    WHERE ai_feedback_status = 'pending';
@@ -0,0 +1,15 @@
+-- Nourish Database Migration
+-- Migration: 011_chat_summaries.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Rollierende Zusammenfassung aelterer Chat-Nachrichten pro Nutzer
+--   covered_until = created_at der letzten zusammengefassten Nachricht;
+--   juengere Nachrichten gehen woertlich in den Prompt
+
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL,
+    covered_until TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE chat_summaries ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,30 @@
+-- Nourish Database Migration
+-- Migration: 012_knowledge_touch.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Aenderungen an health_effects / study_references setzen updated_at
+--   des Artikels — ETag und API-Cache von GET /knowledge/{slug} haengen daran
+
+CREATE OR REPLACE FUNCTION touch_knowledge_article()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE knowledge_articles SET updated_at = NOW() WHERE id = OLD.article_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE knowledge_articles SET updated_at = NOW()
+        WHERE id = NEW.article_id
+          AND (TG_OP = 'INSERT' OR NEW.article_id IS DISTINCT FROM OLD.article_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_health_effects_touch_article ON health_effects;
+CREATE TRIGGER trg_health_effects_touch_article
+    AFTER INSERT OR UPDATE OR DELETE ON health_effects
+    FOR EACH ROW EXECUTE FUNCTION touch_knowledge_article();
+
+DROP TRIGGER IF EXISTS trg_study_references_touch_article ON study_references;
+CREATE TRIGGER trg_study_references_touch_article
+    AFTER INSERT OR UPDATE OR DELETE ON study_references
+    FOR EACH ROW EXECUTE FUNCTION touch_knowledge_article();
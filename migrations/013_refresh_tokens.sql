@@ -0,0 +1,19 @@
+-- Nourish Database Migration
+-- Migration: 013_refresh_tokens.sql
+-- Datum: 2026-10-17
+-- Beschreibung: Ausgestellte Refresh-Tokens (jti) — jedes Token ist genau einmal
+--   einloesbar (Rotation), Wiederverwendung widerruft alle Tokens des Users
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    jti TEXT PRIMARY KEY,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    issued_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    used_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_open
+    ON refresh_tokens (user_id) WHERE used_at IS NULL;
+
+-- Nur der Service-Role-Zugang (Backend) darf lesen/schreiben — keine Policies
+ALTER TABLE refresh_tokens ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,103 @@
+"""Benchmark: Mahlzeit-Parsing mit zwei Claude-Calls vs. einem kombinierten Call.
+
+Zwei Calls:  parse_food_input → generate_meal_feedback (MEAL_PARSE_MODE=separate)
+Ein Call:    parse_food_input_with_feedback         (MEAL_PARSE_MODE=combined)
+
+Beide Varianten laufen abwechselnd gegen die echte Claude API (ohne Parse-Cache).
+Ausgegeben werden p50/p95-Latenz sowie Input-/Output-Tokens pro Mahlzeit.
+Benoetigt ANTHROPIC_API_KEY (und die uebrigen Pflicht-Settings aus .env).
+
+Aufruf:
+    python scripts/bench_meal_parsing.py
+    python scripts/bench_meal_parsing.py --runs 20
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import time
+
+# Projekt-Root zum Path hinzufuegen (fuer app.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.core.metrics import metrics
+from app.services.claude_service import (
+    _parse_and_feedback_with_claude, _parse_with_claude, generate_meal_feedback,
+)
+
+INPUTS = [
+    "Frühstück: Haferflocken mit Blaubeeren und einem Löffel Erdnussbutter",
+    "um 13 Uhr hatte ich eine Portion Spaghetti Bolognese und einen Salat",
+    "zwei Kaffee mit Hafermilch und ein Croissant",
+    "Abendessen: Lachs mit Brokkoli und Reis, dazu ein Glas Weißwein",
+    "Snack: eine Handvoll Mandeln und ein Apfel",
+]
+
+PROFILE = {
+    "display_name": "Benchmark",
+    "gender": "female",
+    "diet_type": "omnivore",
+    "health_goal": "general_health",
+    "intolerances": [],
+}
+
+
+async def two_calls(text: str) -> None:
+    parsed = await _parse_with_claude(text)
+    await generate_meal_feedback(parsed["items"], PROFILE, {})
+
+
+async def one_call(text: str) -> None:
+    await _parse_and_feedback_with_claude(text, PROFILE, {})
+
+
+def _tokens(kinds: tuple[str, ...]) -> tuple[int, int]:
+    counters = metrics.snapshot()["counters"]
+    inp = sum(
+        counters.get(f"claude.{kind}.input_tokens.{part}", 0)
+        for kind in kinds for part in ("uncached", "cache_read", "cache_write")
+    )
+    out = sum(counters.get(f"claude.{kind}.output_tokens", 0) for kind in kinds)
+    return inp, out
+
+
+def _report(label: str, latencies: list[float], kinds: tuple[str, ...]) -> None:
+    inp, out = _tokens(kinds)
+    n = len(latencies)
+    print(
+        f"{label:<12} p50 {np.percentile(latencies, 50):7.0f} ms   "
+        f"p95 {np.percentile(latencies, 95):7.0f} ms   "
+        f"Tokens/Mahlzeit: {inp / n:6.0f} in, {out / n:5.0f} out"
+    )
+
+
+async def run(runs: int) -> None:
+    variants = {"zwei Calls": two_calls, "ein Call": one_call}
+    latencies: dict[str, list[float]] = {name: [] for name in variants}
+
+    for i in range(runs):
+        for text in INPUTS:
+            # Reihenfolge abwechseln, damit keine Variante systematisch vom warmen Prompt-Cache profitiert
+            order = list(variants.items()) if i % 2 == 0 else list(variants.items())[::-1]
+            for name, fn in order:
+                start = time.perf_counter()
+                await fn(text)
+                latencies[name].append((time.perf_counter() - start) * 1000)
+
+    print(f"{runs} Durchlaeufe × {len(INPUTS)} Eingaben\n")
+    _report("zwei Calls", latencies["zwei Calls"], ("parse", "feedback"))
+    _report("ein Call", latencies["ein Call"], ("parse_feedback",))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Durchlaeufe pro Eingabe")
+    args = parser.parse_args()
+    asyncio.run(run(args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark: Nährstoff-Mathe als Dict-Schleifen vs. NumPy-Engine (app/services/nutrient_engine.py).
+
+Teil 1 misst, was die Endpunkte wirklich ausfuehren: calculate_nutrients pro Item
+und die Summe einer Mahlzeit (5 Items) — jeweils ab Dict-Zeilen, wie sie aus dem
+Lookup bzw. aus JSONB kommen, inklusive NutrientProfile an der API-Grenze.
+Teil 2 vergleicht auf einer synthetischen Historie (Standard: 1000 Items, 30 Tage)
+die Matrix-Operationen mit den alten Dict-Schleifen. Die Referenz-Implementierung
+und die Pruefung auf identische Ergebnisse stehen in tests/test_nutrient_engine.py.
+
+Aufruf:
+    python scripts/bench_nutrients.py
+    python scripts/bench_nutrients.py --items 5000 --days 90
+"""
+
+import sys
+import os
+import argparse
+import random
+import timeit
+
+# Projekt-Root zum Path hinzufuegen (fuer app.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+
+import numpy as np
+
+from app.services import nutrient_engine as ne
+from app.services.balance_service import sum_nutrients
+from app.services.nutrition_service import calculate_nutrient_vector, calculate_nutrients
+from tests.test_nutrient_engine import (
+    legacy_calculate, legacy_counts, legacy_deficits, legacy_scale, legacy_sum, make_data,
+)
+
+
+# ── Neue Implementierung ──
+
+def engine_scale(per_100: np.ndarray, grams: np.ndarray) -> np.ndarray:
+    return ne.scale(per_100, grams)
+
+
+def engine_deficits(actual: np.ndarray, target: np.ndarray):
+    return ne.compare(actual, target)
+
+
+def bench(label: str, fn, number: int, unit: str = "ms") -> float:
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    scale = 1e6 if unit == "µs" else 1e3
+    print(f"  {label:<38} {seconds * scale:9.3f} {unit}")
+    return seconds
+
+
+def bench_request_path(per_100: list[dict], grams: list[float], number: int) -> list[tuple]:
+    """Pro-Request-Pfade ab Dict-Zeilen (so wie meals.py sie aufruft)."""
+    meal = per_100[:5]
+    meal_grams = grams[:5]
+    legacy_items = [legacy_scale(p, g) for p, g in zip(meal, meal_grams)]
+
+    # Lookup-Cache liefert den per-100g-Vektor gleich mit
+    meal_vectors = [ne.to_vector(p) for p in meal]
+    item_vectors = [calculate_nutrient_vector(v, g) for v, g in zip(meal_vectors, meal_grams)]
+
+    print("Pro Request (ab Dict-Zeilen, inkl. NutrientProfile):")
+    rows = []
+    rows.append(("calculate_nutrients (1 Item)",
+                 bench("legacy: calculate", lambda: legacy_calculate(meal[0], meal_grams[0]), number, "µs"),
+                 bench("engine: calculate_nutrients",
+                       lambda: calculate_nutrients(meal[0], meal_grams[0]), number, "µs")))
+    rows.append(("  … mit gecachtem per-100g-Vektor",
+                 rows[-1][1],
+                 bench("engine: vector + to_profile",
+                       lambda: ne.to_profile(calculate_nutrient_vector(meal_vectors[0], meal_grams[0]), None),
+                       number, "µs")))
+    rows.append(("sum_nutrients (Mahlzeit, 5 Dicts)",
+                 bench("legacy: sum", lambda: legacy_sum(legacy_items), number, "µs"),
+                 bench("engine: sum_nutrients", lambda: sum_nutrients(legacy_items), number, "µs")))
+    rows.append(("  … Item-Vektoren (meals._sum_items)",
+                 rows[-1][1],
+                 bench("engine: sum_vectors", lambda: ne.sum_vectors(item_vectors), number, "µs")))
+    print()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    per_100, grams, target, day_totals = make_data(args.items, args.days)
+    logging.disable(logging.INFO)  # [CALC]-Logzeilen nicht mitmessen
+
+    request_rows = bench_request_path(per_100, grams, args.number * 500)
+
+    # Vorbereitung (einmalig, z.B. beim Laden aus der DB)
+    per_100_m = ne.to_matrix(per_100)
+    grams_v = np.asarray(grams)
+    target_v = ne.to_vector(target)
+    days_m = ne.to_matrix(day_totals)
+    targets_m = np.tile(target_v, (args.days, 1))
+
+    legacy_items = [legacy_scale(p, g) for p, g in zip(per_100, grams)]
+    engine_items = engine_scale(per_100_m, grams_v)
+    legacy_total = legacy_sum(legacy_items)
+    engine_total = ne.total(engine_items)
+    print(f"{args.items} Items, {args.days} Tage, {ne.N_FIELDS} Felder\n")
+
+    # ── Laufzeit ──
+    rows = []
+    rows.append(("Skalieren (alle Items)",
+                 bench("legacy: scale", lambda: [legacy_scale(p, g) for p, g in zip(per_100, grams)], args.number),
+                 bench("engine: scale", lambda: engine_scale(per_100_m, grams_v), args.number)))
+    rows.append(("Summieren (alle Items)",
+                 bench("legacy: sum", lambda: legacy_sum(legacy_items), args.number),
+                 bench("engine: total", lambda: ne.total(engine_items), args.number)))
+    rows.append(("Soll/Ist-Vergleich",
+                 bench("legacy: deficits", lambda: legacy_deficits(legacy_total, target), args.number),
+                 bench("engine: compare", lambda: engine_deficits(engine_total, target_v), args.number)))
+    rows.append(("Defizit-/Ueberschuss-Tage",
+                 bench("legacy: counts", lambda: legacy_counts(day_totals, [target] * args.days), args.number),
+                 bench("engine: deficit_excess_counts",
+                       lambda: ne.deficit_excess_counts(days_m, targets_m), args.number)))
+
+    print("\nSpeedup:")
+    for label, legacy, engine in request_rows + rows:
+        print(f"  {label:<38} {legacy / engine:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
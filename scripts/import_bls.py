@@ -218,6 +218,8 @@ async def import_to_db(records: list[tuple]):
         # Sanity-Check
         count = await conn.fetchval("SELECT COUNT(*) FROM bls_foods")
         log.info("Verifizierung: %d Eintraege in bls_foods", count)
+        log.info("Laufende API-Instanzen laden ihren BLS-Index automatisch neu "
+                 "(spaetestens nach BLS_INDEX_REFRESH_SECONDS)")
 
         # Beispiel: Lachs suchen
         rows = await conn.fetch("""
@@ -0,0 +1,45 @@
+"""Parse-Cache leeren — nach Aenderungen an PARSING_SYSTEM_PROMPT oder am Parsing-Modell.
+
+Eintraege anderer Prompt-Versionen werden ohnehin nicht mehr gelesen; dieses Skript
+raeumt sie (und abgelaufene Eintraege) aus der Tabelle parse_cache.
+
+Aufruf:
+    python scripts/purge_parse_cache.py          # veraltete + abgelaufene Eintraege
+    python scripts/purge_parse_cache.py --all    # kompletter Cache
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import logging
+
+# Projekt-Root zum Path hinzufuegen (fuer app.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import dispose_engine, session_scope
+from app.services import parse_cache
+from app.services.claude_service import PARSE_PROMPT_VERSION
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+log = logging.getLogger(__name__)
+
+
+async def run(purge_all: bool) -> None:
+    try:
+        async with session_scope() as db:
+            deleted = await parse_cache.purge_stale(PARSE_PROMPT_VERSION, db, purge_all=purge_all)
+        log.info("Parse-Cache: %d Eintraege geloescht (aktuelle Version %s)", deleted, PARSE_PROMPT_VERSION)
+    finally:
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--all", action="store_true", help="Alle Eintraege loeschen")
+    args = parser.parse_args()
+    asyncio.run(run(args.all))
+
+
+if __name__ == "__main__":
+    main()
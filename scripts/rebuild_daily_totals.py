@@ -0,0 +1,48 @@
+"""Tagesbilanzen reparieren — berechnet daily_logs.actual_nutrients aus food_items neu.
+
+Die Summen werden normalerweise inkrementell bei jeder Mahlzeit gepflegt.
+Dieses Skript behebt Drift (z.B. nach manuellen DB-Eingriffen).
+
+Aufruf:
+    python scripts/rebuild_daily_totals.py                      # alle User, alle Tage
+    python scripts/rebuild_daily_totals.py --user <uuid>
+    python scripts/rebuild_daily_totals.py --start 2026-10-01 --end 2026-10-17
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import logging
+from datetime import date
+
+# Projekt-Root zum Path hinzufuegen (fuer app.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import dispose_engine, session_scope
+from app.services.balance_service import rebuild_daily_totals
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+log = logging.getLogger(__name__)
+
+
+async def run(user_id: str | None, start: date | None, end: date | None) -> None:
+    try:
+        async with session_scope() as db:
+            days = await rebuild_daily_totals(db, user_id=user_id, start_date=start, end_date=end)
+        log.info("Tagesbilanzen neu berechnet: %d Tage", days)
+    finally:
+        await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", help="Nur diesen User (UUID)")
+    parser.add_argument("--start", type=date.fromisoformat, help="Ab Datum (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Bis Datum (YYYY-MM-DD)")
+    args = parser.parse_args()
+    asyncio.run(run(args.user, args.start, args.end))
+
+
+if __name__ == "__main__":
+    main()
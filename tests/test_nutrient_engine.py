@@ -0,0 +1,169 @@
+"""NumPy-Nährstoff-Engine gegen die frühere Dict-Schleifen-Implementierung.
+
+Die legacy_*-Funktionen sind die Referenz (Stand vor app/services/nutrient_engine.py);
+scripts/bench_nutrients.py misst mit denselben Funktionen die Laufzeit.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from app.models.schemas import NutrientProfile
+from app.services import nutrient_engine as ne
+from app.services.balance_service import sum_nutrients
+from app.services.nutrition_service import calculate_nutrient_vector, calculate_nutrients
+
+FIELDS = list(ne.FIELDS)
+
+
+# ── Referenz: alte Implementierung (Dict-Schleifen) ──
+
+def legacy_scale(per_100: dict, grams: float) -> dict:
+    factor = grams / 100.0
+    return {k: round(v * factor, 2) for k, v in per_100.items() if isinstance(v, (int, float))}
+
+
+def legacy_calculate(per_100: dict, grams: float) -> NutrientProfile:
+    """calculate_nutrients vor der Engine (ohne Logging)."""
+    return NutrientProfile(**legacy_scale(per_100, grams))
+
+
+def legacy_sum(rows: list[dict]) -> dict:
+    totals = {f: 0.0 for f in FIELDS}
+    for nutrients in rows:
+        for f in FIELDS:
+            value = nutrients.get(f, 0)
+            if isinstance(value, (int, float)):
+                totals[f] += value
+    return {k: round(v, 2) for k, v in totals.items()}
+
+
+def legacy_deficits(actual: dict, target: dict) -> dict:
+    result = {}
+    for f in FIELDS:
+        a = actual.get(f, 0) or 0
+        t = target.get(f, 0) or 0
+        pct = round((a / t) * 100, 1) if t > 0 else (0 if a == 0 else 100)
+        if f in ne.LIMIT_FIELDS:
+            status = "ok" if a <= t else "excess"
+        elif t == 0:
+            status = "ok"
+        elif pct < 80:
+            status = "deficit"
+        elif pct > 120:
+            status = "excess"
+        else:
+            status = "ok"
+        result[f] = (pct, status)
+    return result
+
+
+def legacy_counts(days: list[dict], targets: list[dict]) -> tuple[dict, dict]:
+    deficits = {f: 0 for f in FIELDS}
+    excesses = {f: 0 for f in FIELDS}
+    for actual, target in zip(days, targets):
+        for f in FIELDS:
+            t = target.get(f, 0) or 0
+            if t > 0:
+                pct = (actual.get(f, 0) or 0) / t * 100
+                if pct < 80:
+                    deficits[f] += 1
+                elif pct > 120:
+                    excesses[f] += 1
+    return deficits, excesses
+
+
+def make_data(n_items: int, n_days: int, seed: int = 42):
+    rng = random.Random(seed)
+    per_100 = [
+        {f: round(rng.uniform(0, 50), 3) for f in FIELDS if rng.random() < 0.6}
+        for _ in range(n_items)
+    ]
+    grams = [rng.uniform(5, 400) for _ in range(n_items)]
+    target = {f: round(rng.uniform(0, 300), 2) for f in FIELDS}
+    day_totals = [{f: rng.uniform(0, 400) for f in FIELDS} for _ in range(n_days)]
+    return per_100, grams, target, day_totals
+
+
+# ── Tests ──
+
+N_ITEMS, N_DAYS = 1000, 30
+
+
+@pytest.fixture(scope="module")
+def data():
+    return make_data(N_ITEMS, N_DAYS)
+
+
+@pytest.fixture(scope="module")
+def legacy_items(data):
+    per_100, grams, _, _ = data
+    return [legacy_scale(p, g) for p, g in zip(per_100, grams)]
+
+
+def test_scale(data, legacy_items):
+    per_100, grams, _, _ = data
+    assert np.allclose(ne.to_matrix(legacy_items), ne.scale(ne.to_matrix(per_100), np.asarray(grams)))
+
+
+def test_total(data, legacy_items):
+    per_100, grams, _, _ = data
+    engine_total = ne.total(ne.scale(ne.to_matrix(per_100), np.asarray(grams)))
+    legacy_total = legacy_sum(legacy_items)
+    assert np.allclose([legacy_total[f] for f in FIELDS], np.round(engine_total, 2), atol=0.011)
+
+
+def test_compare(data, legacy_items):
+    _, _, target, _ = data
+    legacy_total = legacy_sum(legacy_items)
+    legacy_def = legacy_deficits(legacy_total, target)
+    pct, status = ne.compare(ne.to_vector(legacy_total), ne.to_vector(target))
+    assert [s for _, s in legacy_def.values()] == status.tolist()
+    assert np.allclose([p for p, _ in legacy_def.values()], pct)
+
+
+def test_compare_edge_cases():
+    target = {f: 0.0 for f in FIELDS} | {"protein": 100.0, "sugar": 50.0}
+    actual = {"protein": 79.0, "sugar": 60.0, "calories": 10.0}
+    legacy_def = legacy_deficits(actual, target)
+    pct, status = ne.compare(ne.to_vector(actual), ne.to_vector(target))
+    assert [s for _, s in legacy_def.values()] == status.tolist()
+    assert np.allclose([p for p, _ in legacy_def.values()], pct)
+
+
+def test_deficit_excess_counts(data):
+    _, _, target, day_totals = data
+    legacy_d, legacy_e = legacy_counts(day_totals, [target] * N_DAYS)
+    engine_d, engine_e = ne.deficit_excess_counts(
+        ne.to_matrix(day_totals), np.tile(ne.to_vector(target), (N_DAYS, 1)),
+    )
+    assert [legacy_d[f] for f in FIELDS] == engine_d.tolist()
+    assert [legacy_e[f] for f in FIELDS] == engine_e.tolist()
+
+
+def test_request_path(data):
+    """Pro-Request-Pfade ab Dict-Zeilen, so wie meals.py sie aufruft."""
+    per_100, grams, _, _ = data
+    meal, meal_grams = per_100[:5], grams[:5]
+    for p, g in zip(meal, meal_grams):
+        expected = ne.to_vector(legacy_calculate(p, g))
+        assert np.allclose(expected, ne.to_vector(calculate_nutrients(p, g)), atol=0.011)
+        assert np.allclose(expected, calculate_nutrient_vector(ne.to_vector(p), g), atol=0.011)
+
+    items = [legacy_scale(p, g) for p, g in zip(meal, meal_grams)]
+    legacy_total = [legacy_sum(items)[f] for f in FIELDS]
+    assert np.allclose(legacy_total, sum_nutrients(items))
+    assert np.allclose(legacy_total, ne.sum_vectors([ne.to_vector(i) for i in items]))
+
+
+def test_from_arrays_skips_null_and_pads_short_rows():
+    matrix = ne.from_arrays([[1.0, 2.0], None, [1.0] * ne.N_FIELDS])
+    assert matrix.shape == (2, ne.N_FIELDS)
+    assert ne.total(matrix)[:3].tolist() == [2.0, 3.0, 1.0]
+
+
+def test_to_profile_roundtrip(legacy_items):
+    profile = ne.to_profile(ne.to_vector(legacy_items[0]))
+    assert isinstance(profile, NutrientProfile)
+    assert np.allclose(ne.to_vector(profile), ne.to_vector(legacy_items[0]), atol=0.005)
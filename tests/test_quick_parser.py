@@ -0,0 +1,47 @@
+"""Lokaler Parser: Einheiten-Vokabular wie Claude, Uhrzeiten, Fallback auf Claude."""
+
+import pytest
+
+from app.services import bls_service, quick_parser
+from app.services.claude_service import PARSE_UNITS
+
+
+@pytest.fixture(autouse=True)
+def bls_index(monkeypatch):
+    rows = [
+        {"bls_code": str(i), "name_de": name, "name_en": "", "nutrients_per_100": {}}
+        for i, name in enumerate(["Joghurt", "Milch", "Quark", "Mais", "Wasser", "Haferflocken"])
+    ]
+    monkeypatch.setattr(bls_service, "_index", bls_service.BLSIndex(rows, (0, 0)))
+
+
+def test_unit_aliases_use_parse_units():
+    assert {unit for unit, _ in quick_parser._UNIT_ALIASES.values()} <= set(PARSE_UNITS)
+
+
+@pytest.mark.parametrize("raw, amount, unit", [
+    ("1,5 kg Quark", 1500.0, "g"),
+    ("0,3 l Milch", 300.0, "ml"),
+    ("1 Becher Joghurt", 200.0, "g"),
+    ("2 Gläser Wasser", 500.0, "ml"),
+    ("1 Dose Mais", 400.0, "g"),
+    ("2 EL Quark", 2.0, "EL"),
+])
+def test_units_are_converted(raw, amount, unit):
+    item, = quick_parser.parse_locally(raw)["items"]
+    assert (item["amount"], item["unit"]) == (amount, unit)
+
+
+def test_um_without_uhr_is_not_a_time():
+    parsed = quick_parser.parse_locally("um 2 Eier")
+    assert parsed["meal_time"] is None
+    assert parsed["items"][0]["amount"] == 2.0
+
+
+def test_explicit_time():
+    assert quick_parser.parse_locally("um 8:30 200g Quark")["meal_time"] == "08:30"
+
+
+@pytest.mark.parametrize("raw", ["morgen 200g Quark", "am 12.10. 200g Quark", "200g Hafer"])
+def test_falls_back_to_claude(raw):
+    assert quick_parser.parse_locally(raw) is None